@@ -0,0 +1,375 @@
+""" Benchmarks of the game's hot paths.
+
+    python3 -m benchmark.bench run [--output results.json] [--filter name]
+        runs the benchmarks and prints the time of one call of every case, optionally storing
+        the results as a JSON baseline;
+    python3 -m benchmark.bench compare baseline.json results.json [--threshold 0.2]
+        compares two result files and exits with code 1 if any case became slower than
+        the baseline by more than the threshold.
+
+Every case is measured for several map sizes or mob counts, so the results form scaling curves.
+A case holding threads, processes or shared memory is torn down once it is measured, so it does not
+slow down the cases after it.
+"""
+import json
+import os
+import pickle
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+import tcod.console
+
+from src import fighter
+from src.controller import Controller
+from src.free_cells import FreeCellIndex
+from src.hpa import HierarchicalPathfinder
+from src.lookahead import LookaheadPlanner
+from src.map_cache import MapCache
+from src.model import Model
+from src.parallel_session import ParallelGameSession
+from src.profiler import SamplingProfiler
+from src.shared_map import SharedWorldMap
+from src.session import GameSession
+from src.strategies import AggressiveStrategy, ConfusedStrategy, CowardlyStrategy, LookaheadStrategy, \
+    PassiveStrategy
+from src.view import TOTAL_HEIGHT, TOTAL_WIDTH, View
+from src.world_map import FileWorldMapSource, MapTile, Position, RandomV1WorldMapSource, \
+    RandomV2WorldMapSource, WorldMap
+
+MAP_FILES = ['maps/circle', 'maps/hall', 'maps/rooms']
+MAP_SIZES = [30, 100, 300]
+MOB_COUNTS = [8, 64, 512]
+PARALLEL_MOB_COUNT = 50000
+REPEATS = 5
+MIN_MEASURE_TIME = 0.1
+DEFAULT_THRESHOLD = 0.2
+
+
+def _get_random_map(size: int, wall_fraction: float) -> WorldMap:
+    """ Builds a size x size map with randomly placed walls, not necessarily connected. """
+    return WorldMap.from_tiles([[MapTile.BLOCKED if random.random() < wall_fraction else MapTile.EMPTY
+                                 for _ in range(size)] for _ in range(size)])
+
+
+def _get_pillar_map(size: int) -> WorldMap:
+    """ Builds a size x size connected map with walls in some of the tiles with both coordinates odd. """
+    return WorldMap.from_tiles([[MapTile.BLOCKED if i % 2 == j % 2 == 1 and random.random() < 0.8 else MapTile.EMPTY
+                                 for j in range(size)] for i in range(size)])
+
+
+def _get_model(size: int, mob_count: int, strategy_factory=None) -> Model:
+    game_map = _get_pillar_map(size)
+    positions = game_map.get_random_empty_positions(mob_count + 1)
+    player = fighter.create_player(positions[0])
+    player.hp = sys.maxsize
+    if strategy_factory is None:
+        mobs = [fighter.create_random_mob(position) for position in positions[1:]]
+    else:
+        mobs = [fighter.Mob(position, strategy_factory()) for position in positions[1:]]
+    return Model(game_map, player, mobs)
+
+
+def _bench_random_v1(size):
+    source = RandomV1WorldMapSource(size, size)
+    return source.get
+
+
+def _bench_random_v2(size):
+    source = RandomV2WorldMapSource(size, size)
+    return source.get
+
+
+def _bench_is_one_component(size):
+    game_map = _get_random_map(size, 0.4)
+    return game_map.is_one_component
+
+
+def _bench_file_source(path):
+    source = FileWorldMapSource(path)
+    return source.get
+
+
+def _bench_cached_file_source(path, cache_directory):
+    source = FileWorldMapSource(path, MapCache(cache_directory))
+    source.get()
+    return source.get
+
+
+def _bench_random_empty_positions(size):
+    game_map = _get_pillar_map(size)
+    return lambda: game_map.get_random_empty_positions(9)
+
+
+def _bench_free_cell_sample(size):
+    index = FreeCellIndex(_get_pillar_map(size))
+    return lambda: index.sample_far_from(Position(0, 0), size // 4, 9)
+
+
+def _bench_hierarchical_path(game_map):
+    pathfinder = HierarchicalPathfinder(game_map)
+    queries = [game_map.get_random_empty_positions(2) for _ in range(16)]
+
+    def find_paths():
+        for start, goal in queries:
+            next(iter(pathfinder.find_path(start, goal)))
+    return find_paths
+
+
+def _bench_strategy(strategy_factory, mob_count):
+    model = _get_model(MAP_SIZES[0] * 2, mob_count, strategy_factory)
+
+    def choose_moves():
+        for mob in model.mobs:
+            mob.fighting_strategy.choose_move(model, mob)
+    return choose_moves
+
+
+def _bench_cold_paths(mob_count):
+    model = _get_model(MAP_SIZES[0] * 2, mob_count)
+    path_service = model.map.get_path_service()
+
+    def find_paths():
+        path_service.clear()
+        for mob in model.mobs:
+            path_service.get_next_step(mob.position, model.player.position)
+    return find_paths
+
+
+def _bench_get_fighter_at(mob_count):
+    model = _get_model(MAP_SIZES[0] * 2, mob_count)
+    positions = [mob.position for mob in model.mobs[::max(1, mob_count // 8)]]
+
+    def find_fighters():
+        for position in positions:
+            model.get_fighter_at(position)
+    return find_fighters
+
+
+def _bench_tick(mob_count, profile=False):
+    controller = Controller.__new__(Controller)
+    controller.model = _get_model(MAP_SIZES[0] * 2, mob_count)
+    controller.session = GameSession(controller.model)
+    controller.profiler = None
+    controller.tick_number = 0
+    controller.program_is_running = True
+    controller.player_died = False
+    if not profile:
+        return controller._tick
+    controller.profiler = SamplingProfiler(os.devnull)
+    controller.profiler.start()
+    return controller._tick, controller.profiler.stop
+
+
+def _bench_lookahead_tick(mob_count, workers):
+    model = _get_model(MAP_SIZES[0], mob_count, LookaheadStrategy)
+    planner = LookaheadPlanner(workers=workers)
+    model.set_planner(planner)
+    return GameSession(model).tick, planner.close
+
+
+def _bench_parallel_tick(mob_count, workers):
+    session = ParallelGameSession(_get_model(MAP_SIZES[-1], mob_count), workers=workers)
+    return session.tick, session.close
+
+
+def _bench_pickle(game_map):
+    def round_trip():
+        pickle.loads(pickle.dumps(game_map))
+    return round_trip
+
+
+def _bench_shared_pickle(size):
+    shared = SharedWorldMap.create(_get_pillar_map(size))
+    return _bench_pickle(shared), shared.close
+
+
+def _bench_snapshot(size, mob_count):
+    model = _get_model(size, mob_count)
+
+    def round_trip():
+        Model().set_snapshot(model.get_snapshot())
+    return round_trip
+
+
+def _bench_fork(mob_count):
+    model = _get_model(MAP_SIZES[0] * 2, mob_count)
+    return model.fork
+
+
+def _bench_fork_rollout(mob_count, ticks):
+    model = _get_model(MAP_SIZES[0] * 2, mob_count)
+
+    def rollout():
+        forked = model.fork()
+        session = GameSession(forked)
+        with forked.use_random_state():
+            for _ in range(ticks):
+                session.tick()
+    return rollout
+
+
+def _bench_view_draw(mob_count):
+    model = _get_model(MAP_SIZES[0] * 2, mob_count)
+    view = View(tcod.console.Console(TOTAL_WIDTH, TOTAL_HEIGHT, order='C'))
+    return lambda: view.draw(model)
+
+
+def _get_cases(cache_directory):
+    """ Returns a list of (case name, setup) pairs.
+
+    A setup returns the benchmarked callable, or a pair of it and the function tearing the case down.
+    """
+    cases = []
+    for size in [10, 20, 30]:
+        cases.append(('RandomV1WorldMapSource.get[size={}]'.format(size), lambda size=size: _bench_random_v1(size)))
+    for size in [100, 500, 2000]:
+        cases.append(('RandomV2WorldMapSource.get[size={}]'.format(size), lambda size=size: _bench_random_v2(size)))
+    for path in MAP_FILES:
+        cases.append(('FileWorldMapSource.get[{}]'.format(path), lambda path=path: _bench_file_source(path)))
+        cases.append(('FileWorldMapSource.get[{},cached]'.format(path),
+                      lambda path=path: _bench_cached_file_source(path, cache_directory)))
+    for size in MAP_SIZES:
+        cases.append(('WorldMap.is_one_component[size={}]'.format(size),
+                      lambda size=size: _bench_is_one_component(size)))
+        cases.append(('WorldMap.get_random_empty_positions[size={}]'.format(size),
+                      lambda size=size: _bench_random_empty_positions(size)))
+        cases.append(('FreeCellIndex.sample_far_from[size={}]'.format(size),
+                      lambda size=size: _bench_free_cell_sample(size)))
+        cases.append(('HierarchicalPathfinder.find_path[size={}]'.format(size),
+                      lambda size=size: _bench_hierarchical_path(_get_pillar_map(size))))
+        cases.append(('WorldMap.pickle_round_trip[size={}]'.format(size),
+                      lambda size=size: _bench_pickle(_get_pillar_map(size))))
+        cases.append(('SharedWorldMap.pickle_round_trip[size={}]'.format(size),
+                      lambda size=size: _bench_shared_pickle(size)))
+    for path in MAP_FILES:
+        cases.append(('HierarchicalPathfinder.find_path[{}]'.format(path),
+                      lambda path=path: _bench_hierarchical_path(FileWorldMapSource(path).get())))
+    strategies = [('AggressiveStrategy', AggressiveStrategy),
+                  ('CowardlyStrategy', CowardlyStrategy),
+                  ('PassiveStrategy', PassiveStrategy),
+                  ('ConfusedStrategy', lambda: ConfusedStrategy(PassiveStrategy(), 5))]
+    for mob_count in MOB_COUNTS:
+        for name, factory in strategies:
+            cases.append(('{}.choose_move[mobs={}]'.format(name, mob_count),
+                          lambda factory=factory, mob_count=mob_count: _bench_strategy(factory, mob_count)))
+        cases.append(('PathService.get_next_step[mobs={},cold]'.format(mob_count),
+                      lambda mob_count=mob_count: _bench_cold_paths(mob_count)))
+        cases.append(('Model.get_fighter_at[mobs={}]'.format(mob_count),
+                      lambda mob_count=mob_count: _bench_get_fighter_at(mob_count)))
+        cases.append(('Controller._tick[mobs={}]'.format(mob_count), lambda mob_count=mob_count: _bench_tick(mob_count)))
+        cases.append(('Controller._tick[mobs={},profiled]'.format(mob_count),
+                      lambda mob_count=mob_count: _bench_tick(mob_count, profile=True)))
+        cases.append(('View.draw[mobs={}]'.format(mob_count), lambda mob_count=mob_count: _bench_view_draw(mob_count)))
+        cases.append(('Model.fork[mobs={}]'.format(mob_count), lambda mob_count=mob_count: _bench_fork(mob_count)))
+        cases.append(('Model.fork+tick*5[mobs={}]'.format(mob_count),
+                      lambda mob_count=mob_count: _bench_fork_rollout(mob_count, 5)))
+    for mob_count in MOB_COUNTS[:2]:
+        for workers in [0, 2]:
+            cases.append(('GameSession.tick[mobs={},lookahead,workers={}]'.format(mob_count, workers),
+                          lambda mob_count=mob_count, workers=workers: _bench_lookahead_tick(mob_count, workers)))
+    for workers in [0, 2]:
+        cases.append(('ParallelGameSession.tick[mobs={},workers={}]'.format(PARALLEL_MOB_COUNT, workers),
+                      lambda workers=workers: _bench_parallel_tick(PARALLEL_MOB_COUNT, workers)))
+    for size in MAP_SIZES[:2]:
+        for mob_count in MOB_COUNTS[:2]:
+            cases.append(('Model.snapshot_round_trip[size={},mobs={}]'.format(size, mob_count),
+                          lambda size=size, mob_count=mob_count: _bench_snapshot(size, mob_count)))
+    return cases
+
+
+def measure(function) -> float:
+    """ Returns the median time in seconds of one call of the function. """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_MEASURE_TIME:
+            break
+        number *= 2
+    timings = [elapsed / number]
+    for _ in range(REPEATS - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings)
+
+
+def run(name_filter: str = None):
+    """ Runs the benchmarks whose names contain the filter and returns the results. """
+    results = dict()
+    with tempfile.TemporaryDirectory() as cache_directory:
+        for name, setup in _get_cases(cache_directory):
+            if name_filter is not None and name_filter not in name:
+                continue
+            random.seed(0)
+            benchmarked = setup()
+            teardown = None
+            if isinstance(benchmarked, tuple):
+                benchmarked, teardown = benchmarked
+            try:
+                results[name] = measure(benchmarked)
+            finally:
+                if teardown is not None:
+                    teardown()
+            print('{:<60}{:>14.3f} us'.format(name, results[name] * 1e6))
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results}
+
+
+def compare(baseline, current, threshold: float = DEFAULT_THRESHOLD):
+    """ Returns the list of (case name, baseline time, current time) of the regressed cases. """
+    regressions = []
+    for name, current_time in current['results'].items():
+        baseline_time = baseline['results'].get(name)
+        if baseline_time is not None and current_time > baseline_time * (1 + threshold):
+            regressions.append((name, baseline_time, current_time))
+    return regressions
+
+
+def main():
+    """ Runs the command line interface of the benchmarks. """
+    parser = ArgumentParser(description='Benchmarks of the rogue-like game.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--output', type=str, default=None, help='path to store the results at')
+    run_parser.add_argument('--filter', type=str, default=None, help='run only the cases containing this string')
+    compare_parser = subparsers.add_parser('compare', help='compare results with a baseline')
+    compare_parser.add_argument('baseline', type=str)
+    compare_parser.add_argument('current', type=str)
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='allowed relative slowdown, 0.2 being 20%%')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run(args.filter)
+        if args.output is not None:
+            with open(args.output, 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+        return
+
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+    with open(args.current, 'r') as file:
+        current = json.load(file)
+    for name in sorted(current['results']):
+        if name in baseline['results']:
+            ratio = current['results'][name] / baseline['results'][name]
+            print('{:<60}{:>8.2f}x'.format(name, ratio))
+    regressions = compare(baseline, current, args.threshold)
+    for name, baseline_time, current_time in regressions:
+        print('REGRESSION {}: {:.3f} us -> {:.3f} us'.format(name, baseline_time * 1e6, current_time * 1e6))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
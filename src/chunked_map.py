@@ -0,0 +1,196 @@
+""" Module containing the implementation of an unbounded world map split into chunks. """
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from src.fov import FieldOfView
+from src.path_service import PathService
+from src.world_map import MapTile, Position, WorldMap, WorldMapSource
+
+
+class ChunkedWorldMap:
+    """ Class for storing an unbounded world map that is generated chunk by chunk.
+
+    The map consists of chunk_size x chunk_size chunks, each of them generated
+    deterministically from the map's seed and the chunk's coordinates. The first row
+    and the first column of every chunk are always empty, so these corridors connect
+    the chunks with each other, and every chunk is connected to its own corridors.
+
+    Only a bounded amount of the most recently used chunks is held in memory, the
+    chunks in the direction the player is moving in are prefetched on a worker thread.
+    """
+    _DEFAULT_CHUNK_SIZE = 16
+    _DEFAULT_CACHED_CHUNKS = 64
+    _WALL_PERCENTAGE = 0.4
+    _PREFETCH_DEPTH = 2
+
+    def __init__(self, seed: int = 0, chunk_size: int = _DEFAULT_CHUNK_SIZE,
+                 cached_chunks: int = _DEFAULT_CACHED_CHUNKS, stairs_up: Optional[Position] = None,
+                 stairs_down: Optional[Position] = None):
+        """ Initializes an unbounded map with the given seed.
+
+        :raises ValueError if chunk_size is less than 2 or cached_chunks is not positive.
+        """
+        if chunk_size < 2:
+            raise ValueError('Invalid chunk size')
+        if cached_chunks <= 0:
+            raise ValueError('Invalid cached chunk count')
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.cached_chunks = cached_chunks
+        self.stairs_up = stairs_up
+        self.stairs_down = stairs_down
+        self._chunks = OrderedDict()
+        self._pending = dict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._last_tracked = None
+        self._path_service = None
+        self._field_of_view = None
+
+    def get_random_empty_positions(self, count=1):
+        """ Returns a list of random non-repeating empty positions of length count near the origin. """
+        empty = []
+        radius = 0
+        while len(empty) < count:
+            empty = [Position(x, y)
+                     for chunk_x in range(-radius, radius + 1)
+                     for chunk_y in range(-radius, radius + 1)
+                     for x, y in self._get_chunk_empty_cells(chunk_x, chunk_y)]
+            radius += 1
+        return random.sample(empty, count)
+
+    @staticmethod
+    def get_version() -> int:
+        """ Returns the version of the map's tiles, which never change. """
+        return 0
+
+    def get_path_service(self) -> PathService:
+        """ Returns the service finding and caching the paths on this map. """
+        if self._path_service is None:
+            self._path_service = PathService(self)
+        return self._path_service
+
+    def get_field_of_view(self) -> FieldOfView:
+        """ Returns the field of view computation of this map. """
+        if self._field_of_view is None:
+            self._field_of_view = FieldOfView(self)
+        return self._field_of_view
+
+    def is_empty(self, position: Position):
+        """ Checks whether a tile on the map is empty. """
+        chunk = self._get_chunk(position.x // self.chunk_size, position.y // self.chunk_size)
+        return chunk[(position.x % self.chunk_size) * self.chunk_size + position.y % self.chunk_size] \
+            == MapTile.EMPTY.value
+
+    @staticmethod
+    def get_distance(first_position: Position, second_position: Position):
+        """ Returns the distance in map metrics between two positions on the map. """
+        return WorldMap.get_distance(first_position, second_position)
+
+    def get_empty_neighbors(self, position: Position):
+        """ Returns list of positions of empty tiles at manhattan distance 1. """
+        empty_neighbors = []
+        for dx, dy in {(0, 1), (0, -1), (1, 0), (-1, 0)}:
+            neighbor = Position(position.x + dx, position.y + dy)
+            if self.is_empty(neighbor):
+                empty_neighbors.append(neighbor)
+        return empty_neighbors
+
+    @staticmethod
+    def is_on_map(_position: Position):
+        """ Returns True, as every position exists on an unbounded map. """
+        return True
+
+    def get_cached_chunks(self):
+        """ Returns the coordinates of the chunks held in memory from the least to the most recently used. """
+        with self._lock:
+            return list(self._chunks.keys())
+
+    def track(self, position: Position):
+        """ Notes the player's new position and prefetches the chunks in the direction of their movement. """
+        previous, self._last_tracked = self._last_tracked, Position(position.x, position.y)
+        if previous is None:
+            directions = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2)]
+        else:
+            directions = [((position.x > previous.x) - (position.x < previous.x),
+                           (position.y > previous.y) - (position.y < previous.y))]
+        chunk_x = position.x // self.chunk_size
+        chunk_y = position.y // self.chunk_size
+        for dx, dy in directions:
+            if dx == dy == 0:
+                continue
+            for distance in range(1, ChunkedWorldMap._PREFETCH_DEPTH + 1):
+                # The neighbours of the chunk ahead are prefetched too, as the view is wider than one chunk.
+                for side in range(-1, 2):
+                    self._prefetch(chunk_x + dx * distance + side * dy, chunk_y + dy * distance + side * dx)
+
+    def close(self):
+        """ Stops the prefetching worker thread. """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _prefetch(self, chunk_x: int, chunk_y: int):
+        key = (chunk_x, chunk_y)
+        with self._lock:
+            if key in self._chunks or key in self._pending:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            self._pending[key] = self._executor.submit(self._generate_and_store, chunk_x, chunk_y)
+
+    def _get_chunk(self, chunk_x: int, chunk_y: int) -> bytes:
+        key = (chunk_x, chunk_y)
+        with self._lock:
+            if key in self._chunks:
+                self._chunks.move_to_end(key)
+                return self._chunks[key]
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending.result()
+        return self._generate_and_store(chunk_x, chunk_y)
+
+    def _get_chunk_empty_cells(self, chunk_x: int, chunk_y: int):
+        chunk = self._get_chunk(chunk_x, chunk_y)
+        for i in range(self.chunk_size):
+            for j in range(self.chunk_size):
+                if chunk[i * self.chunk_size + j] == MapTile.EMPTY.value:
+                    yield chunk_x * self.chunk_size + i, chunk_y * self.chunk_size + j
+
+    def _generate_and_store(self, chunk_x: int, chunk_y: int) -> bytes:
+        chunk = self._generate(chunk_x, chunk_y)
+        key = (chunk_x, chunk_y)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._chunks[key] = chunk
+            self._chunks.move_to_end(key)
+            while len(self._chunks) > self.cached_chunks:
+                self._chunks.popitem(last=False)
+        return chunk
+
+    def _generate(self, chunk_x: int, chunk_y: int) -> bytes:
+        """ Generates the tiles of a chunk as a row-major byte string of MapTile values. """
+        rng = random.Random('{}:{}:{}'.format(self.seed, chunk_x, chunk_y))
+        size = self.chunk_size
+        chunk_map = WorldMap(size, size)
+        for _ in range(int((size - 1) * (size - 1) * ChunkedWorldMap._WALL_PERCENTAGE)):
+            block_x = rng.randrange(1, size)
+            block_y = rng.randrange(1, size)
+            chunk_map.tiles[block_x][block_y] = MapTile.BLOCKED
+            if not chunk_map.is_one_component():
+                chunk_map.tiles[block_x][block_y] = MapTile.EMPTY
+        return bytes(tile.value for row in chunk_map.tiles for tile in row)
+
+
+class ChunkedWorldMapSource(WorldMapSource):
+    """ Produces an unbounded chunked map with the given seed. """
+
+    def __init__(self, seed: int, chunk_size: int = ChunkedWorldMap._DEFAULT_CHUNK_SIZE):
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+    def get(self) -> ChunkedWorldMap:
+        return ChunkedWorldMap(self.seed, self.chunk_size)
@@ -0,0 +1,148 @@
+""" Module containing a simple terminal client for the game server. """
+import asyncio
+import json
+import sys
+import threading
+from argparse import ArgumentParser
+
+from src.server import DEFAULT_HOST, DEFAULT_PORT, PLAYER_KIND
+from src.view import VIEW_HEIGHT, VIEW_WIDTH
+
+KEY_TO_COMMAND = {'w': 'go_up',
+                  'a': 'go_left',
+                  's': 'go_down',
+                  'd': 'go_right',
+                  '.': 'stay',
+                  '1': 'select_1',
+                  '2': 'select_2',
+                  '3': 'select_3'}
+KIND_TO_CHAR = {PLAYER_KIND: '@',
+                'aggressive': 'a',
+                'cowardly': 'c',
+                'passive': 'p',
+                'confused': '?'}
+QUIT_KEY = 'q'
+
+
+class ClientState:
+    """ Class keeping a copy of a session's state built from the messages of the server. """
+
+    def __init__(self, full_state):
+        """ Initializes the state from the full state sent by the server. """
+        self.session_id = full_state['session']
+        self.tick = full_state['tick']
+        self.map = full_state['map']
+        self.player_id = full_state['player']
+        self.weapons = full_state['weapons']
+        self.weapon = full_state['weapon']
+        self.fighters = full_state['fighters']
+        self.dead = False
+
+    def apply(self, diff):
+        """ Applies a difference sent by the server. """
+        self.tick = diff['tick']
+        self.fighters.update(diff.get('fighters', {}))
+        for fighter_id in diff.get('removed', []):
+            self.fighters.pop(fighter_id, None)
+        if 'weapon' in diff:
+            self.weapon = diff['weapon']
+        self.dead = diff.get('dead', False)
+
+    def render(self) -> str:
+        """ Returns the text picture of the area around the player and their stats. """
+        player_x, player_y, player_hp, _ = self.fighters[self.player_id]
+        chars = dict()
+        for x, y, _, kind in self.fighters.values():
+            chars[(x, y)] = KIND_TO_CHAR.get(kind, 'm')
+        chars[(player_x, player_y)] = KIND_TO_CHAR[PLAYER_KIND]
+        lines = []
+        for i in range(VIEW_HEIGHT):
+            x = player_x + i - (VIEW_HEIGHT - 1) // 2
+            line = ''
+            for j in range(VIEW_WIDTH):
+                y = player_y + j - (VIEW_WIDTH - 1) // 2
+                if (x, y) in chars:
+                    line += chars[(x, y)]
+                elif 0 <= x < len(self.map) and 0 <= y < len(self.map[x]):
+                    line += self.map[x][y]
+                else:
+                    line += ' '
+            lines.append(line)
+        weapon = self.weapons[self.weapon] if self.weapon is not None else '-'
+        lines.append('HP {}  WEAPON {}  TICK {}  SESSION {}'.format(player_hp, weapon, self.tick, self.session_id))
+        return '\n'.join(lines)
+
+
+async def _send(writer: asyncio.StreamWriter, request):
+    writer.write((json.dumps(request) + '\n').encode())
+    await writer.drain()
+
+
+async def _read_keys(writer: asyncio.StreamWriter):
+    # Reading the standard input blocks, so it is done on a daemon thread that does not keep the client alive.
+    loop = asyncio.get_event_loop()
+    lines = asyncio.Queue()
+
+    def _read_lines():
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        loop.call_soon_threadsafe(lines.put_nowait, '')
+
+    threading.Thread(target=_read_lines, daemon=True).start()
+    while True:
+        line = await lines.get()
+        if not line or QUIT_KEY in line:
+            return
+        for key in line.strip():
+            if key in KEY_TO_COMMAND:
+                await _send(writer, {'op': 'command', 'command': KEY_TO_COMMAND[key]})
+
+
+async def _show_updates(reader: asyncio.StreamReader):
+    state = None
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        message = json.loads(line)
+        if 'error' in message:
+            print('error: ' + message['error'])
+            continue
+        if 'session' in message:
+            state = ClientState(message)
+        elif state is not None:
+            state.apply(message)
+        else:
+            continue
+        print(state.render())
+        if state.dead:
+            print('YOU ARE DEAD')
+            return
+
+
+async def run_client(host: str, port: int, session_id: str = None):
+    """ Plays a session on the server, reading the keys from the standard input line by line. """
+    reader, writer = await asyncio.open_connection(host, port)
+    if session_id is None:
+        await _send(writer, {'op': 'new'})
+    else:
+        await _send(writer, {'op': 'join', 'session': session_id})
+    print('Keys: w a s d to move, . to stay, 1 2 3 to select a weapon, q to quit; finish a line with Enter.')
+    keys = asyncio.ensure_future(_read_keys(writer))
+    updates = asyncio.ensure_future(_show_updates(reader))
+    await asyncio.wait([keys, updates], return_when=asyncio.FIRST_COMPLETED)
+    writer.close()
+
+
+def main():
+    """ Runs the terminal client. """
+    parser = ArgumentParser(description='A terminal client for the rogue-like game server.')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--session', type=str, default=None, help='id of the session to join')
+    args = parser.parse_args()
+    asyncio.run(run_client(args.host, args.port, args.session))
+
+
+if __name__ == '__main__':
+    main()
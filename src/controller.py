@@ -1,22 +1,34 @@
 """ Module containing the main controller logic for the game. """
 
-import os
 import random
+import tracemalloc
 from argparse import ArgumentParser
 
 import tcod
 import tcod.event
 
 import src.fighter
-import src.strategies
 from src import model
 from src import view
-from src.fighting_system import CoolFightingSystem
+from src.chunked_map import ChunkedWorldMapSource
+from src.dungeon import Dungeon
+from src.hpa import GRAPH_FILE_SUFFIX, HierarchicalPathfinder
+from src.lookahead import LookaheadPlanner
+from src.map_cache import MapCache
+from src.map_pool import MapPool, PooledWorldMapSource
+from src.memory_report import build_memory_report
+from src.parallel_session import ParallelGameSession
+from src.profiler import PROFILE_FILE_NAME, SAMPLE_RATE, SamplingProfiler
+from src.save_store import FileSaveStore, SqliteSaveStore
+from src.session import GameSession
+from src.spawner import MobSpawner
 from src.view import TOTAL_WIDTH, TOTAL_HEIGHT
-from src.weapon import WeaponBuilder
-from src.world_map import FileWorldMapSource, RandomV1WorldMapSource
+from src.world_map import FileWorldMapSource, WorldMap, WorldMapSource
 
 SAVE_FILE_NAME = 'save'
+LEVELS_DIRECTORY_SUFFIX = '_levels'
+MAP_POOL_DIRECTORY = 'map_pool'
+LOOKAHEAD_WORKERS = 2
 
 
 class Controller:
@@ -36,54 +48,88 @@ class Controller:
         parser.add_argument('map_path', type=str, nargs='?', help='path to map file to load')
         parser.add_argument('--new_game', nargs='?', dest='new_game_demanded', const=True,
                             default=False)
+        parser.add_argument('--infinite', action='store_true',
+                            help='play on an unbounded map generated chunk by chunk')
+        parser.add_argument('--seed', type=int, default=None, help='seed of the unbounded map')
+        parser.add_argument('--generator', choices=['v1', 'v2'], default='v1',
+                            help='generator of the random levels, v2 making caves')
+        parser.add_argument('--waves', action='store_true', help='spawn new waves of mobs during the game')
+        parser.add_argument('--smart_mobs', action='store_true',
+                            help='make the aggressive mobs search their moves a few ticks ahead')
+        parser.add_argument('--lookahead_workers', type=int, default=LOOKAHEAD_WORKERS,
+                            help='amount of the processes searching the moves of the smart mobs')
+        parser.add_argument('--parallel_workers', type=int, default=0,
+                            help='amount of the processes choosing the moves of the mobs at the same time, '
+                                 '0 to move the fighters one by one')
+        parser.add_argument('--save_db', type=str, default=None,
+                            help='path to an SQLite database to keep the saves in instead of a file')
+        parser.add_argument('--save_name', type=str, default=SAVE_FILE_NAME, help='name of the save to use')
+        parser.add_argument('--profile', nargs='?', const=PROFILE_FILE_NAME, default=None, metavar='path',
+                            help='sample the stacks of the game and write them for a flame graph on exit')
+        parser.add_argument('--profile_rate', type=float, default=SAMPLE_RATE,
+                            help='amount of the stack samples taken a second')
+        parser.add_argument('--memory_report', action='store_true',
+                            help='trace the allocations and print a report of the memory used on exit')
 
         args = parser.parse_args()
+        if args.parallel_workers > 0 and args.infinite:
+            parser.error('the parallel moves need a bounded map')
 
-        no_save_file = not os.path.isfile(SAVE_FILE_NAME)
+        self.memory_report_demanded = args.memory_report
+        if self.memory_report_demanded:
+            tracemalloc.start()
+
+        if args.save_db is not None:
+            self.save_store = SqliteSaveStore(args.save_db)
+        else:
+            self.save_store = FileSaveStore()
+        self.save_name = args.save_name
+        self.map_path = None if args.infinite else args.map_path
+        self._pathfinder = None
+        no_save_file = not self.save_store.exists(self.save_name)
+
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        self.map_pool = None
+        self.dungeon = Dungeon(lambda depth: self._get_map_source(args, seed, depth),
+                               self.save_name + LEVELS_DIRECTORY_SUFFIX, Controller._MOB_COUNT,
+                               smart_mobs=args.smart_mobs)
 
         if args.new_game_demanded or no_save_file:
-            if args.map_path is not None:
-                game_map = FileWorldMapSource(args.map_path).get()
-            else:
-                game_map = RandomV1WorldMapSource(Controller._DEFAULT_MAP_HEIGHT,
-                                                  Controller._DEFAULT_MAP_WIDTH).get()
-
-            mobs_count = Controller._MOB_COUNT
-            positions = game_map.get_random_empty_positions(mobs_count + 1)
-            player = src.fighter.Player(positions[0], [
-                WeaponBuilder()
-                .with_name('SABER')
-                .with_attack(2)
-                .with_defence(2)
-                .with_confusion_prob(0.2),
-                WeaponBuilder()
-                .with_name('SPEAR')
-                .with_attack(4)
-                .with_defence(1)
-                .with_confusion_prob(0.1),
-                WeaponBuilder()
-                .with_name('SWORD')
-                .with_attack(1)
-                .with_defence(3)
-                .with_confusion_prob(0.7)])
-            mobs = [src.fighter.Mob(positions[i], random.choice([
-                                src.strategies.AggressiveStrategy(),
-                                src.strategies.PassiveStrategy(),
-                                src.strategies.CowardlyStrategy()])) for i in range(1, mobs_count + 1)]
-
-            self.model = model.Model(game_map, player, mobs)
+            self.dungeon.clear()
+            level = self.dungeon.get(0)
+            player = src.fighter.create_player(level.entrance)
+
+            self.model = model.Model(level.map, player, level.mobs)
         else:
-            with open(SAVE_FILE_NAME, 'r') as file:
-                self.model = model.Model(None, None, None)
-                self.model.set_snapshot(file.read())
+            self.model = model.Model(None, None, None)
+            self.model.set_snapshot(self.save_store.load(self.save_name))
 
+        # Without --smart_mobs no planner is made, the smart mobs of an older save are searched in the calling thread.
+        self.planner = LookaheadPlanner(workers=args.lookahead_workers) if args.smart_mobs else None
+        if self.planner is not None:
+            self.model.set_planner(self.planner)
+        spawner = MobSpawner(self.model) if args.waves else None
+        if args.parallel_workers > 0:
+            self.session = ParallelGameSession(self.model, workers=args.parallel_workers, spawner=spawner)
+        else:
+            self.session = GameSession(self.model, spawner=spawner)
+        self.profiler = SamplingProfiler(args.profile, args.profile_rate) if args.profile is not None else None
+        self.tick_number = 0
         self.program_is_running = True
         self.view = None
         self.player_died = False
-        self.fighting_system = CoolFightingSystem()
 
     def run_loop(self):
-        """ Starts a new game and runs it until the user quits the game. """
+        """ Starts a new game and runs it until the user quits the game, sampling its stacks with --profile. """
+        if self.profiler is None:
+            self._run_loop()
+            return
+        with self.profiler, self.profiler.sampling():
+            self._run_loop()
+        print('{} stack samples written to {}, {} slow ticks'.format(
+            self.profiler.sample_count, self.profiler.output_path, len(self.profiler.slow_ticks)))
+
+    def _run_loop(self):
         tcod.console_set_custom_font(
             Controller._TILESET_PATH,
             Controller._TILESET_OPTIONS,
@@ -111,6 +157,9 @@ class Controller:
                         if event.repeat:
                             continue
                         self._dispatch(event.scancode, event.mod, commands)
+                        self._dispatch_stairs(event.scancode)
+                        self._dispatch_travel(event.scancode, commands)
+                        self._dispatch_memory_report(event.scancode)
 
                 if not self.program_is_running:
                     break
@@ -119,14 +168,39 @@ class Controller:
                     self._tick()
 
             if self.player_died:
-                if os.path.isfile(SAVE_FILE_NAME):
-                    os.remove(SAVE_FILE_NAME)
+                self.save_store.delete(self.save_name)
+                self.dungeon.clear()
                 self.view.draw_death_screen()
                 tcod.console_flush()
                 self._wait_for_any_key()
             else:
-                with open(SAVE_FILE_NAME, 'w') as file:
-                    file.write(self.model.get_snapshot())
+                self.save_store.save(self.save_name, self.model.get_snapshot())
+                self.dungeon.store_model(self.model)
+                self.dungeon.flush()
+            self.save_store.close()
+            if self.map_pool is not None:
+                self.map_pool.close()
+            if self.planner is not None:
+                self.planner.close()
+            self.session.close()
+            if self.memory_report_demanded:
+                self._print_memory_report()
+
+    def _get_map_source(self, args, seed: int, depth: int) -> WorldMapSource:
+        """ Returns the source of the map for the dungeon level of a given depth.
+
+        In the unbounded mode every level is a chunked map with its own seed. Otherwise the
+        topmost level is loaded from the map file if one is given, and the others are taken
+        from the pool of the maps generated in advance, which is created on its first use.
+        """
+        if args.infinite:
+            return ChunkedWorldMapSource(seed + depth)
+        if depth == 0 and args.map_path is not None:
+            return FileWorldMapSource(args.map_path, MapCache())
+        if self.map_pool is None:
+            self.map_pool = MapPool(MAP_POOL_DIRECTORY, args.generator,
+                                    Controller._DEFAULT_MAP_HEIGHT, Controller._DEFAULT_MAP_WIDTH)
+        return PooledWorldMapSource(self.map_pool)
 
     @staticmethod
     def _wait_for_any_key():
@@ -138,29 +212,60 @@ class Controller:
                     return
 
     def _tick(self):
+        self.tick_number += 1
+        if self.profiler is None:
+            self.session.tick()
+        else:
+            with self.profiler.tick(self.tick_number):
+                self.session.tick()
+        if self.session.player_died:
+            self.program_is_running = False
+            self.player_died = True
+
+    def _dispatch_stairs(self, code):
+        """ Moves the player to the next or the previous dungeon level if they stand on the stairs. """
+        code_to_delta = {tcod.event.SCANCODE_PERIOD: 1,
+                         tcod.event.SCANCODE_COMMA: -1}
+        if code in code_to_delta:
+            while self.model.player.has_intention():
+                self._tick()
+            self.dungeon.change_level(self.model, code_to_delta[code])
+
+    def _dispatch_travel(self, code, commands):
+        """ Makes the player walk to the stairs down along a path found by the pathfinder. """
         game_map = self.model.map
-        fighters = self.model.get_fighters()
+        if code != tcod.event.SCANCODE_T or not isinstance(game_map, WorldMap) or game_map.stairs_down is None:
+            return
+        while self.model.player.has_intention():
+            self._tick()
+        path = self._get_pathfinder().find_path(self.model.player.position, game_map.stairs_down)
+        if path is None:
+            return
+        delta_to_cmd = {(-1, 0): commands['go_up'],
+                        (0, -1): commands['go_left'],
+                        (1, 0): commands['go_down'],
+                        (0, 1): commands['go_right']}
+        positions = list(path)
+        for previous, current in zip(positions, positions[1:]):
+            delta_to_cmd[(current.x - previous.x, current.y - previous.y)]()
 
-        random.shuffle(fighters)
+    def _dispatch_memory_report(self, code):
+        """ Prints the report of the memory used by the game. """
+        if code == tcod.event.SCANCODE_M:
+            self._print_memory_report()
 
-        for fighter in fighters:
-            intended_position = fighter.choose_move(self.model)
-            if not game_map.is_empty(intended_position):
-                intended_position = fighter.position
-            target = self.model.get_fighter_at(intended_position)
-            if target is not None and intended_position != fighter.position:
-                self.fighting_system.fight(fighter, target)
-            if target is None:
-                fighter.position = intended_position
+    def _print_memory_report(self):
+        print(build_memory_report(self.model, self.view).format(), flush=True)
 
-        if self.model.player.hp <= 0:
-            self.program_is_running = False
-            self.player_died = True
-        mobs = []
-        for mob in self.model.mobs:
-            if mob.hp > 0:
-                mobs.append(mob)
-        self.model.mobs = mobs
+    def _get_pathfinder(self) -> HierarchicalPathfinder:
+        """ Returns the pathfinder of the current level, the graph of the map file being cached next to it. """
+        if self._pathfinder is None or self._pathfinder.map is not self.model.map:
+            if self.model.depth == 0 and self.map_path is not None:
+                self._pathfinder = HierarchicalPathfinder.load_or_build(self.model.map,
+                                                                        self.map_path + GRAPH_FILE_SUFFIX)
+            else:
+                self._pathfinder = HierarchicalPathfinder(self.model.map)
+        return self._pathfinder
 
     @staticmethod
     def _dispatch(code, _mod, commands):
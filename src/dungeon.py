@@ -0,0 +1,145 @@
+""" Module containing the multi-level dungeon with lazily generated levels. """
+import os
+import shutil
+import zlib
+from collections import OrderedDict
+from typing import Callable, List, Optional, Union
+
+import jsons
+
+import src.fighter
+import src.model
+from src.chunked_map import ChunkedWorldMap
+from src.world_map import Position, WorldMap, WorldMapSource
+
+LEVEL_FILE_PREFIX = 'level_'
+
+
+class Level:
+    """ Class for storing a single dungeon level: its map and the mobs living on it. """
+
+    def __init__(self, map: Union[WorldMap, ChunkedWorldMap] = None, mobs: 'List[src.fighter.Mob]' = None,
+                 entrance: Optional[Position] = None):
+        """ Initializes a level with the given map, mobs and the tile where a descending player appears, if known. """
+        self.map = map
+        self.mobs = mobs
+        self.entrance = entrance
+
+
+class Dungeon:
+    """ A stack of levels generated on the first visit.
+
+    Only the most recently used levels are held in memory, the least recently used ones
+    are evicted together with their mobs to compressed snapshots in the given directory
+    and are loaded back when they are visited again.
+    """
+    _DEFAULT_CACHED_LEVELS = 3
+
+    def __init__(self, source_factory: Callable[[int], WorldMapSource], directory: str,
+                 mob_count: int, cached_levels: int = _DEFAULT_CACHED_LEVELS, smart_mobs: bool = False):
+        """ Initializes a dungeon.
+
+        :param source_factory: returns the map source for the level of a given depth.
+        :param directory: the directory where the evicted levels are stored.
+        :param mob_count: the amount of mobs spawned on a newly generated level.
+        :param cached_levels: the maximal amount of levels held in memory.
+        :param smart_mobs: whether the aggressive mobs of the new levels search their moves ahead.
+        :raises ValueError if cached_levels is not positive.
+        """
+        if cached_levels <= 0:
+            raise ValueError('Invalid cached level count')
+        self.source_factory = source_factory
+        self.directory = directory
+        self.mob_count = mob_count
+        self.cached_levels = cached_levels
+        self.smart_mobs = smart_mobs
+        self._levels = OrderedDict()
+
+    def get(self, depth: int) -> Level:
+        """ Returns the level of a given depth, loading or generating it if needed. """
+        if depth in self._levels:
+            self._levels.move_to_end(depth)
+            return self._levels[depth]
+        if os.path.isfile(self._get_level_path(depth)):
+            level = self._load(depth)
+        else:
+            level = self._generate(depth)
+        self.store(depth, level)
+        return level
+
+    def store(self, depth: int, level: Level):
+        """ Puts the current state of a level into the dungeon, evicting old levels if needed. """
+        self._levels[depth] = level
+        self._levels.move_to_end(depth)
+        while len(self._levels) > self.cached_levels:
+            evicted_depth, evicted_level = self._levels.popitem(last=False)
+            self._save(evicted_depth, evicted_level)
+
+    def get_cached_depths(self) -> List[int]:
+        """ Returns the depths of the levels held in memory from the least to the most recently used. """
+        return list(self._levels.keys())
+
+    def change_level(self, model: 'src.model.Model', delta: int) -> bool:
+        """ Moves the player of the model delta levels down if they stand on the matching stairs.
+
+        The level the player leaves is put back into the dungeon with its current mobs.
+
+        :returns True if the player has changed the level, False otherwise.
+        """
+        stairs = model.map.stairs_down if delta > 0 else model.map.stairs_up
+        if stairs is None or stairs != model.player.position:
+            return False
+        self.store_model(model)
+        model.depth += delta
+        level = self.get(model.depth)
+        model.map = level.map
+        model.mobs = level.mobs
+        arrival = level.map.stairs_up if delta > 0 else level.map.stairs_down
+        occupied = [mob.position for mob in level.mobs]
+        if arrival in occupied:
+            free_neighbors = [position for position in level.map.get_empty_neighbors(arrival)
+                              if position not in occupied]
+            if free_neighbors:
+                arrival = free_neighbors[0]
+        model.player.position = arrival
+        return True
+
+    def store_model(self, model: 'src.model.Model'):
+        """ Puts the current state of the model's level into the dungeon. """
+        cached = self._levels.get(model.depth)
+        # The level of a restored save is not held in memory, it is not loaded or generated for its entrance then,
+        # which is the stairs up below the top level and unknown on the top one.
+        entrance = cached.entrance if cached is not None else model.map.stairs_up
+        self.store(model.depth, Level(model.map, model.mobs, entrance))
+
+    def flush(self):
+        """ Writes all of the levels held in memory to the disk without evicting them. """
+        for depth, level in self._levels.items():
+            self._save(depth, level)
+
+    def clear(self):
+        """ Forgets all of the levels, both in memory and on the disk. """
+        self._levels.clear()
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+    def _generate(self, depth: int) -> Level:
+        game_map = self.source_factory(depth).get()
+        positions = game_map.get_random_empty_positions(self.mob_count + 2)
+        if depth > 0:
+            game_map.stairs_up = positions[0]
+        game_map.stairs_down = positions[1]
+        mobs = [src.fighter.create_random_mob(position, self.smart_mobs) for position in positions[2:]]
+        return Level(game_map, mobs, positions[0])
+
+    def _get_level_path(self, depth: int) -> str:
+        return os.path.join(self.directory, LEVEL_FILE_PREFIX + str(depth))
+
+    def _save(self, depth: int, level: Level):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._get_level_path(depth), 'wb') as file:
+            file.write(zlib.compress(jsons.dumps(level, strip_privates=True).encode()))
+
+    def _load(self, depth: int) -> Level:
+        with open(self._get_level_path(depth), 'rb') as file:
+            return jsons.loads(zlib.decompress(file.read()).decode(), Level, strict=True)
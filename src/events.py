@@ -0,0 +1,76 @@
+""" Module containing the events of the changes of the fighters and the bus delivering them. """
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class FighterMoved:
+    """ A fighter has changed its position. """
+    fighter: 'src.fighter.Fighter'
+    old_position: 'src.world_map.Position'
+    new_position: 'src.world_map.Position'
+
+
+@dataclass(frozen=True)
+class FighterDamaged:
+    """ A fighter has taken damage, hp is the amount of its health left. """
+    fighter: 'src.fighter.Fighter'
+    damage: int
+    hp: int
+
+
+@dataclass(frozen=True)
+class FighterDied:
+    """ The health of a fighter has dropped to zero, the mob is removed from the model at the end of the tick. """
+    fighter: 'src.fighter.Fighter'
+
+
+@dataclass(frozen=True)
+class StrategyChanged:
+    """ A mob has got a strategy of another kind, for example has become confused or has recovered. """
+    mob: 'src.fighter.Mob'
+    old_strategy: 'src.strategies.FightingStrategy'
+    new_strategy: 'src.strategies.FightingStrategy'
+
+
+@dataclass(frozen=True)
+class WeaponSelected:
+    """ The player has selected another weapon, used_weapon is its index in the inventory or None. """
+    player: 'src.fighter.Player'
+    used_weapon: Optional[int]
+
+
+class EventBus:
+    """ Class delivering the events to the handlers subscribed to their types.
+
+    The handlers are called synchronously in the order of subscription, right after the change.
+    The fighters check is_subscribed before creating an event, so an event nobody listens to
+    costs a dictionary lookup.
+    """
+
+    def __init__(self):
+        """ Initializes a bus without subscribers. """
+        self._handlers: Dict[type, List[Callable]] = dict()
+
+    def subscribe(self, event_type: type, handler: Callable):
+        """ Makes the handler be called with every event of the given type. """
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type: type, handler: Callable):
+        """ Stops calling the handler with the events of the given type.
+
+        :raises ValueError if the handler is not subscribed to the type.
+        """
+        handlers = self._handlers.get(event_type, [])
+        handlers.remove(handler)
+        if not handlers:
+            del self._handlers[event_type]
+
+    def is_subscribed(self, event_type: type) -> bool:
+        """ Checks whether any handler is subscribed to the events of the given type. """
+        return event_type in self._handlers
+
+    def emit(self, event):
+        """ Calls the handlers subscribed to the type of the event. """
+        for handler in self._handlers.get(type(event), ()):
+            handler(event)
@@ -1,12 +1,15 @@
 """ Module containing the implementation of various in-game fighters. """
+import copy
+import random
 from abc import abstractmethod, ABC
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
+import src.events
 import src.model
 import src.world_map
 import src.strategies
-from src.weapon import Weapon
+from src.weapon import Weapon, WeaponBuilder
 
 PLAYER_HP = 20
 MOB_HP = 10
@@ -26,12 +29,30 @@ class PlayerIntention(Enum):
 
 class Fighter(ABC):
     """ Class for storing the various in-game fighter characters. """
+    __slots__ = ('_event_bus', '_position', 'hp')
 
     def __init__(self, position: 'src.model.Position'):
         """ Initializes a fighter with the given initial position. """
-        self.position = position
+        self._event_bus = None
+        self._position = position
         self.hp = None
 
+    @property
+    def position(self) -> 'src.model.Position':
+        """ The position of the fighter, its changes are reported as FighterMoved events. """
+        return self._position
+
+    @position.setter
+    def position(self, new_position: 'src.model.Position'):
+        old_position = self._position
+        self._position = new_position
+        if self._event_bus is not None and self._event_bus.is_subscribed(src.events.FighterMoved):
+            self._event_bus.emit(src.events.FighterMoved(self, old_position, new_position))
+
+    def set_event_bus(self, event_bus: 'Optional[src.events.EventBus]'):
+        """ Sets the bus the changes of the fighter are reported to, None to report them nowhere. """
+        self._event_bus = event_bus
+
     def move(self, new_position: 'src.model.Position'):
         """ Changes the fighter's position. """
         self.position = new_position
@@ -40,6 +61,20 @@ class Fighter(ABC):
         """ Deals the given amount of damage to the fighter. """
         damage = min(damage, self.hp)
         self.hp -= damage
+        if self._event_bus is None or damage <= 0:
+            return
+        if self._event_bus.is_subscribed(src.events.FighterDamaged):
+            self._event_bus.emit(src.events.FighterDamaged(self, damage, self.hp))
+        if self.hp <= 0 and self._event_bus.is_subscribed(src.events.FighterDied):
+            self._event_bus.emit(src.events.FighterDied(self))
+
+    def copy(self) -> 'Fighter':
+        """ Returns a copy of the fighter which can be changed independently of it. """
+        return copy.copy(self)
+
+    def is_choice_stateful(self) -> bool:
+        """ Checks whether choosing a move changes the fighter itself. """
+        return False
 
     @abstractmethod
     def get_attack(self) -> int:
@@ -53,6 +88,7 @@ class Fighter(ABC):
 
 class Player(Fighter):
     """ Class for storing the player-controlled fighter character. """
+    __slots__ = ('inventory', 'used_weapon', '_intentions')
 
     def __init__(self, position: 'src.model.Position', inventory: List[Weapon] = None,
                  used_weapon=None, hp: int = PLAYER_HP):
@@ -65,6 +101,14 @@ class Player(Fighter):
         self.used_weapon = used_weapon
         self._intentions = []
 
+    def copy(self) -> 'Player':
+        player = super(Player, self).copy()
+        player._intentions = list(self._intentions)
+        return player
+
+    def is_choice_stateful(self) -> bool:
+        return self.has_intention()
+
     def _add_intention(self, new_intention: PlayerIntention):
         """ Sets the fighter's move intention to a new one. """
         self._intentions.append(new_intention)
@@ -93,6 +137,8 @@ class Player(Fighter):
             self.used_weapon = None
         else:
             self.used_weapon = num
+        if self._event_bus is not None and self._event_bus.is_subscribed(src.events.WeaponSelected):
+            self._event_bus.emit(src.events.WeaponSelected(self, self.used_weapon))
 
     def choose_move(self, _current_model: 'src.model.Model'):
         """ Chooses a move for the player based on the current intentions. """
@@ -142,6 +188,7 @@ class Player(Fighter):
 
 class Mob(Fighter):
     """ Class for storing NPC mobs. """
+    __slots__ = ('fighting_strategy',)
 
     def __init__(self, position: 'src.model.Position',
                  fighting_strategy: 'src.strategies.FightingStrategy', hp: int = MOB_HP):
@@ -153,12 +200,61 @@ class Mob(Fighter):
     def get_attack(self) -> int:
         return MOB_ATTACK
 
+    def is_choice_stateful(self) -> bool:
+        return self.fighting_strategy.is_stateful()
+
     def become_confused(self, time: int):
         """ The mob becomes confused for a chosen amount of ticks. """
-        self.fighting_strategy = src.strategies.ConfusedStrategy(self.fighting_strategy, time)
+        self._set_strategy(src.strategies.ConfusedStrategy(self.fighting_strategy, time))
 
     def choose_move(self, current_model: 'src.model.Model'):
         """ Chooses a move for the mob based on its strategy. """
         chosen_move = self.fighting_strategy.choose_move(current_model, self)
-        self.fighting_strategy = self.fighting_strategy.update_strategy()
+        self.update_strategy()
         return chosen_move
+
+    def update_strategy(self):
+        """ Lets the strategy count a move choice, which ends the confusion after its time. """
+        self._set_strategy(self.fighting_strategy.update_strategy())
+
+    def _set_strategy(self, strategy: 'src.strategies.FightingStrategy'):
+        """ Changes the strategy, reporting the change if the strategy is of another kind. """
+        old_strategy = self.fighting_strategy
+        self.fighting_strategy = strategy
+        if self._event_bus is not None and type(strategy) is not type(old_strategy) \
+                and self._event_bus.is_subscribed(src.events.StrategyChanged):
+            self._event_bus.emit(src.events.StrategyChanged(self, old_strategy, strategy))
+
+
+def create_random_mob(position: 'src.model.Position', smart: bool = False) -> Mob:
+    """ Creates a mob in the given position with a randomly chosen non-confused strategy.
+
+    If smart is set, the mobs which would be aggressive search their moves ahead with LookaheadStrategy.
+    """
+    aggressive_strategy = src.strategies.LookaheadStrategy() if smart else src.strategies.AggressiveStrategy()
+    return Mob(position, random.choice([aggressive_strategy,
+                                        src.strategies.PassiveStrategy(),
+                                        src.strategies.CowardlyStrategy()]))
+
+
+def create_player(position: 'src.model.Position') -> Player:
+    """ Creates a player in the given position with the starting set of weapons. """
+    return Player(position, [
+        WeaponBuilder()
+        .with_name('SABER')
+        .with_attack(2)
+        .with_defence(2)
+        .with_confusion_prob(0.2)
+        .build(),
+        WeaponBuilder()
+        .with_name('SPEAR')
+        .with_attack(4)
+        .with_defence(1)
+        .with_confusion_prob(0.1)
+        .build(),
+        WeaponBuilder()
+        .with_name('SWORD')
+        .with_attack(1)
+        .with_defence(3)
+        .with_confusion_prob(0.7)
+        .build()])
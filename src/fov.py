@@ -0,0 +1,129 @@
+""" Module containing the field of view computation. """
+from collections import OrderedDict
+from typing import FrozenSet, Tuple
+
+import src.world_map
+
+SIGHT_RADIUS = 8
+
+# The transformations of the first octant's coordinates into each of the eight octants.
+_OCTANTS = [(1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+            (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1)]
+
+
+class FieldOfView:
+    """ Class computing the tiles visible from a position of a map with recursive shadowcasting.
+
+    The walls block the sight and are visible themselves. The results are cached by the
+    origin, the radius and the version of the map. The transparency of the tiles around the
+    last origin is kept in a window, which is shifted when the origin moves by one tile, so
+    only the newly uncovered row or column of tiles is read from the map.
+    """
+    _DEFAULT_CACHED_RESULTS = 16
+
+    def __init__(self, game_map, cached_results: int = _DEFAULT_CACHED_RESULTS):
+        """ Initializes a field of view of the given map keeping up to cached_results results.
+
+        :raises ValueError if cached_results is not positive.
+        """
+        if cached_results <= 0:
+            raise ValueError('Invalid cached result count')
+        self.map = game_map
+        self.cached_results = cached_results
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._window = None
+        self._window_key = None
+
+    def get_visible(self, origin: 'src.world_map.Position', radius: int = SIGHT_RADIUS) -> FrozenSet[Tuple[int, int]]:
+        """ Returns the set of the (x, y) coordinates of the tiles visible from origin within radius. """
+        key = (origin.x, origin.y, radius, self.map.get_version())
+        visible = self._results.get(key)
+        if visible is not None:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return visible
+        self.misses += 1
+        self._update_window(*key)
+        visible = self._cast(origin.x, origin.y, radius)
+        self._results[key] = visible
+        if len(self._results) > self.cached_results:
+            self._results.popitem(last=False)
+        return visible
+
+    def is_visible(self, origin: 'src.world_map.Position', position: 'src.world_map.Position',
+                   radius: int = SIGHT_RADIUS) -> bool:
+        """ Checks whether the position is visible from origin within radius. """
+        return (position.x, position.y) in self.get_visible(origin, radius)
+
+    def _update_window(self, x: int, y: int, radius: int, version: int):
+        """ Makes the window hold the transparency of the tiles within radius from (x, y). """
+        size = 2 * radius + 1
+        previous = self._window_key
+        self._window_key = (x, y, radius, version)
+        if previous is not None and previous[2:] == (radius, version) \
+                and abs(previous[0] - x) + abs(previous[1] - y) == 1:
+            low_x, low_y = x - radius, y - radius
+            if x == previous[0] + 1:
+                self._window = self._window[1:] + [self._read_row(x + radius, low_y, size)]
+            elif x == previous[0] - 1:
+                self._window = [self._read_row(low_x, low_y, size)] + self._window[:-1]
+            elif y == previous[1] + 1:
+                for i, row in enumerate(self._window):
+                    row.append(self._is_transparent(low_x + i, y + radius))
+                    del row[0]
+            else:
+                for i, row in enumerate(self._window):
+                    row.insert(0, self._is_transparent(low_x + i, low_y))
+                    del row[-1]
+            return
+        self._window = [self._read_row(x - radius + i, y - radius, size) for i in range(size)]
+
+    def _read_row(self, x: int, low_y: int, size: int) -> bytearray:
+        return bytearray(self._is_transparent(x, low_y + j) for j in range(size))
+
+    def _is_transparent(self, x: int, y: int) -> int:
+        return 1 if self.map.is_empty(src.world_map.Position(x, y)) else 0
+
+    def _cast(self, x: int, y: int, radius: int) -> FrozenSet[Tuple[int, int]]:
+        """ Runs the shadowcasting from the center of the window in all of the octants. """
+        window = self._window
+        visible = {(x, y)}
+
+        def cast_light(row, start, end, xx, xy, yx, yy):
+            if start < end:
+                return
+            new_start = start
+            for distance in range(row, radius + 1):
+                blocked = False
+                dy = -distance
+                for dx in range(-distance, 1):
+                    left_slope = (dx - 0.5) / (dy + 0.5)
+                    right_slope = (dx + 0.5) / (dy - 0.5)
+                    if start < right_slope:
+                        continue
+                    if end > left_slope:
+                        break
+                    # The coordinates relative to the origin, then in the window.
+                    cell_x = dx * xx + dy * xy
+                    cell_y = dx * yx + dy * yy
+                    is_opaque = not window[cell_x + radius][cell_y + radius]
+                    if dx * dx + dy * dy <= radius * radius:
+                        visible.add((x + cell_x, y + cell_y))
+                    if blocked:
+                        if is_opaque:
+                            new_start = right_slope
+                        else:
+                            blocked = False
+                            start = new_start
+                    elif is_opaque and distance < radius:
+                        blocked = True
+                        cast_light(distance + 1, start, left_slope, xx, xy, yx, yy)
+                        new_start = right_slope
+                if blocked:
+                    break
+
+        for octant in _OCTANTS:
+            cast_light(1, 1.0, 0.0, *octant)
+        return frozenset(visible)
@@ -0,0 +1,98 @@
+""" Module containing the index of the free tiles of a map. """
+import random
+from typing import Iterable, List
+
+from src.world_map import MapTile, Position, WorldMap
+
+
+class FreeCellIndex:
+    """ Class keeping the set of the empty tiles of a map that are not occupied by any fighter.
+
+    The free tiles are stored in an array together with a lookup from a tile to its place in
+    the array, a tile is removed by swapping it with the last one. So occupying and releasing
+    a tile and sampling a uniformly random free tile all take constant time.
+    """
+    _MAX_REJECTED_SAMPLES = 64
+
+    def __init__(self, game_map: WorldMap, occupied: Iterable[Position] = ()):
+        """ Builds the index of the given map with the given positions occupied. """
+        self.map = game_map
+        self._cells = []
+        self._slots = dict()
+        for x in range(game_map.height):
+            for y in range(game_map.width):
+                if game_map.tiles[x][y] == MapTile.EMPTY:
+                    self._slots[(x, y)] = len(self._cells)
+                    self._cells.append((x, y))
+        for position in occupied:
+            self.occupy(position)
+
+    def __len__(self):
+        return len(self._cells)
+
+    def is_free(self, position: Position) -> bool:
+        """ Checks whether the tile is empty and not occupied. """
+        return (position.x, position.y) in self._slots
+
+    def occupy(self, position: Position):
+        """ Marks the tile as occupied, does nothing if it is not free. """
+        slot = self._slots.pop((position.x, position.y), None)
+        if slot is None:
+            return
+        last = self._cells.pop()
+        if slot < len(self._cells):
+            self._cells[slot] = last
+            self._slots[last] = slot
+
+    def release(self, position: Position):
+        """ Marks the tile as not occupied, does nothing if it is not an empty tile of the map. """
+        key = (position.x, position.y)
+        if key in self._slots or not self.map.is_empty(position):
+            return
+        self._slots[key] = len(self._cells)
+        self._cells.append(key)
+
+    def move(self, old_position: Position, new_position: Position):
+        """ Notes that a fighter moved from the old position to the new one. """
+        if old_position != new_position:
+            self.release(old_position)
+            self.occupy(new_position)
+
+    def update_tile(self, position: Position, occupied: bool = False):
+        """ Notes that the tile of the map in the given position has changed. """
+        if self.map.is_empty(position) and not occupied:
+            self.release(position)
+        else:
+            self.occupy(position)
+
+    def sample(self) -> Position:
+        """ Returns a uniformly random free tile.
+
+        :raises IndexError if there are no free tiles.
+        """
+        if not self._cells:
+            raise IndexError('No free tiles')
+        x, y = self._cells[random.randrange(len(self._cells))]
+        return Position(x, y)
+
+    def sample_far_from(self, center: Position, min_distance: int, count: int = 1) -> List[Position]:
+        """ Returns up to count different random free tiles at distance of at least min_distance from center.
+
+        The tiles are sampled uniformly with rejection, which takes constant time while most of
+        the free tiles are far enough. If too many samples are rejected, the suitable tiles are
+        collected by a scan of the free tiles instead.
+        """
+        chosen = dict()
+        rejected = 0
+        while len(chosen) < count and self._cells and rejected < FreeCellIndex._MAX_REJECTED_SAMPLES:
+            x, y = self._cells[random.randrange(len(self._cells))]
+            if abs(x - center.x) + abs(y - center.y) >= min_distance and (x, y) not in chosen:
+                chosen[(x, y)] = True
+            else:
+                rejected += 1
+        if len(chosen) < count:
+            suitable = [cell for cell in self._cells
+                        if abs(cell[0] - center.x) + abs(cell[1] - center.y) >= min_distance and cell not in chosen]
+            for cell in random.sample(suitable, min(count - len(chosen), len(suitable))):
+                chosen[cell] = True
+        return [Position(x, y) for x, y in chosen]
@@ -0,0 +1,297 @@
+""" Module containing the hierarchical pathfinding (HPA*) over a precomputed graph of map regions.
+
+The map is split into square clusters. The empty tiles on the both sides of a cluster border form
+entrances, every entrance gets one or two pairs of portal nodes. The portals of one cluster are
+connected by the lengths of the shortest paths between them inside the cluster. A path query
+connects the start and the goal to the portals of their clusters, searches the small graph of
+portals with A* and refines the found path to single steps only when they are walked. The paths
+are not always the shortest ones, as they pass through the portals, but are close to them.
+
+The graph can be stored next to a map file and is reused as long as the map does not change:
+    python3 -m src.hpa maps/rooms [--cluster_size N]
+"""
+import hashlib
+import heapq
+import json
+import os
+import zlib
+from argparse import ArgumentParser
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.world_map import FileWorldMapSource, MapTile, Position, WorldMap
+
+GRAPH_FILE_SUFFIX = '.hpa'
+
+
+def get_tiles_hash(game_map: WorldMap) -> str:
+    """ Returns a hash of the map's tiles. """
+    digest = hashlib.sha1()
+    digest.update('{}x{}'.format(game_map.height, game_map.width).encode())
+    for row in game_map.tiles:
+        digest.update(bytes(tile.value for tile in row))
+    return digest.hexdigest()
+
+
+class HierarchicalPath:
+    """ A path found by the pathfinder, refined to single steps lazily while it is walked. """
+
+    def __init__(self, pathfinder: 'HierarchicalPathfinder', waypoints: List[Tuple[int, int]], length: int):
+        """ Initializes a path through the given waypoints with the given total length. """
+        self.pathfinder = pathfinder
+        self.waypoints = waypoints
+        self.length = length
+
+    def __iter__(self) -> Iterator[Position]:
+        """ Yields the positions of the path one by one, from the start to the goal. """
+        yield Position(*self.waypoints[0])
+        for begin, end in zip(self.waypoints, self.waypoints[1:]):
+            for x, y in self.pathfinder.refine(begin, end):
+                yield Position(x, y)
+
+
+class HierarchicalPathfinder:
+    """ Class answering the path queries on a map with HPA*. """
+    _DEFAULT_CLUSTER_SIZE = 12
+    _LONG_ENTRANCE = 6
+    _FORMAT_VERSION = 1
+
+    def __init__(self, game_map: WorldMap, cluster_size: int = _DEFAULT_CLUSTER_SIZE, build: bool = True):
+        """ Initializes a pathfinder of the given map, precomputing its graph if build is True.
+
+        :raises ValueError if the cluster size is less than 2.
+        """
+        if cluster_size < 2:
+            raise ValueError('Invalid cluster size')
+        self.map = game_map
+        self.cluster_size = cluster_size
+        self.nodes = []
+        self.edges = []
+        self._node_ids = dict()
+        self._cluster_nodes = dict()
+        if build:
+            self._build()
+
+    @staticmethod
+    def load_or_build(game_map: WorldMap, graph_path: str,
+                      cluster_size: int = _DEFAULT_CLUSTER_SIZE) -> 'HierarchicalPathfinder':
+        """ Loads the pathfinder's graph from a file, or builds and stores it if the file is missing or stale. """
+        try:
+            with open(graph_path, 'rb') as file:
+                data = json.loads(zlib.decompress(file.read()).decode())
+            if data['version'] == HierarchicalPathfinder._FORMAT_VERSION and \
+                    data['cluster_size'] == cluster_size and data['hash'] == get_tiles_hash(game_map):
+                pathfinder = HierarchicalPathfinder(game_map, cluster_size, build=False)
+                for x, y in data['nodes']:
+                    pathfinder._add_node(x, y)
+                for first, second, cost in data['edges']:
+                    pathfinder._add_edge(first, second, cost)
+                return pathfinder
+        except (IOError, ValueError, KeyError, zlib.error):
+            pass
+        pathfinder = HierarchicalPathfinder(game_map, cluster_size)
+        try:
+            pathfinder.save(graph_path)
+        except IOError:
+            pass
+        return pathfinder
+
+    def save(self, graph_path: str):
+        """ Stores the pathfinder's graph in a file. """
+        edges = [[first, second, cost] for first, neighbors in enumerate(self.edges)
+                 for second, cost in neighbors.items() if first < second]
+        data = {'version': HierarchicalPathfinder._FORMAT_VERSION,
+                'cluster_size': self.cluster_size,
+                'hash': get_tiles_hash(self.map),
+                'nodes': self.nodes,
+                'edges': edges}
+        with open(graph_path, 'wb') as file:
+            file.write(zlib.compress(json.dumps(data, separators=(',', ':')).encode()))
+
+    def find_path(self, start: Position, goal: Position) -> Optional[HierarchicalPath]:
+        """ Returns a near-shortest path between the positions, or None if there is none. """
+        if not self.map.is_empty(start) or not self.map.is_empty(goal):
+            return None
+        start_cell = (start.x, start.y)
+        goal_cell = (goal.x, goal.y)
+        if start_cell == goal_cell:
+            return HierarchicalPath(self, [start_cell], 0)
+
+        start_links, direct_length = self._link(start_cell, goal_cell)
+        goal_links, _ = self._link(goal_cell, None)
+        best_length = direct_length
+        waypoints = [start_cell, goal_cell] if direct_length is not None else None
+
+        # A* over the portals, the start and the goal being the virtual nodes -1 and -2. Of the nodes with
+        # equal estimates the farther from the start ones go first, which saves expanding the most of them.
+        goal_x, goal_y = goal_cell
+        nodes = self.nodes
+        distances = {-1: 0}
+        parents = dict()
+        queue = [(self._get_heuristic(start_cell, goal_cell), 0, -1)]
+        while queue:
+            estimate, negative_distance, node = heapq.heappop(queue)
+            distance = -negative_distance
+            if best_length is not None and estimate >= best_length:
+                break
+            if distance > distances[node]:
+                continue
+            if node == -2:
+                best_length = distance
+                waypoints = self._collect_waypoints(parents, start_cell, goal_cell)
+                break
+            if node in goal_links:
+                new_distance = distance + goal_links[node]
+                if new_distance < distances.get(-2, new_distance + 1):
+                    distances[-2] = new_distance
+                    parents[-2] = node
+                    heapq.heappush(queue, (new_distance, -new_distance, -2))
+            for neighbor, cost in (start_links if node == -1 else self.edges[node]).items():
+                new_distance = distance + cost
+                if new_distance < distances.get(neighbor, new_distance + 1):
+                    distances[neighbor] = new_distance
+                    parents[neighbor] = node
+                    x, y = nodes[neighbor]
+                    estimate = new_distance + abs(x - goal_x) + abs(y - goal_y)
+                    heapq.heappush(queue, (estimate, -new_distance, neighbor))
+
+        if waypoints is None:
+            return None
+        return HierarchicalPath(self, waypoints, best_length)
+
+    def refine(self, begin: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """ Returns the steps of a shortest path from begin to end lying in one cluster, without begin. """
+        if abs(begin[0] - end[0]) + abs(begin[1] - end[1]) == 1:
+            return [end]
+        parents = self._search_cluster(begin, {end})[1]
+        steps = []
+        cell = end
+        while cell != begin:
+            steps.append(cell)
+            cell = parents[cell]
+        steps.reverse()
+        return steps
+
+    def _build(self):
+        size = self.cluster_size
+        # Entrances across the horizontal cluster borders, then across the vertical ones.
+        for border in range(size, self.map.height, size):
+            self._add_entrances([((border - 1, y), (border, y)) for y in range(self.map.width)], 1)
+        for border in range(size, self.map.width, size):
+            self._add_entrances([((x, border - 1), (x, border)) for x in range(self.map.height)], 0)
+        for cluster, node_ids in self._cluster_nodes.items():
+            for node in node_ids:
+                targets = {self.nodes[other] for other in node_ids if other > node}
+                distances = self._search_cluster(self.nodes[node], targets)[0]
+                for other in node_ids:
+                    cell = self.nodes[other]
+                    if other > node and cell in distances:
+                        self._add_edge(node, other, distances[cell])
+
+    def _add_entrances(self, pairs, along: int):
+        """ Adds the portals of the entrances formed by the pairs of tiles facing each other across a border. """
+        run = []
+        for first, second in pairs + [(None, None)]:
+            is_open = first is not None and self._is_empty(first) and self._is_empty(second)
+            if run and (not is_open or first[along] % self.cluster_size == 0):
+                transitions = [run[0], run[-1]] if len(run) >= HierarchicalPathfinder._LONG_ENTRANCE \
+                    else [run[len(run) // 2]]
+                for near, far in transitions:
+                    self._add_edge(self._add_node(*near), self._add_node(*far), 1)
+                run = []
+            if is_open:
+                run.append((first, second))
+
+    def _add_node(self, x: int, y: int) -> int:
+        if (x, y) in self._node_ids:
+            return self._node_ids[(x, y)]
+        node = len(self.nodes)
+        self._node_ids[(x, y)] = node
+        self.nodes.append((x, y))
+        self.edges.append(dict())
+        self._cluster_nodes.setdefault(self._get_cluster((x, y)), []).append(node)
+        return node
+
+    def _add_edge(self, first: int, second: int, cost: int):
+        if cost < self.edges[first].get(second, cost + 1):
+            self.edges[first][second] = cost
+            self.edges[second][first] = cost
+
+    def _link(self, cell: Tuple[int, int], other: Optional[Tuple[int, int]]):
+        """ Returns the distances from the cell to the portals of its cluster and to the other cell if it is there. """
+        node_ids = self._cluster_nodes.get(self._get_cluster(cell), [])
+        targets = {self.nodes[node] for node in node_ids}
+        if other is not None and self._get_cluster(other) == self._get_cluster(cell):
+            targets.add(other)
+        distances = self._search_cluster(cell, targets)[0]
+        links = {node: distances[self.nodes[node]] for node in node_ids if self.nodes[node] in distances}
+        return links, distances.get(other)
+
+    def _search_cluster(self, start: Tuple[int, int], targets) -> Tuple[Dict, Dict]:
+        """ Runs a breadth-first search from start inside its cluster until all of the targets are reached. """
+        cluster_x, cluster_y = self._get_cluster(start)
+        low_x, low_y = cluster_x * self.cluster_size, cluster_y * self.cluster_size
+        high_x = min(low_x + self.cluster_size, self.map.height)
+        high_y = min(low_y + self.cluster_size, self.map.width)
+        tiles = self.map.tiles
+        distances = {start: 0}
+        parents = dict()
+        remaining = len(targets - {start})
+        queue = deque([start])
+        while queue and remaining > 0:
+            cell = queue.popleft()
+            x, y = cell
+            distance = distances[cell] + 1
+            for neighbor in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                if neighbor in distances:
+                    continue
+                neighbor_x, neighbor_y = neighbor
+                if low_x <= neighbor_x < high_x and low_y <= neighbor_y < high_y \
+                        and tiles[neighbor_x][neighbor_y] == MapTile.EMPTY:
+                    distances[neighbor] = distance
+                    parents[neighbor] = cell
+                    if neighbor in targets:
+                        remaining -= 1
+                    queue.append(neighbor)
+        return distances, parents
+
+    def _collect_waypoints(self, parents, start_cell, goal_cell):
+        waypoints = [goal_cell]
+        node = parents[-2]
+        while node != -1:
+            waypoints.append(self.nodes[node])
+            node = parents[node]
+        waypoints.append(start_cell)
+        waypoints.reverse()
+        return waypoints
+
+    def _get_cluster(self, cell) -> Tuple[int, int]:
+        return cell[0] // self.cluster_size, cell[1] // self.cluster_size
+
+    def _is_empty(self, cell) -> bool:
+        return 0 <= cell[0] < self.map.height and 0 <= cell[1] < self.map.width \
+            and self.map.tiles[cell[0]][cell[1]] == MapTile.EMPTY
+
+    @staticmethod
+    def _get_heuristic(cell, goal_cell) -> int:
+        return abs(cell[0] - goal_cell[0]) + abs(cell[1] - goal_cell[1])
+
+
+def main():
+    """ Precomputes the pathfinding graphs of the given map files and stores them next to the maps. """
+    parser = ArgumentParser(description='Precomputes the pathfinding graphs of map files.')
+    parser.add_argument('map_paths', type=str, nargs='+', help='paths to the map files')
+    parser.add_argument('--cluster_size', type=int, default=HierarchicalPathfinder._DEFAULT_CLUSTER_SIZE)
+    args = parser.parse_args()
+    for map_path in args.map_paths:
+        game_map = FileWorldMapSource(map_path).get()
+        graph_path = map_path + GRAPH_FILE_SUFFIX
+        if os.path.isfile(graph_path):
+            os.remove(graph_path)
+        pathfinder = HierarchicalPathfinder.load_or_build(game_map, graph_path, args.cluster_size)
+        print('{}: {} portals, {} edges'.format(map_path, len(pathfinder.nodes),
+                                                sum(map(len, pathfinder.edges)) // 2))
+
+
+if __name__ == '__main__':
+    main()
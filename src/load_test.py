@@ -0,0 +1,110 @@
+""" Module containing a load generator for the game server.
+
+The generator starts a server in a separate process, plays many sessions on it with random
+commands and reports the p99 tick latency measured by the server, the p99 latency of a command
+as seen by the clients and the amount of sessions a single fully loaded core could sustain
+with the given command rate.
+"""
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from argparse import ArgumentParser
+
+from src.server import DEFAULT_HOST, GameServer, get_percentile
+from src.world_map import FileWorldMapSource
+
+MOVE_COMMANDS = ['go_up', 'go_left', 'go_down', 'go_right', 'stay']
+
+
+def _serve(map_path: str, host: str, port: int, mob_count: int):
+    server = GameServer(lambda: FileWorldMapSource(map_path), mob_count)
+
+    async def serve():
+        asyncio_server = await server.start(host, port)
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+
+    asyncio.run(serve())
+
+
+async def _request(host: str, port: int, request):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps(request) + '\n').encode())
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    return response
+
+
+async def _play(host: str, port: int, rate: float, deadline: float, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "new"}\n')
+    await writer.drain()
+    await reader.readline()
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(random.expovariate(rate))
+        start = time.perf_counter()
+        writer.write((json.dumps({'op': 'command', 'command': random.choice(MOVE_COMMANDS)}) + '\n').encode())
+        await writer.drain()
+        update = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if update.get('dead'):
+            writer.write(b'{"op": "new"}\n')
+            await writer.drain()
+            await reader.readline()
+    writer.close()
+
+
+async def run_load(host: str, port: int, sessions: int, rate: float, duration: float):
+    """ Plays the given amount of sessions for duration seconds and returns the load report. """
+    latencies = []
+    before = await _request(host, port, {'op': 'stats'})
+    start = time.perf_counter()
+    await asyncio.gather(*[_play(host, port, rate, start + duration, latencies) for _ in range(sessions)])
+    wall_time = time.perf_counter() - start
+    after = await _request(host, port, {'op': 'stats'})
+    cpu_time = max(after['cpu'] - before['cpu'], 1e-9)
+    return {'sessions': sessions,
+            'ticks': after['ticks'] - before['ticks'],
+            'ticks_per_second': (after['ticks'] - before['ticks']) / wall_time,
+            'server_cpu_load': cpu_time / wall_time,
+            'sessions_per_core': sessions * wall_time / cpu_time,
+            'tick_p99_ms': after['p99'] * 1000,
+            'command_p99_ms': get_percentile(latencies, 99) * 1000}
+
+
+def main():
+    """ Runs the load generator against a freshly started server and prints the report. """
+    parser = ArgumentParser(description='A load generator for the rogue-like game server.')
+    parser.add_argument('--map', type=str, default='maps/rooms', help='path to the map file of every session')
+    parser.add_argument('--port', type=int, default=7778)
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--mobs', type=int, default=8, help='amount of mobs in a session')
+    parser.add_argument('--rate', type=float, default=5.0, help='commands per second sent by one session')
+    parser.add_argument('--duration', type=float, default=10.0, help='length of the run in seconds')
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=_serve, args=(args.map, DEFAULT_HOST, args.port, args.mobs), daemon=True)
+    server.start()
+    try:
+        report = asyncio.run(_run_when_ready(args))
+    finally:
+        server.terminate()
+    for key, value in report.items():
+        print('{:<20}{:.3f}'.format(key, value) if isinstance(value, float) else '{:<20}{}'.format(key, value))
+
+
+async def _run_when_ready(args):
+    for _ in range(100):
+        try:
+            await _request(DEFAULT_HOST, args.port, {'op': 'stats'})
+            break
+        except ConnectionError:
+            await asyncio.sleep(0.1)
+    return await run_load(DEFAULT_HOST, args.port, args.sessions, args.rate, args.duration)
+
+
+if __name__ == '__main__':
+    main()
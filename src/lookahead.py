@@ -0,0 +1,254 @@
+""" Module containing the lookahead search of the moves for the mobs using LookaheadStrategy. """
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import src.fighting_system
+import src.strategies
+import src.world_map
+
+LOOKAHEAD_DEPTH = 3
+TICK_BUDGET = 0.01
+
+_NEIGHBOR_DELTAS = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+_WIN_VALUE = 1000
+_NODES_PER_CLOCK_CHECK = 256
+
+
+@dataclass(frozen=True)
+class LookaheadProblem:
+    """ Class storing the part of the world a mob searches its move in, small enough to send to another process.
+
+    The cells outside of the box around the mob and the player count as blocked.
+    """
+    blocked: FrozenSet[Tuple[int, int]]
+    box: Tuple[int, int, int, int]
+    mob: Tuple[int, int]
+    mob_hp: int
+    mob_attack: int
+    player: Tuple[int, int]
+    player_hp: int
+    player_attack: int
+    player_defence: int
+    confusion_prob: float
+    max_depth: int
+
+
+class _Timeout(Exception):
+    pass
+
+
+def search(problem: LookaheadProblem, deadline: float) -> Optional[Tuple[int, int]]:
+    """ Returns the best first move of the mob, or None if not even a one round search ends before the deadline.
+
+    A round is a move of the mob and an answer of the player, who is assumed to play the best
+    for them, while their attack confuses the mob with its probability, as in CoolFightingSystem.
+    The search is deepened by a round at a time until the deadline or max_depth, and the move
+    found by the deepest finished search is returned.
+    """
+    best_move = None
+    # The values are kept between the depths, a deeper search reuses the shallower values of its states.
+    state_search = _Search(problem, deadline)
+    for depth in range(1, problem.max_depth + 1):
+        try:
+            best_move = state_search.get_best_move(depth)
+        except _Timeout:
+            break
+    return best_move
+
+
+class _Search:
+    """ Expectiminimax search over the states (mob, player, mob hp, player hp, confused ticks). """
+
+    def __init__(self, problem: LookaheadProblem, deadline: float):
+        self.problem = problem
+        self.deadline = deadline
+        self.nodes = 0
+        self.mob_damage = max(0, problem.mob_attack - problem.player_defence)
+        self.confusion_time = src.fighting_system.CONFUSION_TIME
+        self._values = dict()
+
+    def get_best_move(self, depth: int) -> Tuple[int, int]:
+        problem = self.problem
+        state = (problem.mob, problem.player, problem.mob_hp, problem.player_hp, 0)
+        best_move, best_value = problem.mob, None
+        for move in self._get_moves(problem.mob):
+            value = self._player_value(self._move_mob(state, move), depth)
+            if best_value is None or value > best_value:
+                best_move, best_value = move, value
+        return best_move
+
+    def _is_open(self, cell: Tuple[int, int]) -> bool:
+        low_x, low_y, high_x, high_y = self.problem.box
+        return low_x <= cell[0] <= high_x and low_y <= cell[1] <= high_y and cell not in self.problem.blocked
+
+    def _get_moves(self, cell: Tuple[int, int]):
+        """ Returns the cell itself and its open neighbours. """
+        moves = [cell]
+        for dx, dy in _NEIGHBOR_DELTAS:
+            neighbor = (cell[0] + dx, cell[1] + dy)
+            if self._is_open(neighbor):
+                moves.append(neighbor)
+        return moves
+
+    def _move_mob(self, state, move):
+        mob, player, mob_hp, player_hp, confused = state
+        if move == player:
+            return mob, player, mob_hp, player_hp - self.mob_damage, confused
+        return move, player, mob_hp, player_hp, confused
+
+    def _evaluate(self, state) -> float:
+        mob, player, mob_hp, player_hp, _ = state
+        if player_hp <= 0:
+            return _WIN_VALUE
+        if mob_hp <= 0:
+            return -_WIN_VALUE
+        distance = abs(mob[0] - player[0]) + abs(mob[1] - player[1])
+        return 10 * (self.problem.player_hp - player_hp) - 5 * (self.problem.mob_hp - mob_hp) - distance
+
+    def _check_clock(self):
+        self.nodes += 1
+        if self.nodes % _NODES_PER_CLOCK_CHECK == 0 and time.time() > self.deadline:
+            raise _Timeout()
+
+    def _mob_value(self, state, depth: int) -> float:
+        """ Returns the value of the state before the mob moves, with depth rounds left. """
+        if depth == 0 or state[2] <= 0 or state[3] <= 0:
+            return self._evaluate(state)
+        key = (state, depth)
+        value = self._values.get(key)
+        if value is not None:
+            return value
+        self._check_clock()
+        mob, player, mob_hp, player_hp, confused = state
+        if confused:
+            # A confused mob moves to a random open neighbour, attacking the player if it is there.
+            moves = self._get_moves(mob)[1:] or [mob]
+            state = (mob, player, mob_hp, player_hp, confused - 1)
+            value = sum(self._player_value(self._move_mob(state, move), depth) for move in moves) / len(moves)
+        else:
+            value = max(self._player_value(self._move_mob(state, move), depth) for move in self._get_moves(mob))
+        self._values[key] = value
+        return value
+
+    def _player_value(self, state, depth: int) -> float:
+        """ Returns the value of the state after the mob moves, the player choosing the worst one for the mob. """
+        if state[2] <= 0 or state[3] <= 0:
+            return self._evaluate(state)
+        mob, player, mob_hp, player_hp, confused = state
+        value = None
+        for move in self._get_moves(player):
+            if move == mob:
+                hit = (mob, player, mob_hp - self.problem.player_attack, player_hp, confused)
+                confusion_prob = self.problem.confusion_prob
+                move_value = (1 - confusion_prob) * self._mob_value(hit, depth - 1)
+                if confusion_prob > 0:
+                    confused_hit = hit[:4] + (max(confused, self.confusion_time),)
+                    move_value += confusion_prob * self._mob_value(confused_hit, depth - 1)
+            else:
+                move_value = self._mob_value((mob, move, mob_hp, player_hp, confused), depth - 1)
+            if value is None or move_value < value:
+                value = move_value
+        return value
+
+
+class LookaheadPlanner:
+    """ Class running the searches of all of the mobs using LookaheadStrategy once per tick.
+
+    The searches share one time budget per tick. They are run in a process pool if workers
+    are given, or one after another otherwise, and the searches that do not end in the budget
+    are dropped, so a tick never waits for them.
+    """
+    # The share of the budget given to the searches, the rest is left for collecting the results.
+    _SEARCH_SHARE = 0.8
+
+    def __init__(self, budget: float = TICK_BUDGET, workers: int = 0, max_depth: int = LOOKAHEAD_DEPTH):
+        """ Initializes a planner spending up to budget seconds per tick.
+
+        :param workers: the amount of the searching processes, 0 to search in the calling thread.
+        :param max_depth: the maximal amount of the rounds searched.
+        :raises ValueError if a parameter is not positive, or workers is negative.
+        """
+        if budget <= 0 or workers < 0 or max_depth <= 0:
+            raise ValueError('Invalid lookahead planner parameters')
+        self.budget = budget
+        self.workers = workers
+        self.max_depth = max_depth
+        self._executor = None
+        self._futures = []
+        self._moves: Dict[Tuple[int, int], Tuple[int, int]] = dict()
+
+    def plan(self, current_model: 'src.model.Model'):
+        """ Searches the moves of the mobs using LookaheadStrategy which see the player. """
+        self._moves = dict()
+        mobs = [mob for mob in current_model.mobs
+                if isinstance(mob.fighting_strategy, src.strategies.LookaheadStrategy)
+                and current_model.is_player_visible_from(mob.position)]
+        if not mobs:
+            return
+        start = time.time()
+        deadline = start + self.budget
+        search_deadline = start + self.budget * LookaheadPlanner._SEARCH_SHARE
+        occupied = {(fighter.position.x, fighter.position.y) for fighter in current_model.get_fighters()}
+        problems = [self._get_problem(current_model, mob, occupied) for mob in mobs]
+
+        if self.workers == 0:
+            for i, (mob, problem) in enumerate(zip(mobs, problems)):
+                share = (search_deadline - time.time()) / (len(mobs) - i)
+                move = search(problem, time.time() + share)
+                if move is not None:
+                    self._moves[problem.mob] = move
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        # Every search gets its share of the time of the workers, but no search may pass the deadline.
+        share = self.budget * LookaheadPlanner._SEARCH_SHARE * min(1.0, self.workers / len(mobs))
+        futures = [self._executor.submit(_search_within, problem, share, search_deadline) for problem in problems]
+        self._futures = futures
+        wait(futures, timeout=max(0.0, deadline - time.time()))
+        for problem, future in zip(problems, futures):
+            if not future.done():
+                future.cancel()
+            elif future.exception() is None and future.result() is not None:
+                self._moves[problem.mob] = future.result()
+
+    def get_move(self, mob: 'src.fighter.Mob') -> 'Optional[src.world_map.Position]':
+        """ Returns the move planned for the mob in this tick, or None if its search has not ended in time. """
+        move = self._moves.pop((mob.position.x, mob.position.y), None)
+        if move is None:
+            return None
+        return src.world_map.Position(*move)
+
+    def close(self):
+        """ Stops the searching processes. """
+        if self._executor is not None:
+            # The searches still queued are cancelled, so the shutdown waits only for the running ones.
+            for future in self._futures:
+                future.cancel()
+            self._futures = []
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _get_problem(self, current_model: 'src.model.Model', mob: 'src.fighter.Mob', occupied) -> LookaheadProblem:
+        player = current_model.player
+        mob_cell = (mob.position.x, mob.position.y)
+        player_cell = (player.position.x, player.position.y)
+        box = (min(mob_cell[0], player_cell[0]) - self.max_depth, min(mob_cell[1], player_cell[1]) - self.max_depth,
+               max(mob_cell[0], player_cell[0]) + self.max_depth, max(mob_cell[1], player_cell[1]) + self.max_depth)
+        game_map = current_model.map
+        blocked = set()
+        for x in range(box[0], box[2] + 1):
+            for y in range(box[1], box[3] + 1):
+                if not game_map.is_empty(src.world_map.Position(x, y)):
+                    blocked.add((x, y))
+        blocked.update(occupied - {mob_cell, player_cell})
+        return LookaheadProblem(frozenset(blocked), box, mob_cell, mob.hp, mob.get_attack(), player_cell, player.hp,
+                                player.get_attack(), player.get_defence(), player.get_confusion_prob(),
+                                self.max_depth)
+
+
+def _search_within(problem: LookaheadProblem, share: float, deadline: float) -> Optional[Tuple[int, int]]:
+    """ Runs the search for share seconds from its start in a worker, but not after the deadline. """
+    return search(problem, min(deadline, time.time() + share))
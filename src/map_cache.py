@@ -0,0 +1,131 @@
+""" Module containing the cache of the parsed and validated map files.
+
+A whole directory of maps can be validated in parallel, warming the cache:
+    python3 -m src.map_cache maps [--cache_dir .map_cache] [--workers N]
+"""
+import hashlib
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from src.hpa import GRAPH_FILE_SUFFIX
+from src.map_pool import MAP_FILE_SUFFIX
+from src.world_map import FileWorldMapSource, MapParsingException, WorldMap, decode_map, encode_map
+
+DEFAULT_CACHE_DIRECTORY = '.map_cache'
+# The suffixes of the files stored next to the maps which are not map files: the HPA* graphs and the pooled maps.
+NON_MAP_FILE_SUFFIXES = (GRAPH_FILE_SUFFIX, MAP_FILE_SUFFIX)
+
+
+class MapCache:
+    """ Class storing the results of parsing and validating the map files by the hash of their contents.
+
+    An entry holds either the tiles of a valid map packed into bits or the error found in the file,
+    so loading an unchanged file again skips both the parsing and the connectivity check. The
+    entries are kept in memory and in files in the cache directory, shared by all of the games.
+    """
+    _FORMAT_VERSION = 1
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIRECTORY):
+        """ Initializes a cache storing its entries in the given directory. """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = dict()
+
+    def get_or_parse(self, data: bytes, parse: Callable[[bytes], WorldMap]) -> WorldMap:
+        """ Returns the map with the given file contents, parsing them with parse if they are not cached.
+
+        :raises MapParsingException if the contents are not a valid map.
+        """
+        key = hashlib.sha1(data).hexdigest()
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._read(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries[key] = entry
+            if entry['error'] is not None:
+                raise MapParsingException(entry['error'])
+            return decode_map(entry['tiles'], entry['height'], entry['width'])
+
+        self.misses += 1
+        try:
+            game_map = parse(data)
+        except MapParsingException as exception:
+            self._store(key, {'error': str(exception), 'height': 0, 'width': 0, 'tiles': b''})
+            raise
+        self._store(key, {'error': None, 'height': game_map.height, 'width': game_map.width,
+                          'tiles': encode_map(game_map)})
+        return game_map
+
+    def _get_entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _store(self, key: str, entry):
+        self._entries[key] = entry
+        header = {'version': MapCache._FORMAT_VERSION, 'error': entry['error'],
+                  'height': entry['height'], 'width': entry['width']}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._get_entry_path(key)
+            # The entry is written under another name first, so that no one reads a partially written file.
+            temporary_path = '{}.{}'.format(path, os.getpid())
+            with open(temporary_path, 'wb') as file:
+                file.write(json.dumps(header).encode() + b'\n' + entry['tiles'])
+            os.replace(temporary_path, path)
+        except IOError:
+            pass
+
+    def _read(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._get_entry_path(key), 'rb') as file:
+                header, tiles = file.read().split(b'\n', 1)
+            entry = json.loads(header.decode())
+        except (IOError, ValueError):
+            return None
+        if entry.get('version') != MapCache._FORMAT_VERSION:
+            return None
+        entry['tiles'] = tiles
+        return entry
+
+
+def validate_file(path: str, cache_directory: str) -> Optional[str]:
+    """ Loads the map file through the cache in the given directory and returns the error in it, or None. """
+    try:
+        FileWorldMapSource(path, MapCache(cache_directory)).get()
+    except MapParsingException as exception:
+        return str(exception)
+    return None
+
+
+def get_map_paths(directory: str) -> List[str]:
+    """ Returns the sorted paths of the map files in the directory, skipping the hidden files and the known
+    files of other kinds. """
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if os.path.isfile(os.path.join(directory, name)) and not name.startswith('.')
+                  and not name.endswith(NON_MAP_FILE_SUFFIXES))
+
+
+def main():
+    """ Validates all of the map files in a directory in parallel, storing the results in the cache. """
+    parser = ArgumentParser(description='Validates the map files and warms the map cache.')
+    parser.add_argument('directory', type=str, help='directory with the map files')
+    parser.add_argument('--cache_dir', type=str, default=DEFAULT_CACHE_DIRECTORY, help='directory of the cache')
+    parser.add_argument('--workers', type=int, default=None, help='amount of the validating processes')
+    args = parser.parse_args()
+
+    paths = get_map_paths(args.directory)
+    with ProcessPoolExecutor(args.workers) as executor:
+        errors = list(executor.map(validate_file, paths, [args.cache_dir] * len(paths)))
+    for path, error in zip(paths, errors):
+        print('{}: {}'.format(path, 'OK' if error is None else error))
+    if any(error is not None for error in errors):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
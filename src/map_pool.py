@@ -0,0 +1,160 @@
+""" Module containing the pool of the maps generated in advance in the background. """
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from src.world_map import RandomV1WorldMapSource, RandomV2WorldMapSource, WorldMap, WorldMapSource, decode_map, \
+    encode_map
+
+MAP_FILE_SUFFIX = '.map'
+GENERATORS = {'v1': RandomV1WorldMapSource, 'v2': RandomV2WorldMapSource}
+
+
+def generate_map(generator: str, height: int, width: int, seed: int) -> Optional[bytes]:
+    """ Generates a map with the given generator and seed and returns it encoded, or None if it is not valid. """
+    game_map = _generate(generator, height, width, seed)
+    if game_map is None:
+        return None
+    return encode_map(game_map)
+
+
+def _generate(generator: str, height: int, width: int, seed: int) -> Optional[WorldMap]:
+    if generator == 'v1':
+        # The v1 generator draws from the global random, the state of which is kept for the caller.
+        state = random.getstate()
+        random.seed(seed)
+        try:
+            game_map = RandomV1WorldMapSource(height, width).get()
+        finally:
+            random.setstate(state)
+    else:
+        game_map = GENERATORS[generator](height, width, seed).get()
+    if not game_map.is_one_component():
+        return None
+    return game_map
+
+
+class MapPool:
+    """ Class keeping a stock of generated maps on the disk and refilling it in the background.
+
+    The maps are generated in a process pool and stored in a directory per generator and size,
+    each in a file named by its seed with the tiles packed into bits. A map is taken from the
+    disk at once, so a game never waits for the generation.
+    """
+    _DEFAULT_TARGET_SIZE = 8
+
+    def __init__(self, directory: str, generator: str, height: int, width: int,
+                 target_size: int = _DEFAULT_TARGET_SIZE, workers: Optional[int] = None):
+        """ Initializes a pool of the maps of the given generator and size.
+
+        :param directory: the directory in which the maps are stored.
+        :param generator: the name of the generator, one of the keys of GENERATORS.
+        :param target_size: the amount of the stored maps the pool is refilled to.
+        :param workers: the amount of the generating processes, the amount of the processors by default.
+        :raises ValueError if the generator is unknown or the size is incorrect.
+        """
+        if generator not in GENERATORS:
+            raise ValueError('Unknown map generator')
+        if height <= 0 or width <= 0 or target_size <= 0:
+            raise ValueError('Invalid map pool size')
+        self.directory = os.path.join(directory, '{}_{}x{}'.format(generator, height, width))
+        self.generator = generator
+        self.height = height
+        self.width = width
+        self.target_size = target_size
+        self.workers = workers
+        self._executor = None
+        self._pending = set()
+        # Reentrant, as a callback of a future resolved at once runs in the thread submitting or cancelling it.
+        self._lock = threading.Condition(threading.RLock())
+
+    def get_stored_seeds(self):
+        """ Returns the seeds of the maps stored on the disk. """
+        if not os.path.isdir(self.directory):
+            return []
+        return [int(name[:-len(MAP_FILE_SUFFIX)]) for name in os.listdir(self.directory)
+                if name.endswith(MAP_FILE_SUFFIX)]
+
+    def take(self) -> WorldMap:
+        """ Returns a map from the pool, removing it from the disk, and starts refilling the pool. """
+        game_map = None
+        for seed in self.get_stored_seeds():
+            game_map = self._claim(seed)
+            if game_map is not None:
+                break
+        while game_map is None:
+            # The stock is empty, only on the first use of the pool then. Instead of waiting for the
+            # workers a map is made in place by the pool's generator, which takes a few milliseconds.
+            game_map = _generate(self.generator, self.height, self.width, random.randrange(2 ** 63))
+        self.refill()
+        return game_map
+
+    def refill(self):
+        """ Starts generating the maps missing up to the target size in the background. """
+        with self._lock:
+            missing = self.target_size - len(self.get_stored_seeds()) - len(self._pending)
+            if missing <= 0:
+                return
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            for _ in range(missing):
+                seed = random.randrange(2 ** 63)
+                future = self._executor.submit(generate_map, self.generator, self.height, self.width, seed)
+                self._pending.add(future)
+                future.add_done_callback(lambda future, seed=seed: self._store(future, seed))
+
+    def wait(self):
+        """ Waits until all of the maps being generated are stored. """
+        with self._lock:
+            while self._pending:
+                self._lock.wait()
+
+    def close(self):
+        """ Stops the generation, the maps that are being generated already are still stored. """
+        with self._lock:
+            for future in list(self._pending):
+                future.cancel()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _store(self, future, seed: int):
+        try:
+            if future.cancelled() or future.exception() is not None or future.result() is None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, str(seed) + MAP_FILE_SUFFIX)
+            # The map is written under another name first, so that no one reads a partially written file.
+            with open(path + '.tmp', 'wb') as file:
+                file.write(future.result())
+            os.replace(path + '.tmp', path)
+        finally:
+            with self._lock:
+                self._pending.discard(future)
+                self._lock.notify_all()
+
+    def _claim(self, seed: int) -> Optional[WorldMap]:
+        """ Reads and removes a stored map, returns None if another game has taken it first. """
+        path = os.path.join(self.directory, str(seed) + MAP_FILE_SUFFIX)
+        claimed_path = '{}.{}'.format(path, os.getpid())
+        try:
+            os.replace(path, claimed_path)
+        except FileNotFoundError:
+            return None
+        with open(claimed_path, 'rb') as file:
+            data = file.read()
+        os.remove(claimed_path)
+        return decode_map(data, self.height, self.width)
+
+
+class PooledWorldMapSource(WorldMapSource):
+    """ A source taking the maps from a map pool. """
+
+    def __init__(self, pool: MapPool):
+        """ Initializes a source taking the maps from the given pool. """
+        self.pool = pool
+
+    def get(self) -> WorldMap:
+        return self.pool.take()
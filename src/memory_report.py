@@ -0,0 +1,170 @@
+""" Module containing the report of the memory used by the parts of the game. """
+import sys
+import tracemalloc
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+import src.model
+import src.view
+from src.chunked_map import ChunkedWorldMap
+
+# The amount of the source files allocating the most memory listed in a report.
+TOP_ALLOCATION_SITES = 5
+# The caches of the maps, which are read without creating them.
+_MAP_CACHE_ATTRIBUTES = ('_path_service', '_field_of_view')
+
+
+def get_deep_size(roots: Iterable, seen: Optional[Set[int]] = None) -> Tuple[int, int]:
+    """ Returns the total size in bytes and the amount of the objects reachable from the roots.
+
+    The built-in containers and the objects of the game's own classes are followed, any other
+    object is counted by its own size only, so the walk does not wander into the executors,
+    the locks or the modules. The objects whose identifiers are in seen are skipped, and the
+    counted ones are added to it, so an object shared by several parts is counted once.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    count = 0
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        count += 1
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif type(obj).__module__.startswith('src.'):
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    if hasattr(obj, name):
+                        stack.append(getattr(obj, name))
+    return size, count
+
+
+def measure_peak(function: Callable) -> Tuple[object, int]:
+    """ Calls the function and returns its result and the peak of the memory in bytes allocated during the call.
+
+    The peak includes the temporary objects freed before the call returns. If tracemalloc
+    already traces the allocations, the tracing is restarted for the call and once more after
+    it, so the traces and the peak of the game are lost and have to be read before.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    traceback_limit = tracemalloc.get_traceback_limit()
+    tracemalloc.stop()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        if was_tracing:
+            tracemalloc.start(traceback_limit)
+    return result, max(0, peak - start)
+
+
+class MemoryReport:
+    """ Class storing the memory used by the parts of the game, estimated from the structure of their objects.
+
+    The traced numbers are filled if tracemalloc traces the allocations, which the game starts
+    with --memory_report. The peaks of the memory used by the save and the load are measured by
+    building and parsing a snapshot of the model.
+    """
+
+    def __init__(self):
+        """ Initializes an empty report. """
+        self.sections: List[Tuple[str, int, int]] = []
+        self.tiles = 0
+        self.mob_count = 0
+        self.bytes_per_tile = 0.0
+        self.bytes_per_mob = 0.0
+        self.snapshot_bytes = 0
+        self.save_peak = 0
+        self.load_peak = 0
+        self.traced_current: Optional[int] = None
+        self.traced_peak: Optional[int] = None
+        self.top_allocation_sites: List[Tuple[str, int]] = []
+
+    def get_section(self, name: str) -> int:
+        """ Returns the size in bytes of the part of the game with the given name. """
+        for section_name, size, _ in self.sections:
+            if section_name == name:
+                return size
+        raise KeyError(name)
+
+    def format(self) -> str:
+        """ Returns the report as text. """
+        lines = ['Memory report']
+        for name, size, count in self.sections:
+            lines.append('  {:<16}{:>14,} B in {:,} objects'.format(name, size, count))
+        lines.append('  {:<16}{:>14,.1f} B over {:,} tiles'.format('per tile', self.bytes_per_tile, self.tiles))
+        lines.append('  {:<16}{:>14,.1f} B over {:,} mobs'.format('per mob', self.bytes_per_mob, self.mob_count))
+        lines.append('  {:<16}{:>14,} B, peak {:,} B while saving, {:,} B while loading'.format(
+            'snapshot', self.snapshot_bytes, self.save_peak, self.load_peak))
+        if self.traced_current is not None:
+            lines.append('  {:<16}{:>14,} B, peak {:,} B'.format('traced', self.traced_current, self.traced_peak))
+            for file_name, size in self.top_allocation_sites:
+                lines.append('    {:>14,} B  {}'.format(size, file_name))
+        return '\n'.join(lines)
+
+
+def build_memory_report(current_model: 'src.model.Model', view: 'Optional[src.view.View]' = None) -> MemoryReport:
+    """ Builds the report of the memory used by the model and, if given, the view. """
+    report = MemoryReport()
+    # The traced numbers are read first, as measuring the save and the load restarts the tracing.
+    if tracemalloc.is_tracing():
+        report.traced_current, report.traced_peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().statistics('filename')
+        report.top_allocation_sites = [(statistic.traceback[0].filename, statistic.size)
+                                       for statistic in statistics[:TOP_ALLOCATION_SITES]]
+
+    seen = set()
+    game_map = current_model.map
+
+    # The parts are walked from the most specific one, so the shared objects are counted in it.
+    strategies = [mob.fighting_strategy for mob in current_model.mobs]
+    strategy_size, strategy_count = get_deep_size(strategies, seen)
+    mob_size, mob_count = get_deep_size(current_model.mobs, seen)
+    player_size, player_count = get_deep_size([current_model.player], seen)
+    # The caches refer to the map, which is counted on its own after them.
+    seen.add(id(game_map))
+    caches = [getattr(game_map, name, None) for name in _MAP_CACHE_ATTRIBUTES]
+    cache_size, cache_count = get_deep_size([cache for cache in caches if cache is not None], seen)
+    map_size, map_count = get_deep_size([game_map.__dict__], seen)
+    map_size += sys.getsizeof(game_map)
+    map_count += 1
+    report.sections = [('map', map_size, map_count),
+                       ('map caches', cache_size, cache_count),
+                       ('mobs', mob_size, mob_count),
+                       ('strategies', strategy_size, strategy_count),
+                       ('player', player_size, player_count)]
+    if view is not None:
+        # The buffers of a console are NumPy arrays the console wraps, their size is the one of their data.
+        report.sections.append(('render buffers', view.console.rgba.nbytes, 1))
+
+    if isinstance(game_map, ChunkedWorldMap):
+        report.tiles = len(game_map.get_cached_chunks()) * game_map.chunk_size ** 2
+    else:
+        report.tiles = game_map.height * game_map.width
+    report.bytes_per_tile = map_size / report.tiles if report.tiles else 0.0
+    report.mob_count = len(current_model.mobs)
+    report.bytes_per_mob = (mob_size + strategy_size) / report.mob_count if report.mob_count else 0.0
+
+    snapshot, report.save_peak = measure_peak(current_model.get_snapshot)
+    report.snapshot_bytes = sys.getsizeof(snapshot)
+    _, report.load_peak = measure_peak(lambda: _load(snapshot))
+    report.sections.append(('save data', report.snapshot_bytes, 1))
+    return report
+
+
+def _load(snapshot: str) -> 'src.model.Model':
+    loaded_model = src.model.Model()
+    loaded_model.set_snapshot(snapshot)
+    return loaded_model
@@ -1,10 +1,15 @@
 """ Module containing the world logic for the game. """
-
-from typing import List
+import random
+import weakref
+from contextlib import contextmanager
+from typing import List, Optional, Union
 
 import jsons
 
+import src.events
 import src.fighter
+import src.lookahead
+from src.chunked_map import ChunkedWorldMap
 from src.strategies import FightingStrategy, strategy_deserializer, strategy_serializer
 from src.world_map import WorldMap, Position
 
@@ -15,12 +20,115 @@ jsons.set_deserializer(strategy_deserializer, FightingStrategy)
 class Model:
     """ Class encapsulating the state of the game world. """
 
-    def __init__(self, map: WorldMap = None, player: 'src.fighter.Player' = None,
-                 mobs: 'List[src.fighter.Mob]' = None):
-        """ Initializes a model with a given initial map, player and list of current mobs. """
+    def __init__(self, map: Union[WorldMap, ChunkedWorldMap] = None, player: 'src.fighter.Player' = None,
+                 mobs: 'List[src.fighter.Mob]' = None, depth: int = 0):
+        """ Initializes a model with a given initial map, player and list of current mobs.
+
+        The depth is the number of the dungeon level the map belongs to, 0 being the topmost one.
+        """
+        # The identifiers of the fighters shared with the model this one is forked from.
+        self._shared = set()
+        self._forks = weakref.WeakSet()
+        self._random_state = None
+        self._planner = None
+        self._event_bus = None
+        self._player = None
+        self._mobs = None
         self.map = map
         self.player = player
         self.mobs = mobs
+        self.depth = depth
+
+    @property
+    def player(self) -> 'src.fighter.Player':
+        """ The player, who reports their changes to the event bus of the model. """
+        return self._player
+
+    @player.setter
+    def player(self, player: 'src.fighter.Player'):
+        self._player = player
+        if self._event_bus is not None:
+            self._attach([player])
+
+    @property
+    def mobs(self) -> 'List[src.fighter.Mob]':
+        """ The list of the mobs, which report their changes to the event bus of the model. """
+        return self._mobs
+
+    @mobs.setter
+    def mobs(self, mobs: 'List[src.fighter.Mob]'):
+        self._mobs = mobs
+        if self._event_bus is not None:
+            self._attach(mobs)
+
+    def get_event_bus(self) -> 'src.events.EventBus':
+        """ Returns the bus of the events of the changes of the fighters of the model.
+
+        The fighters the model gets later report to the bus as well, as long as they are assigned
+        to player or mobs rather than appended to the list of the mobs.
+        """
+        if self._event_bus is None:
+            self._event_bus = src.events.EventBus()
+            self._attach([self.player])
+            self._attach(self.mobs)
+        return self._event_bus
+
+    def _attach(self, fighters):
+        """ Makes the fighters owned by the model report to its event bus, the shared ones keep their owner's. """
+        for fighter in fighters or ():
+            if fighter is not None and id(fighter) not in self._shared:
+                fighter.set_event_bus(self._event_bus)
+
+    def fork(self, seed: Optional[int] = None) -> 'Model':
+        """ Returns a copy of the model which can be changed independently of it, for the lookahead simulations.
+
+        The map is shared and the fighters are shared until either model changes them, so a fork
+        costs only a list of references. The fork captures the state of the random generator, the
+        current one or the one seeded with seed, for use_random_state. The fighters of a model
+        having forks have to be changed through get_writable, as GameSession does.
+        """
+        forked = Model(self.map, self.player, list(self.mobs), self.depth)
+        forked._shared = {id(fighter) for fighter in forked.get_fighters()}
+        forked._random_state = random.getstate() if seed is None else random.Random(seed).getstate()
+        forked._planner = self._planner
+        self._forks.add(forked)
+        return forked
+
+    def get_writable(self, fighter: 'src.fighter.Fighter') -> 'src.fighter.Fighter':
+        """ Returns the fighter of the model which may be changed, copying it if it is shared with another model.
+
+        The forks still sharing the fighter get their own copies of it first.
+        """
+        for forked in self._forks:
+            forked.get_writable(fighter)
+        if id(fighter) not in self._shared:
+            return fighter
+        self._shared.discard(id(fighter))
+        copy = fighter.copy()
+        copy.set_event_bus(self._event_bus)
+        if self.player is fighter:
+            self.player = copy
+        else:
+            for i, mob in enumerate(self.mobs):
+                if mob is fighter:
+                    self.mobs[i] = copy
+        return copy
+
+    @contextmanager
+    def use_random_state(self):
+        """ Runs the block with the random generator in the state captured by fork and keeps its state after.
+
+        The state of the generator outside the block is restored, so the simulations do not change the game.
+        """
+        if self._random_state is None:
+            self._random_state = random.getstate()
+        outer_state = random.getstate()
+        random.setstate(self._random_state)
+        try:
+            yield
+        finally:
+            self._random_state = random.getstate()
+            random.setstate(outer_state)
 
     def get_fighters(self):
         """ Returns a list of the fighters currently present in the game. """
@@ -33,13 +141,40 @@ class Model:
     def set_snapshot(self, data):
         """ Deserializes the model world state from a given string to the current model. """
         instance = jsons.loads(data, Model, strict=True)
+        self._shared = set()
         self.map = instance.map
         self.player = instance.player
         self.mobs = instance.mobs
+        self.depth = instance.depth
+
+    def get_planner(self) -> 'src.lookahead.LookaheadPlanner':
+        """ Returns the planner of the moves of the mobs using LookaheadStrategy, searching in the calling thread
+        unless another one is set. """
+        if self._planner is None:
+            self._planner = src.lookahead.LookaheadPlanner()
+        return self._planner
+
+    def set_planner(self, planner: 'src.lookahead.LookaheadPlanner'):
+        """ Sets the planner of the moves of the mobs using LookaheadStrategy. """
+        self._planner = planner
+
+    def get_visible_tiles(self):
+        """ Returns the set of the (x, y) coordinates of the tiles the player sees. """
+        return self.map.get_field_of_view().get_visible(self.player.position)
+
+    def is_player_visible_from(self, position: Position) -> bool:
+        """ Checks whether the player is seen from the given position, that is whether they see the position. """
+        return (position.x, position.y) in self.get_visible_tiles()
 
     def get_fighter_at(self, pos: Position):
         """ Returns the fighter in a given position if it exists, None otherwise. """
-        for fighter in self.get_fighters():
-            if fighter.position == pos:
-                return fighter
+        # The coordinates are compared directly, which is several times cheaper than calling Position.__eq__.
+        x, y = pos.x, pos.y
+        player_position = self.player.position
+        if player_position.x == x and player_position.y == y:
+            return self.player
+        for mob in self.mobs:
+            position = mob.position
+            if position.x == x and position.y == y:
+                return mob
         return None
@@ -0,0 +1,396 @@
+""" Module containing the game session computing the moves of the mobs in parallel over the partitions of the map. """
+import random
+import weakref
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+import numpy
+
+import src.strategies
+from src.path_service import PathService
+from src.session import GameSession
+from src.world_map import MapTile, Position, WorldMap
+
+PARTITION_SIZE = 32
+
+# The planes of the array of the map cells.
+_WALL, _VISIBLE, _DISTANCE, _OCCUPANT = range(4)
+# The rows of the array of the mobs, which are sorted by their partitions and then by their ranks.
+_X, _Y, _KIND, _INDEX, _RANK, _TARGET_X, _TARGET_Y, _OUTCOME = range(8)
+_MOB_ROWS = 8
+
+_PASSIVE, _AGGRESSIVE, _COWARDLY, _CONFUSED, _OTHER = range(5)
+_KINDS = {src.strategies.PassiveStrategy: _PASSIVE,
+          src.strategies.AggressiveStrategy: _AGGRESSIVE,
+          src.strategies.LookaheadStrategy: _AGGRESSIVE,
+          src.strategies.CowardlyStrategy: _COWARDLY,
+          src.strategies.ConfusedStrategy: _CONFUSED}
+
+# The mob stays, moves within its partition, moves into another partition, or attacks the fighter in the target.
+_STAY, _MOVE, _BORDER_MOVE, _ATTACK = range(4)
+
+# The order of the neighbours is the one of the path service, so the ties are broken the same way.
+_NEIGHBOR_DELTAS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+_PLAYER_OCCUPANT = -1
+_TASKS_PER_WORKER = 4
+
+
+@dataclass(frozen=True)
+class _TickParameters:
+    """ The parameters of a tick the workers need besides the shared arrays. """
+    player: Tuple[int, int]
+    seed: int
+    partition_size: int
+
+
+class _SharedArray:
+    """ A NumPy array in a block of shared memory, which the workers attach to by its name. """
+
+    def __init__(self, shape: Tuple[int, ...], dtype):
+        size = max(1, int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize)
+        self.memory = SharedMemory(create=True, size=size)
+        self.array = numpy.ndarray(shape, dtype, buffer=self.memory.buf)
+
+    def get_layout(self) -> Tuple[str, Tuple[int, ...], str]:
+        """ Returns what a worker needs to attach to the array. """
+        return self.memory.name, self.array.shape, self.array.dtype.str
+
+    def release(self):
+        """ Frees the block, after which the array can not be used. """
+        self.array = None
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _release(shared_arrays: Dict[str, _SharedArray], executor_holder: List[ProcessPoolExecutor],
+             futures: List[Future]):
+    """ Stops the workers and frees the shared memory of a session, also when it is collected without close. """
+    # The tasks still queued are cancelled, so the shutdown waits only for the running ones.
+    for future in futures:
+        future.cancel()
+    futures.clear()
+    for executor in executor_holder:
+        executor.shutdown(wait=True)
+    executor_holder.clear()
+    for shared_array in shared_arrays.values():
+        shared_array.release()
+    shared_arrays.clear()
+
+
+class ParallelGameSession(GameSession):
+    """ Class advancing the world of one game by ticks, choosing the moves of the mobs in worker processes.
+
+    The map is split into square partitions and the mobs are sorted by them into an array in
+    shared memory, next to the arrays of the walls, the tiles the player sees, the distances to
+    the player and the fighters standing on the tiles. The workers choose the moves of the mobs
+    of whole partitions, all of them seeing the world as it was at the start of the tick, and
+    settle the moves within a partition themselves. The moves crossing the borders of the
+    partitions and the attacks are merged in this process in the order of the ranks the mobs
+    are randomly given every tick, so a tick depends on the random generator only, not on the
+    amount of the workers.
+
+    Unlike in GameSession the fighters act simultaneously: the attacks go first, the player's
+    one leading, and a fighter only moves to a tile which was free at the start of the tick and
+    which neither the player nor a mob of a higher rank has taken. The mobs of LookaheadStrategy
+    move like the aggressive ones, and the strategies unknown to the workers are asked for
+    their moves in this process. The map has to be a WorldMap.
+    """
+
+    def __init__(self, current_model: 'src.model.Model', workers: int = 0, partition_size: int = PARTITION_SIZE,
+                 fighting_system=None, spawner=None):
+        """ Initializes a session running the given model.
+
+        :param workers: the amount of the worker processes, 0 to choose the moves in the calling thread.
+        :param partition_size: the side of a partition in tiles.
+        :raises ValueError if workers is negative or partition_size is not positive.
+        """
+        if workers < 0 or partition_size <= 0:
+            raise ValueError('Invalid parallel session parameters')
+        super(ParallelGameSession, self).__init__(current_model, fighting_system, spawner)
+        self.workers = workers
+        self.partition_size = partition_size
+        self._shared_arrays: Dict[str, _SharedArray] = dict()
+        self._executor_holder: List[ProcessPoolExecutor] = []
+        self._futures: List[Future] = []
+        self._finalizer = weakref.finalize(self, _release, self._shared_arrays, self._executor_holder, self._futures)
+        self._map_key = None
+        self._distance_key = None
+        self._distance_cells = ([], [])
+
+    def close(self):
+        """ Stops the workers and frees the shared memory. """
+        self._finalizer()
+
+    def tick(self):
+        """ Lets every fighter make one move at the same time and removes the killed mobs. """
+        if not isinstance(self.model.map, WorldMap):
+            raise ValueError('Invalid map for the parallel session')
+        mob_count = len(self.model.mobs)
+        cells = self._update_cells()
+        mobs = self._get_array('mobs', (_MOB_ROWS, max(1, mob_count)), numpy.int32, fits=True)
+        parameters = _TickParameters((self.model.player.position.x, self.model.player.position.y),
+                                     random.getrandbits(32), self.partition_size)
+        self._sort_mobs(cells, mobs, mob_count, parameters)
+
+        player = self.model.get_writable(self.model.player)
+        player_target = player.choose_move(self.model)
+        self._choose_other_moves(cells, mobs, mob_count)
+        bounds = self._get_task_bounds(mobs, mob_count)
+        if self.workers == 0:
+            for start, end in bounds:
+                _choose_moves(cells, mobs, parameters, start, end)
+        else:
+            if not self._executor_holder:
+                self._executor_holder.append(ProcessPoolExecutor(self.workers))
+            layouts = (self._shared_arrays['cells'].get_layout(), self._shared_arrays['mobs'].get_layout())
+            self._futures[:] = [self._executor_holder[0].submit(_choose_moves_in_worker, layouts, parameters,
+                                                                start, end) for start, end in bounds]
+            for future in self._futures:
+                future.result()
+            self._futures.clear()
+
+        self._merge(cells, mobs, mob_count, player, player_target)
+        self._finish_tick()
+
+    def _get_array(self, name: str, shape: Tuple[int, ...], dtype, fits: bool = False) -> numpy.ndarray:
+        """ Returns the shared array of the given name, allocating it anew if its shape differs.
+
+        If fits is set, an array with at least as many columns is kept, so the array of the mobs
+        is not reallocated whenever a mob dies.
+        """
+        shared_array = self._shared_arrays.get(name)
+        if shared_array is not None:
+            current_shape = shared_array.array.shape
+            if current_shape == shape or fits and current_shape[:-1] == shape[:-1] and current_shape[-1] >= shape[-1]:
+                return shared_array.array
+            shared_array.release()
+        if fits:
+            shape = shape[:-1] + (shape[-1] * 2,)
+        self._shared_arrays[name] = _SharedArray(shape, dtype)
+        return self._shared_arrays[name].array
+
+    def _update_cells(self) -> numpy.ndarray:
+        """ Fills the array of the cells with the state of the world at the start of the tick. """
+        game_map = self.model.map
+        cells = self._get_array('cells', (4, game_map.height, game_map.width), numpy.int32)
+        map_key = (id(game_map), game_map.get_version(), cells.ctypes.data)
+        if map_key != self._map_key:
+            cells[_WALL] = numpy.array([[tile != MapTile.EMPTY for tile in row] for row in game_map.tiles],
+                                       dtype=numpy.int32)
+            cells[_DISTANCE] = -1
+            self._distance_cells = ([], [])
+            self._map_key = map_key
+            self._distance_key = None
+
+        player = self.model.player.position
+        cells[_VISIBLE] = 0
+        visible = self.model.get_visible_tiles()
+        if visible:
+            # The field of view reaches past the borders of the map, the tiles there are dropped.
+            visible_x, visible_y = numpy.array(list(visible), dtype=numpy.int32).T
+            on_map = (visible_x >= 0) & (visible_x < game_map.height) & (visible_y >= 0) & (visible_y < game_map.width)
+            cells[_VISIBLE][visible_x[on_map], visible_y[on_map]] = 1
+        if self._distance_key != (player.x, player.y):
+            cells[_DISTANCE][self._distance_cells] = -1
+            self._distance_cells = self._find_distances(cells, player.x, player.y)
+            self._distance_key = (player.x, player.y)
+        return cells
+
+    @staticmethod
+    def _find_distances(cells: numpy.ndarray, x: int, y: int):
+        """ Writes the distances to the player of the tiles nearest to them and returns the coordinates of the tiles.
+
+        The search stops after as many tiles as a search of the path service expands, the mobs
+        farther away approaching the player greedily.
+        """
+        walls = cells[_WALL]
+        height, width = walls.shape
+        distances = {(x, y): 0}
+        queue = deque([(x, y)])
+        while queue and len(distances) < PathService._DEFAULT_MAX_EXPANSIONS:
+            cell_x, cell_y = queue.popleft()
+            distance = distances[(cell_x, cell_y)] + 1
+            for dx, dy in _NEIGHBOR_DELTAS:
+                neighbor = (cell_x + dx, cell_y + dy)
+                if 0 <= neighbor[0] < height and 0 <= neighbor[1] < width and not walls[neighbor] \
+                        and neighbor not in distances:
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+        distance_x, distance_y = zip(*distances)
+        coordinates = (list(distance_x), list(distance_y))
+        cells[_DISTANCE][coordinates] = list(distances.values())
+        return coordinates
+
+    def _sort_mobs(self, cells: numpy.ndarray, mobs: numpy.ndarray, mob_count: int, parameters: _TickParameters):
+        """ Fills the array of the mobs sorted by their partitions and ranks and marks the tiles they stand on. """
+        model_mobs = self.model.mobs
+        xs = numpy.fromiter((mob.position.x for mob in model_mobs), numpy.int32, mob_count)
+        ys = numpy.fromiter((mob.position.y for mob in model_mobs), numpy.int32, mob_count)
+        kinds = numpy.fromiter((_KINDS.get(type(mob.fighting_strategy), _OTHER) for mob in model_mobs),
+                               numpy.int32, mob_count)
+        ranks = numpy.random.default_rng(parameters.seed).permutation(mob_count)
+        columns = -(-cells.shape[2] // self.partition_size)
+        partitions = xs // self.partition_size * columns + ys // self.partition_size
+        order = numpy.lexsort((ranks, partitions))
+        mobs[_X, :mob_count] = xs[order]
+        mobs[_Y, :mob_count] = ys[order]
+        mobs[_KIND, :mob_count] = kinds[order]
+        mobs[_INDEX, :mob_count] = order
+        mobs[_RANK, :mob_count] = ranks[order]
+        mobs[_OUTCOME, :mob_count] = _STAY
+
+        cells[_OCCUPANT] = 0
+        cells[_OCCUPANT][xs, ys] = numpy.arange(1, mob_count + 1)
+        cells[_OCCUPANT][parameters.player] = _PLAYER_OCCUPANT
+
+    def _choose_other_moves(self, cells: numpy.ndarray, mobs: numpy.ndarray, mob_count: int):
+        """ Asks the strategies unknown to the workers for the moves of their mobs. """
+        for i in numpy.flatnonzero(mobs[_KIND, :mob_count] == _OTHER).tolist():
+            mob = self.model.mobs[mobs[_INDEX, i]]
+            if mob.is_choice_stateful():
+                mob = self.model.get_writable(mob)
+            target = mob.choose_move(self.model)
+            mobs[_TARGET_X, i], mobs[_TARGET_Y, i] = target.x, target.y
+            if target == mob.position or not self.model.map.is_empty(target):
+                continue
+            mobs[_OUTCOME, i] = _ATTACK if cells[_OCCUPANT][target.x, target.y] != 0 else _BORDER_MOVE
+
+    def _get_task_bounds(self, mobs: numpy.ndarray, mob_count: int) -> List[Tuple[int, int]]:
+        """ Splits the sorted mobs into about equal tasks, never splitting a partition. """
+        task_count = max(1, self.workers * _TASKS_PER_WORKER)
+        xs = mobs[_X, :mob_count] // self.partition_size
+        ys = mobs[_Y, :mob_count] // self.partition_size
+        is_partition_start = numpy.ones(mob_count, dtype=bool)
+        is_partition_start[1:] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+        partition_starts = numpy.flatnonzero(is_partition_start)
+        wanted_starts = numpy.arange(task_count) * mob_count // task_count
+        starts = sorted(set(partition_starts[numpy.searchsorted(partition_starts, wanted_starts, side='right') - 1]
+                            .tolist())) if mob_count else []
+        return list(zip(starts, starts[1:] + [mob_count]))
+
+    def _merge(self, cells: numpy.ndarray, mobs: numpy.ndarray, mob_count: int, player, player_target: Position):
+        """ Carries out the attacks and then the moves, settling the moves into the same tiles by the ranks. """
+        model_mobs = self.model.mobs
+        outcomes = mobs[_OUTCOME, :mob_count]
+        ranks = mobs[_RANK, :mob_count]
+        player_occupant = None
+        if player_target != player.position and self.model.map.is_empty(player_target):
+            player_occupant = int(cells[_OCCUPANT][player_target.x, player_target.y])
+        if player_occupant is not None and player_occupant > 0:
+            self.fighting_system.fight(player, self.model.get_writable(model_mobs[player_occupant - 1]))
+
+        attacks = numpy.flatnonzero(outcomes == _ATTACK)
+        for i in attacks[numpy.argsort(ranks[attacks], kind='stable')].tolist():
+            attacker = model_mobs[mobs[_INDEX, i]]
+            if attacker.hp <= 0:
+                continue
+            occupant = int(cells[_OCCUPANT][mobs[_TARGET_X, i], mobs[_TARGET_Y, i]])
+            if occupant == _PLAYER_OCCUPANT:
+                self.fighting_system.fight(attacker, self.model.get_writable(self.model.player))
+            else:
+                self.fighting_system.fight(attacker, self.model.get_writable(model_mobs[occupant - 1]))
+
+        taken = set()
+        if player_occupant == 0:
+            self.model.get_writable(self.model.player).position = player_target
+            taken.add((player_target.x, player_target.y))
+        moves = numpy.flatnonzero(outcomes == _MOVE)
+        border_moves = numpy.flatnonzero(outcomes == _BORDER_MOVE)
+        border_moves = border_moves[numpy.argsort(ranks[border_moves], kind='stable')]
+        for i in moves.tolist() + border_moves.tolist():
+            target = (int(mobs[_TARGET_X, i]), int(mobs[_TARGET_Y, i]))
+            mob = model_mobs[mobs[_INDEX, i]]
+            if target in taken or mob.hp <= 0:
+                continue
+            taken.add(target)
+            self.model.get_writable(mob).position = Position(*target)
+
+        for i in numpy.flatnonzero(mobs[_KIND, :mob_count] == _CONFUSED).tolist():
+            self.model.get_writable(model_mobs[mobs[_INDEX, i]]).update_strategy()
+
+
+_attached_arrays: Dict[str, Tuple[SharedMemory, numpy.ndarray]] = dict()
+
+
+def _attach(layouts) -> List[numpy.ndarray]:
+    """ Returns the shared arrays of the given layouts in a worker, detaching from the ones no longer used. """
+    names = {name for name, _, _ in layouts}
+    for name in list(_attached_arrays):
+        if name not in names:
+            memory, _ = _attached_arrays.pop(name)
+            memory.close()
+    arrays = []
+    for name, shape, dtype in layouts:
+        if name not in _attached_arrays:
+            memory = SharedMemory(name=name)
+            _attached_arrays[name] = (memory, numpy.ndarray(shape, dtype, buffer=memory.buf))
+        arrays.append(_attached_arrays[name][1])
+    return arrays
+
+
+def _choose_moves_in_worker(layouts, parameters: _TickParameters, start: int, end: int):
+    """ Chooses the moves of the mobs from start to end of the shared array of the mobs in a worker. """
+    cells, mobs = _attach(layouts)
+    _choose_moves(cells, mobs, parameters, start, end)
+
+
+def _choose_moves(cells: numpy.ndarray, mobs: numpy.ndarray, parameters: _TickParameters, start: int, end: int):
+    """ Chooses the moves of the mobs from start to end, which hold whole partitions, and settles them.
+
+    A move into a tile of the mob's partition is taken by the first mob of the partition in the
+    order of the ranks, the others stay. A move into another partition is left for the merge.
+    """
+    walls = cells[_WALL]
+    distances = cells[_DISTANCE]
+    occupants = cells[_OCCUPANT]
+    height, width = walls.shape
+    size = parameters.partition_size
+    kinds = mobs[_KIND, start:end]
+    xs = mobs[_X, start:end]
+    ys = mobs[_Y, start:end]
+    # Only the confused mobs and the mobs seeing the player move, the others are left staying.
+    is_seeing = ((kinds == _AGGRESSIVE) | (kinds == _COWARDLY)) & (cells[_VISIBLE][xs, ys] != 0)
+    active = numpy.flatnonzero(is_seeing | (kinds == _CONFUSED)) + start
+
+    def get_empty_neighbors(cell_x, cell_y):
+        return [(cell_x + dx, cell_y + dy) for dx, dy in _NEIGHBOR_DELTAS
+                if 0 <= cell_x + dx < height and 0 <= cell_y + dy < width and not walls[cell_x + dx, cell_y + dy]]
+
+    taken = set()
+    for i, x, y, kind, index in zip(active.tolist(), mobs[_X, active].tolist(), mobs[_Y, active].tolist(),
+                                    mobs[_KIND, active].tolist(), mobs[_INDEX, active].tolist()):
+        target = _choose_target(kind, x, y, parameters, get_empty_neighbors(x, y), distances, index)
+        mobs[_TARGET_X, i], mobs[_TARGET_Y, i] = target
+        if target == (x, y):
+            continue
+        if occupants[target] != 0:
+            mobs[_OUTCOME, i] = _ATTACK
+        elif target[0] // size != x // size or target[1] // size != y // size:
+            mobs[_OUTCOME, i] = _BORDER_MOVE
+        elif target not in taken:
+            taken.add(target)
+            mobs[_OUTCOME, i] = _MOVE
+
+
+def _choose_target(kind: int, x: int, y: int, parameters: _TickParameters, neighbors, distances: numpy.ndarray,
+                   index: int) -> Tuple[int, int]:
+    """ Returns the tile a mob of the given kind moves to, as its strategy would choose it. """
+    if kind == _CONFUSED:
+        # Every mob gets its own generator, so its move does not depend on the other mobs of the task.
+        return random.Random(parameters.seed ^ index << 32).choice(neighbors) if neighbors else (x, y)
+    player_x, player_y = parameters.player
+    if kind == _AGGRESSIVE:
+        distance = distances[x, y]
+        if distance > 0:
+            for neighbor in neighbors:
+                if distances[neighbor] == distance - 1:
+                    return neighbor
+    best, best_distance = (x, y), abs(x - player_x) + abs(y - player_y)
+    for neighbor in neighbors:
+        distance = abs(neighbor[0] - player_x) + abs(neighbor[1] - player_y)
+        if distance < best_distance if kind == _AGGRESSIVE else distance > best_distance:
+            best, best_distance = neighbor, distance
+    return best
@@ -0,0 +1,161 @@
+""" Module containing the A* path service with a cache of the found paths. """
+import heapq
+from collections import OrderedDict
+from typing import List, Optional
+
+import src.world_map
+
+
+class PathService:
+    """ Class finding the shortest paths on a map with A* and caching them.
+
+    The paths are cached by their goal and the version of the map: for every goal the service
+    keeps a tree holding the next step and the remaining distance from each cell of the found
+    paths. A path from (start, goal) is thus answered from the cache if start lies on any path
+    found earlier to the same goal, and a new search stops as soon as it reaches such a path,
+    so the mobs chasing one target share the suffixes of their paths.
+
+    The trees are evicted in the least recently used order once the total amount of their cells
+    exceeds the limit. A change of the map's version drops all of the trees.
+    """
+    _DEFAULT_MAX_CELLS = 65536
+    _DEFAULT_MAX_EXPANSIONS = 4096
+
+    def __init__(self, game_map, max_cells: int = _DEFAULT_MAX_CELLS,
+                 max_expansions: int = _DEFAULT_MAX_EXPANSIONS):
+        """ Initializes a path service of the given map.
+
+        :param max_cells: the maximal total amount of the cached path cells.
+        :param max_expansions: the amount of the expanded cells after which a search gives up,
+        bounding the searches for the unreachable goals and on the unbounded maps.
+        :raises ValueError if either of the limits is not positive.
+        """
+        if max_cells <= 0 or max_expansions <= 0:
+            raise ValueError('Invalid path service limits')
+        self.map = game_map
+        self.max_cells = max_cells
+        self.max_expansions = max_expansions
+        self.hits = 0
+        self.misses = 0
+        self._trees = OrderedDict()
+        self._cell_count = 0
+        self._version = game_map.get_version()
+
+    def get_cached_cells(self) -> int:
+        """ Returns the total amount of the cells of the cached paths. """
+        return self._cell_count
+
+    def clear(self):
+        """ Drops all of the cached paths. """
+        self._trees.clear()
+        self._cell_count = 0
+
+    def get_next_step(self, start: 'src.world_map.Position',
+                      goal: 'src.world_map.Position') -> Optional['src.world_map.Position']:
+        """ Returns the position following start on a shortest path to goal, or None if there is none. """
+        start_cell = (start.x, start.y)
+        goal_cell = (goal.x, goal.y)
+        if start_cell == goal_cell:
+            return src.world_map.Position(start.x, start.y)
+        tree = self._get_tree(start_cell, goal_cell)
+        if tree is None:
+            return None
+        x, y = tree[start_cell][0]
+        return src.world_map.Position(x, y)
+
+    def find_path(self, start: 'src.world_map.Position',
+                  goal: 'src.world_map.Position') -> Optional[List['src.world_map.Position']]:
+        """ Returns a shortest path from start to goal including both of them, or None if there is none. """
+        start_cell = (start.x, start.y)
+        goal_cell = (goal.x, goal.y)
+        if start_cell == goal_cell:
+            return [src.world_map.Position(start.x, start.y)]
+        tree = self._get_tree(start_cell, goal_cell)
+        if tree is None:
+            return None
+        path = [start_cell]
+        while path[-1] != goal_cell:
+            path.append(tree[path[-1]][0])
+        return [src.world_map.Position(x, y) for x, y in path]
+
+    def _get_tree(self, start_cell, goal_cell):
+        """ Returns a tree of the paths to goal containing start, searching for a new path if needed. """
+        version = self.map.get_version()
+        if version != self._version:
+            self.clear()
+            self._version = version
+        tree = self._trees.get(goal_cell)
+        if tree is not None:
+            self._trees.move_to_end(goal_cell)
+            if start_cell in tree:
+                self.hits += 1
+                return tree
+        self.misses += 1
+
+        path = self._search(start_cell, goal_cell, tree if tree is not None else dict())
+        if path is None:
+            return None
+        if tree is None:
+            tree = dict()
+            self._trees[goal_cell] = tree
+        joint = path[-1]
+        distance = tree[joint][1] if joint in tree else 0
+        if joint not in tree:
+            tree[joint] = (joint, 0)
+            self._cell_count += 1
+        for index in range(len(path) - 2, -1, -1):
+            distance += 1
+            tree[path[index]] = (path[index + 1], distance)
+        self._cell_count += len(path) - 1
+
+        while self._cell_count > self.max_cells and self._trees:
+            _, evicted = self._trees.popitem(last=False)
+            self._cell_count -= len(evicted)
+        # The tree answers the query even if it has just been evicted itself.
+        return tree
+
+    def _search(self, start_cell, goal_cell, tree) -> Optional[list]:
+        """ Runs A* from start until it reaches goal or a cell of the tree, and returns the path to that cell.
+
+        A cell of the tree is entered into the queue with its exact remaining distance to goal,
+        so the search still returns a shortest path.
+        """
+        game_map = self.map
+        position_class = src.world_map.Position
+        goal_x, goal_y = goal_cell
+        distances = {start_cell: 0}
+        parents = dict()
+        queue = [(abs(start_cell[0] - goal_x) + abs(start_cell[1] - goal_y), 0, start_cell, False)]
+        expansions = 0
+        while queue:
+            _, negative_distance, cell, is_final = heapq.heappop(queue)
+            if is_final:
+                path = [cell]
+                while path[-1] != start_cell:
+                    path.append(parents[path[-1]])
+                path.reverse()
+                return path
+            distance = -negative_distance
+            if distance > distances[cell]:
+                continue
+            expansions += 1
+            if expansions > self.max_expansions:
+                return None
+            x, y = cell
+            for neighbor in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                new_distance = distance + 1
+                if new_distance >= distances.get(neighbor, new_distance + 1):
+                    continue
+                if not game_map.is_empty(position_class(neighbor[0], neighbor[1])):
+                    continue
+                distances[neighbor] = new_distance
+                parents[neighbor] = cell
+                if neighbor == goal_cell:
+                    heapq.heappush(queue, (new_distance, -new_distance, neighbor, True))
+                elif neighbor in tree:
+                    total = new_distance + tree[neighbor][1]
+                    heapq.heappush(queue, (total, -total, neighbor, True))
+                else:
+                    estimate = new_distance + abs(neighbor[0] - goal_x) + abs(neighbor[1] - goal_y)
+                    heapq.heappush(queue, (estimate, -new_distance, neighbor, False))
+        return None
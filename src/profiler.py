@@ -0,0 +1,162 @@
+""" Module containing the sampling profiler writing the stacks in the collapsed format of the flame graphs. """
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_FILE_NAME = 'profile.folded'
+SAMPLE_RATE = 100
+SLOW_TICK_THRESHOLD = 0.05
+
+
+class SamplingProfiler:
+    """ Class sampling the stacks of the thread which creates it from a background thread.
+
+    The stacks are sampled only while the thread is within sampling or tick, and are written as
+    the lines 'outer;...;inner count' read by flamegraph.pl and speedscope. The samples of a tick
+    lasting longer than the threshold get an extra root frame 'slow tick <number> (<time> ms)',
+    so the slow ticks are seen apart and can be found in a replay by their numbers.
+
+    A sample costs a walk over the stack with the names of the functions cached, so at the
+    default rate the profiled thread is slowed down by well under 1%.
+    """
+
+    def __init__(self, output_path: str = PROFILE_FILE_NAME, rate: float = SAMPLE_RATE,
+                 slow_tick_threshold: float = SLOW_TICK_THRESHOLD):
+        """ Initializes a profiler taking rate samples a second and writing them to output_path when stopped.
+
+        :param slow_tick_threshold: the duration in seconds above which a tick is annotated.
+        :raises ValueError if rate or slow_tick_threshold is not positive.
+        """
+        if rate <= 0 or slow_tick_threshold <= 0:
+            raise ValueError('Invalid profiler parameters')
+        self.output_path = output_path
+        self.rate = rate
+        self.slow_tick_threshold = slow_tick_threshold
+        self.sample_count = 0
+        self.slow_ticks: List[Tuple[object, float]] = []
+        self._counts = Counter()
+        self._thread_id = threading.get_ident()
+        self._depth = 0
+        self._tick_samples: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._names: Dict[object, str] = dict()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *_args):
+        self.stop()
+        self.write()
+
+    def start(self):
+        """ Starts the sampling thread. """
+        if self._sampler is not None:
+            return
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._run, name='sampling profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """ Stops the sampling thread. """
+        if self._sampler is None:
+            return
+        self._stopped.set()
+        self._sampler.join()
+        self._sampler = None
+
+    @contextmanager
+    def sampling(self):
+        """ Samples the stacks of the profiled thread while the block runs. """
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+
+    def tick(self, number) -> '_TickSampling':
+        """ Returns a context manager sampling the stacks while its block runs a tick, annotating the samples with
+        the number of the tick if it is slow. """
+        return _TickSampling(self, number)
+
+    def _end_tick(self, number, samples: List[str], duration: float):
+        if duration > self.slow_tick_threshold:
+            self.slow_ticks.append((number, duration))
+            prefix = 'slow tick {} ({:.1f} ms);'.format(number, duration * 1000)
+            samples = [prefix + stack for stack in samples]
+        if samples:
+            with self._lock:
+                self._counts.update(samples)
+
+    def get_collapsed(self) -> Dict[str, int]:
+        """ Returns the amounts of the samples of every stack, the frames of which are separated by semicolons. """
+        with self._lock:
+            return dict(self._counts)
+
+    def write(self):
+        """ Writes the collapsed stacks to the output file, the most frequent first. """
+        with open(self.output_path, 'w') as output:
+            for stack, count in sorted(self.get_collapsed().items(), key=lambda item: (-item[1], item[0])):
+                output.write('{} {}\n'.format(stack, count))
+
+    def _run(self):
+        interval = 1 / self.rate
+        while not self._stopped.wait(interval):
+            if self._depth == 0:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = self._get_stack(frame)
+            self.sample_count += 1
+            # A tick swaps its list without the lock, at worst a sample taken right at its end is lost.
+            tick_samples = self._tick_samples
+            if tick_samples is not None:
+                tick_samples.append(stack)
+            else:
+                with self._lock:
+                    self._counts[stack] += 1
+
+    def _get_stack(self, frame) -> str:
+        """ Returns the collapsed stack ending in the frame. """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            name = self._names.get(code)
+            if name is None:
+                # The name, the file and the first line tell apart the functions without the varying current lines.
+                name = '{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+                self._names[code] = name
+            names.append(name)
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+
+class _TickSampling:
+    """ Context manager of a tick sampled by a profiler, cheaper than a generator-based one. """
+    __slots__ = ('_profiler', '_number', '_start')
+
+    def __init__(self, profiler: SamplingProfiler, number):
+        self._profiler = profiler
+        self._number = number
+        self._start = 0.0
+
+    def __enter__(self):
+        self._profiler._tick_samples = []
+        self._profiler._depth += 1
+        self._start = time.perf_counter()
+
+    def __exit__(self, *_args):
+        duration = time.perf_counter() - self._start
+        profiler = self._profiler
+        profiler._depth -= 1
+        samples = profiler._tick_samples
+        profiler._tick_samples = None
+        profiler._end_tick(self._number, samples, duration)
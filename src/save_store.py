@@ -0,0 +1,262 @@
+""" Module containing the storages for the saved games. """
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from argparse import ArgumentParser
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import List
+
+
+class SaveNotFoundException(Exception):
+    """ Exception raised if a requested save does not exist. """
+
+
+@dataclass
+class SaveInfo:
+    """ Class for storing the description of a save without its contents. """
+    name: str
+    saved_at: float
+    size: int
+
+
+class SaveStore(ABC):
+    """ Base class for the storages of named model snapshots. """
+
+    @abstractmethod
+    def save(self, name: str, snapshot: str) -> Future:
+        """ Stores a snapshot under the given name, replacing the old one.
+
+        :returns a future that is done once the snapshot is written.
+        """
+
+    @abstractmethod
+    def load(self, name: str) -> str:
+        """ Returns the snapshot stored under the given name.
+
+        :raises SaveNotFoundException if there is no such save.
+        """
+
+    @abstractmethod
+    def delete(self, name: str) -> Future:
+        """ Removes the save with the given name if it exists.
+
+        :returns a future that is done once the save is removed.
+        """
+
+    @abstractmethod
+    def list_saves(self) -> List[SaveInfo]:
+        """ Returns the descriptions of all of the saves ordered by name. """
+
+    def exists(self, name: str) -> bool:
+        """ Checks whether a save with the given name exists. """
+        return any(info.name == name for info in self.list_saves())
+
+    def close(self):
+        """ Finishes the pending writes and releases the storage. """
+
+
+def _get_done_future() -> Future:
+    future = Future()
+    future.set_result(None)
+    return future
+
+
+class FileSaveStore(SaveStore):
+    """ Stores every save as a plain text file in the given directory. """
+
+    def __init__(self, directory: str = '.'):
+        self.directory = directory
+
+    def save(self, name: str, snapshot: str) -> Future:
+        with open(os.path.join(self.directory, name), 'w') as file:
+            file.write(snapshot)
+        return _get_done_future()
+
+    def load(self, name: str) -> str:
+        try:
+            with open(os.path.join(self.directory, name), 'r') as file:
+                return file.read()
+        except FileNotFoundError:
+            raise SaveNotFoundException(name)
+
+    def delete(self, name: str) -> Future:
+        if os.path.isfile(os.path.join(self.directory, name)):
+            os.remove(os.path.join(self.directory, name))
+        return _get_done_future()
+
+    def list_saves(self) -> List[SaveInfo]:
+        saves = []
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                saves.append(SaveInfo(name, os.path.getmtime(path), os.path.getsize(path)))
+        return saves
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(os.path.join(self.directory, name))
+
+
+class SqliteSaveStore(SaveStore):
+    """ Stores the saves as compressed blobs in a local SQLite database.
+
+    The writes are made by a single writer thread that groups the requests arriving close to each
+    other into one transaction. The descriptions of the saves are kept in a separate table from
+    the snapshots, so listing the saves does not read any of the blobs.
+    """
+    _DEFAULT_BATCH_SIZE = 256
+    _DEFAULT_BATCH_WINDOW = 0.005
+    _COMPRESSION_LEVEL = 6
+
+    def __init__(self, path: str, batch_size: int = _DEFAULT_BATCH_SIZE,
+                 batch_window: float = _DEFAULT_BATCH_WINDOW):
+        """ Opens or creates the database.
+
+        :param path: the path to the database file.
+        :param batch_size: the maximal amount of requests written in one transaction.
+        :param batch_window: how long in seconds the writer waits for more requests to join a transaction.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.transaction_count = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS saves '
+                                     '(name TEXT PRIMARY KEY, saved_at REAL NOT NULL, size INTEGER NOT NULL)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS snapshots '
+                                     '(name TEXT PRIMARY KEY, data BLOB NOT NULL)')
+        self._read_lock = threading.Lock()
+        self._pending = dict()
+        self._pending_lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._writer = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer.start()
+
+    def save(self, name: str, snapshot: str) -> Future:
+        data = zlib.compress(snapshot.encode(), SqliteSaveStore._COMPRESSION_LEVEL)
+        return self._submit(name, data)
+
+    def load(self, name: str) -> str:
+        with self._pending_lock:
+            pending = self._pending.get(name, False)
+        if pending is None:
+            raise SaveNotFoundException(name)
+        if pending is False:
+            with self._read_lock:
+                row = self._connection.execute('SELECT data FROM snapshots WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                raise SaveNotFoundException(name)
+            pending = row[0]
+        return zlib.decompress(pending).decode()
+
+    def delete(self, name: str) -> Future:
+        return self._submit(name, None)
+
+    def list_saves(self) -> List[SaveInfo]:
+        # The queued requests are copied before reading the table, so a write ending in between is still listed.
+        with self._pending_lock:
+            pending = dict(self._pending)
+        with self._read_lock:
+            rows = self._connection.execute('SELECT name, saved_at, size FROM saves ORDER BY name').fetchall()
+        saves = {row[0]: SaveInfo(*row) for row in rows}
+        queued_at = time.time()
+        for name, data in pending.items():
+            if data is None:
+                saves.pop(name, None)
+            else:
+                saves[name] = SaveInfo(name, queued_at, len(data))
+        return [saves[name] for name in sorted(saves)]
+
+    def exists(self, name: str) -> bool:
+        with self._pending_lock:
+            if name in self._pending:
+                return self._pending[name] is not None
+        with self._read_lock:
+            return self._connection.execute('SELECT 1 FROM saves WHERE name = ?', (name,)).fetchone() is not None
+
+    def close(self):
+        if self._writer.is_alive():
+            self._requests.put(None)
+            self._writer.join()
+        self._connection.close()
+
+    def _submit(self, name: str, data) -> Future:
+        """ Queues a write of the compressed data under the name, or its removal if the data is None. """
+        future = Future()
+        with self._pending_lock:
+            self._pending[name] = data
+        self._requests.put((name, data, future))
+        return future
+
+    def _run_writer(self):
+        connection = sqlite3.connect(self.path)
+        running = True
+        while running:
+            request = self._requests.get()
+            if request is None:
+                break
+            batch = [request]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    request = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    running = False
+                    break
+                batch.append(request)
+            self._write_batch(connection, batch)
+        connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch):
+        saved_at = time.time()
+        try:
+            with connection:
+                for name, data, _ in batch:
+                    if data is None:
+                        connection.execute('DELETE FROM saves WHERE name = ?', (name,))
+                        connection.execute('DELETE FROM snapshots WHERE name = ?', (name,))
+                    else:
+                        connection.execute('INSERT OR REPLACE INTO saves VALUES (?, ?, ?)', (name, saved_at, len(data)))
+                        connection.execute('INSERT OR REPLACE INTO snapshots VALUES (?, ?)', (name, data))
+            self.transaction_count += 1
+        except sqlite3.Error as exception:
+            for _, _, future in batch:
+                future.set_exception(exception)
+        else:
+            for _, _, future in batch:
+                future.set_result(None)
+        finally:
+            with self._pending_lock:
+                for name, data, _ in batch:
+                    if self._pending.get(name, False) is data:
+                        del self._pending[name]
+
+
+def main():
+    """ Lists the saves of a database or prints one of them. """
+    parser = ArgumentParser(description='Inspects a database of saved rogue-like games.')
+    parser.add_argument('path', type=str, help='path to the database')
+    parser.add_argument('name', type=str, nargs='?', help='name of the save to print')
+    args = parser.parse_args()
+
+    store = SqliteSaveStore(args.path)
+    try:
+        if args.name is None:
+            for info in store.list_saves():
+                print('{}\t{}\t{}'.format(info.name, time.ctime(info.saved_at), info.size))
+        else:
+            print(store.load(args.name))
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+""" Module containing an asyncio server hosting many independent game sessions.
+
+The server speaks a line-based protocol over a local TCP socket, every line being a JSON object.
+The client requests are:
+    {"op": "new"}                           starts a new session and subscribes to it,
+    {"op": "join", "session": id}           subscribes to an existing or a saved session,
+    {"op": "command", "command": name}      passes a player command to the subscribed session,
+                                            the names are the ones of Player.get_commands,
+    {"op": "stats"}                         requests the server's load statistics.
+After subscribing the client receives the full state of the session once, and then only
+the differences caused by every tick or weapon selection: the changed fighters, the ids of the
+removed ones, the selected weapon if it changed and a "dead" flag once the player dies.
+A fighter is described as a list [x, y, hp, kind].
+"""
+import asyncio
+import json
+import logging
+import time
+from argparse import ArgumentParser
+from collections import deque
+from typing import Callable
+
+from src.fighter import Player
+from src.model import Model
+from src.profiler import PROFILE_FILE_NAME, SAMPLE_RATE, SamplingProfiler
+from src.save_store import SaveNotFoundException, SaveStore, SqliteSaveStore
+from src.session import GameSession
+from src.strategies import strategy_serializer
+from src.world_map import FileWorldMapSource, MapTile, RandomV1WorldMapSource, WorldMapSource
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7777
+PLAYER_KIND = 'player'
+SESSION_SAVE_PREFIX = 'session_'
+
+_logger = logging.getLogger(__name__)
+
+
+class ProtocolException(Exception):
+    """ Exception raised if a client sends an invalid request. """
+
+
+def get_percentile(values, percentile: float):
+    """ Returns the given percentile of a collection of numbers, or 0 if it is empty. """
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+class HostedSession:
+    """ A game session together with the state needed to stream it to its clients. """
+    _MAX_QUEUED_COMMANDS = 16
+
+    def __init__(self, session_id: str, session: GameSession):
+        self.session_id = session_id
+        self.session = session
+        self.tick = 0
+        self.subscribers = set()
+        self.scheduled = False
+        self.queued_commands = 0
+        self._commands = session.model.player.get_commands()
+        self._fighter_ids = dict()
+        self._next_fighter_id = 0
+        self._sent_fighters = dict()
+        self._sent_weapon = None
+
+    def apply_command(self, name: str) -> bool:
+        """ Passes a command to the player.
+
+        :returns True if the command is a move that needs a tick, False otherwise.
+        :raises ProtocolException if the command is unknown.
+        """
+        if name not in self._commands:
+            raise ProtocolException('Unknown command {}'.format(name))
+        if name.startswith('select_'):
+            self._commands[name]()
+            return False
+        if self.queued_commands >= HostedSession._MAX_QUEUED_COMMANDS:
+            return False
+        self.queued_commands += 1
+        self._commands[name]()
+        return True
+
+    def get_full_state(self):
+        """ Returns the complete state of the session and remembers it as sent. """
+        game_map = self.session.model.map
+        player = self.session.model.player
+        self._sent_fighters = self._describe_fighters()
+        self._sent_weapon = player.used_weapon
+        return {'session': self.session_id,
+                'tick': self.tick,
+                'map': [''.join('.' if tile == MapTile.EMPTY else 'X' for tile in row) for row in game_map.tiles],
+                'player': self._get_fighter_id(player),
+                'weapons': [weapon.name for weapon in player.inventory],
+                'weapon': self._sent_weapon,
+                'fighters': self._sent_fighters}
+
+    def get_diff(self):
+        """ Returns the changes since the last sent state and remembers the current state as sent. """
+        fighters = self._describe_fighters()
+        diff = {'tick': self.tick}
+        changed = {fighter_id: description for fighter_id, description in fighters.items()
+                   if self._sent_fighters.get(fighter_id) != description}
+        if changed:
+            diff['fighters'] = changed
+        removed = [fighter_id for fighter_id in self._sent_fighters if fighter_id not in fighters]
+        if removed:
+            diff['removed'] = removed
+        used_weapon = self.session.model.player.used_weapon
+        if used_weapon != self._sent_weapon:
+            diff['weapon'] = used_weapon
+        if self.session.player_died:
+            diff['dead'] = True
+        self._sent_fighters = fighters
+        self._sent_weapon = used_weapon
+        return diff
+
+    def _get_fighter_id(self, fighter) -> str:
+        key = id(fighter)
+        if key not in self._fighter_ids:
+            self._fighter_ids[key] = (fighter, str(self._next_fighter_id))
+            self._next_fighter_id += 1
+        return self._fighter_ids[key][1]
+
+    def _describe_fighters(self):
+        fighters = self.session.model.get_fighters()
+        alive = {id(fighter) for fighter in fighters}
+        for key in [key for key in self._fighter_ids if key not in alive]:
+            del self._fighter_ids[key]
+        descriptions = dict()
+        for fighter in fighters:
+            if isinstance(fighter, Player):
+                kind = PLAYER_KIND
+            else:
+                kind = strategy_serializer(fighter.fighting_strategy)['type']
+            descriptions[self._get_fighter_id(fighter)] = [fighter.position.x, fighter.position.y, fighter.hp, kind]
+        return descriptions
+
+
+class GameServer:
+    """ Class hosting many independent game sessions and streaming their states to the clients.
+
+    The ticks of all of the sessions are run by a single scheduler in a round-robin order,
+    one tick of a session per turn, so a session flooded with commands cannot starve the others.
+    """
+    _DEFAULT_MAP_HEIGHT = 30
+    _DEFAULT_MAP_WIDTH = 30
+    _MOB_COUNT = 8
+    _LATENCY_WINDOW = 10000
+    _MAX_CLIENT_BUFFER = 1 << 20
+    _AUTOSAVE_TICKS = 50
+
+    def __init__(self, map_source_factory: Callable[[], WorldMapSource], mob_count: int = _MOB_COUNT,
+                 save_store: SaveStore = None, profiler: SamplingProfiler = None):
+        """ Initializes a server that creates the maps of the new sessions with the given factory.
+
+        If a save store is given, the sessions are saved to it every few ticks and once their last
+        client leaves, and the saved sessions can be joined after the server is restarted.
+        If a profiler is given, it samples the ticks, the slow ones being annotated with the id of
+        the session and the number of the tick in it.
+        """
+        self.map_source_factory = map_source_factory
+        self.mob_count = mob_count
+        self.save_store = save_store
+        self.profiler = profiler
+        self.sessions = dict()
+        self.tick_latencies = deque(maxlen=GameServer._LATENCY_WINDOW)
+        self.tick_count = 0
+        self._next_session_id = 0
+        if save_store is not None:
+            saved_ids = [info.name[len(SESSION_SAVE_PREFIX):] for info in save_store.list_saves()
+                         if info.name.startswith(SESSION_SAVE_PREFIX)]
+            # The store may hold other saves too, so only the names ending in a number are the sessions.
+            self._next_session_id = max((int(saved_id) for saved_id in saved_ids if saved_id.isdecimal()),
+                                        default=-1) + 1
+        self._ready = deque()
+        self._wakeup = None
+        self._scheduler = None
+        self._client_tasks = set()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """ Starts listening for clients and running the scheduler, returns the asyncio server. """
+        self._wakeup = asyncio.Event()
+        self._scheduler = asyncio.ensure_future(self._run_scheduler())
+        return await asyncio.start_server(self._handle_client, host, port)
+
+    def stop(self):
+        """ Stops the scheduler. """
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            self._scheduler = None
+
+    async def wait_clients(self):
+        """ Waits until the handlers of all of the connected clients end. """
+        await asyncio.gather(*self._client_tasks, return_exceptions=True)
+
+    async def create_session(self) -> HostedSession:
+        """ Creates a session on a new map, generating the map without blocking the other sessions. """
+        loop = asyncio.get_event_loop()
+        game_map = await loop.run_in_executor(None, lambda: self.map_source_factory().get())
+        session_id = str(self._next_session_id)
+        self._next_session_id += 1
+        hosted = HostedSession(session_id, GameSession.new_game(game_map, self.mob_count))
+        self.sessions[session_id] = hosted
+        return hosted
+
+    def restore_session(self, session_id: str) -> HostedSession:
+        """ Returns the session with the given id, loading it from the save store if needed.
+
+        :raises ProtocolException if there is no such session.
+        """
+        if session_id in self.sessions:
+            return self.sessions[session_id]
+        if self.save_store is None:
+            raise ProtocolException('Unknown session {}'.format(session_id))
+        try:
+            snapshot = self.save_store.load(SESSION_SAVE_PREFIX + session_id)
+        except SaveNotFoundException:
+            raise ProtocolException('Unknown session {}'.format(session_id))
+        restored_model = Model()
+        restored_model.set_snapshot(snapshot)
+        hosted = HostedSession(session_id, GameSession(restored_model))
+        self.sessions[session_id] = hosted
+        return hosted
+
+    def save_session(self, hosted: HostedSession):
+        """ Queues a save of the session's state if the server has a save store.
+
+        :returns the future of the write, or None if there is no save store.
+        """
+        if self.save_store is None:
+            return None
+        if hosted.session.player_died:
+            return self.save_store.delete(SESSION_SAVE_PREFIX + hosted.session_id)
+        return self.save_store.save(SESSION_SAVE_PREFIX + hosted.session_id, hosted.session.model.get_snapshot())
+
+    def submit(self, hosted: HostedSession, command: str):
+        """ Passes a command to a session and schedules its tick or streams the weapon change.
+
+        :raises ProtocolException if the command is unknown.
+        """
+        if hosted.apply_command(command):
+            if not hosted.scheduled:
+                hosted.scheduled = True
+                self._ready.append(hosted)
+                self._wakeup.set()
+        else:
+            self._broadcast(hosted, hosted.get_diff())
+
+    def get_stats(self):
+        """ Returns the server's load statistics. """
+        return {'sessions': len(self.sessions),
+                'ticks': self.tick_count,
+                'p50': get_percentile(self.tick_latencies, 50),
+                'p99': get_percentile(self.tick_latencies, 99),
+                'cpu': time.process_time()}
+
+    async def _run_scheduler(self):
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            hosted = self._ready.popleft()
+            start = time.perf_counter()
+            try:
+                if self.profiler is None:
+                    hosted.session.tick()
+                else:
+                    with self.profiler.tick('{}:{}'.format(hosted.session_id, hosted.tick + 1)):
+                        hosted.session.tick()
+            except Exception:
+                # A broken session must not stop the scheduler, which runs the ticks of all of the others.
+                _logger.exception('Tick %d of session %s failed', hosted.tick + 1, hosted.session_id)
+                self._drop(hosted)
+                await asyncio.sleep(0)
+                continue
+            self.tick_latencies.append(time.perf_counter() - start)
+            self.tick_count += 1
+            hosted.tick += 1
+            hosted.queued_commands -= 1
+            self._broadcast(hosted, hosted.get_diff())
+            if hosted.session.player_died or hosted.tick % GameServer._AUTOSAVE_TICKS == 0:
+                self.save_session(hosted)
+            if hosted.session.player_died:
+                self.sessions.pop(hosted.session_id, None)
+                hosted.scheduled = False
+            elif hosted.session.model.player.has_intention():
+                self._ready.append(hosted)
+            else:
+                hosted.scheduled = False
+                if not hosted.subscribers:
+                    self._save_and_evict(hosted)
+            await asyncio.sleep(0)
+
+    def _drop(self, hosted: HostedSession):
+        """ Removes a failed session without saving it and disconnects its clients, its last save is kept. """
+        if self.sessions.get(hosted.session_id) is hosted:
+            del self.sessions[hosted.session_id]
+        hosted.scheduled = False
+        self._broadcast(hosted, {'error': 'Session {} failed'.format(hosted.session_id)})
+        for writer in list(hosted.subscribers):
+            writer.close()
+        hosted.subscribers.clear()
+
+    def _broadcast(self, hosted: HostedSession, message):
+        line = (json.dumps(message, separators=(',', ':')) + '\n').encode()
+        for writer in list(hosted.subscribers):
+            if writer.transport.get_write_buffer_size() > GameServer._MAX_CLIENT_BUFFER:
+                # The client does not read its updates, so it is dropped instead of buffering them forever.
+                hosted.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        hosted = None
+        task = asyncio.current_task()
+        self._client_tasks.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    hosted = await self._handle_request(json.loads(line), hosted, writer)
+                except (ProtocolException, ValueError, KeyError, TypeError) as exception:
+                    writer.write((json.dumps({'error': str(exception)}) + '\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if hosted is not None:
+                self._unsubscribe(hosted, writer)
+            writer.close()
+            self._client_tasks.discard(task)
+
+    def _unsubscribe(self, hosted: HostedSession, writer: asyncio.StreamWriter):
+        hosted.subscribers.discard(writer)
+        if self.sessions.get(hosted.session_id) is not hosted:
+            # The session has been dropped after failing, or has ended.
+            return
+        if not hosted.subscribers and not hosted.scheduled and not hosted.session.player_died:
+            self._save_and_evict(hosted)
+
+    def _save_and_evict(self, hosted: HostedSession):
+        """ Saves a session without clients and drops it from memory once the save is written.
+
+        The session is kept if a client joins it or it is scheduled again before the write ends,
+        and always if there is no save store to restore it from.
+        """
+        future = self.save_session(hosted)
+        if future is None:
+            return
+        loop = asyncio.get_event_loop()
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._evict, hosted, done))
+
+    def _evict(self, hosted: HostedSession, saved):
+        if saved.exception() is not None or hosted.subscribers or hosted.scheduled:
+            return
+        if self.sessions.get(hosted.session_id) is hosted:
+            del self.sessions[hosted.session_id]
+
+    async def _handle_request(self, request, hosted: HostedSession, writer: asyncio.StreamWriter):
+        if not isinstance(request, dict):
+            raise ProtocolException('Invalid request {}'.format(json.dumps(request)))
+        op = request['op']
+        if op == 'stats':
+            writer.write((json.dumps(self.get_stats()) + '\n').encode())
+            return hosted
+        if op in ['new', 'join']:
+            if op == 'new':
+                joined = await self.create_session()
+            else:
+                joined = self.restore_session(str(request['session']))
+            if hosted is not None:
+                self._unsubscribe(hosted, writer)
+            hosted = joined
+            hosted.subscribers.add(writer)
+            writer.write((json.dumps(hosted.get_full_state(), separators=(',', ':')) + '\n').encode())
+            return hosted
+        if op == 'command':
+            if hosted is None:
+                raise ProtocolException('No session joined')
+            self.submit(hosted, request['command'])
+            return hosted
+        raise ProtocolException('Unknown operation {}'.format(op))
+
+
+def main():
+    """ Runs the game server until it is interrupted. """
+    parser = ArgumentParser(description='A server hosting many rogue-like game sessions.')
+    parser.add_argument('map_path', type=str, nargs='?', help='path to the map file used by every session')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--mobs', type=int, default=GameServer._MOB_COUNT, help='amount of mobs in a session')
+    parser.add_argument('--save_db', type=str, default=None, help='path to an SQLite database to save the sessions in')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE_NAME, default=None, metavar='path',
+                        help='sample the stacks of the ticks and write them for a flame graph on exit')
+    parser.add_argument('--profile_rate', type=float, default=SAMPLE_RATE, help='amount of the stack samples a second')
+    args = parser.parse_args()
+
+    save_store = SqliteSaveStore(args.save_db) if args.save_db is not None else None
+    profiler = SamplingProfiler(args.profile, args.profile_rate) if args.profile is not None else None
+    if args.map_path is not None:
+        server = GameServer(lambda: FileWorldMapSource(args.map_path), args.mobs, save_store, profiler)
+    else:
+        server = GameServer(lambda: RandomV1WorldMapSource(GameServer._DEFAULT_MAP_HEIGHT,
+                                                           GameServer._DEFAULT_MAP_WIDTH), args.mobs, save_store,
+                            profiler)
+    if profiler is not None:
+        profiler.start()
+
+    async def serve():
+        asyncio_server = await server.start(args.host, args.port)
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if save_store is not None:
+            for hosted in server.sessions.values():
+                server.save_session(hosted)
+            save_store.close()
+        if profiler is not None:
+            profiler.stop()
+            profiler.write()
+
+
+if __name__ == '__main__':
+    main()
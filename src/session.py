@@ -0,0 +1,73 @@
+""" Module containing the game logic of a single game session, independent of its input and output. """
+import random
+
+import src.fighter
+from src import model
+from src.chunked_map import ChunkedWorldMap
+from src.fighting_system import CoolFightingSystem
+
+
+class GameSession:
+    """ Class advancing the world of one game by ticks. """
+
+    def __init__(self, current_model: 'model.Model', fighting_system=None, spawner=None):
+        """ Initializes a session running the given model.
+
+        The spawner, if given, is notified after every tick and may add new mobs to the model.
+        """
+        self.model = current_model
+        self.fighting_system = fighting_system if fighting_system is not None else CoolFightingSystem()
+        self.spawner = spawner
+        self.player_died = False
+
+    @staticmethod
+    def new_game(game_map, mob_count: int) -> 'GameSession':
+        """ Creates a session with a new player and mob_count random mobs on the given map. """
+        positions = game_map.get_random_empty_positions(mob_count + 1)
+        player = src.fighter.create_player(positions[0])
+        mobs = [src.fighter.create_random_mob(position) for position in positions[1:]]
+        return GameSession(model.Model(game_map, player, mobs))
+
+    def tick(self):
+        """ Lets every fighter make one move in a random order and removes the killed mobs. """
+        game_map = self.model.map
+        # The fighters are taken by their indices, as a forked model replaces the ones it changes by copies.
+        order = list(range(len(self.model.mobs) + 1))
+
+        random.shuffle(order)
+        self.model.get_planner().plan(self.model)
+
+        for index in order:
+            fighter = self.model.player if index == 0 else self.model.mobs[index - 1]
+            if fighter.is_choice_stateful():
+                fighter = self.model.get_writable(fighter)
+            intended_position = fighter.choose_move(self.model)
+            if intended_position == fighter.position or not game_map.is_empty(intended_position):
+                continue
+            target = self.model.get_fighter_at(intended_position)
+            if target is not None:
+                self.fighting_system.fight(fighter, self.model.get_writable(target))
+            else:
+                self.model.get_writable(fighter).position = intended_position
+
+        self._finish_tick()
+
+    def close(self):
+        """ Releases the resources held by the session, the sequential session holding none. """
+
+    def _finish_tick(self):
+        """ Removes the killed mobs and lets the spawner add new ones after the fighters have moved. """
+        game_map = self.model.map
+        if isinstance(game_map, ChunkedWorldMap):
+            game_map.track(self.model.player.position)
+
+        if self.model.player.hp <= 0:
+            self.player_died = True
+        mobs = []
+        for mob in self.model.mobs:
+            if mob.hp > 0:
+                mobs.append(mob)
+        self.model.mobs = mobs
+
+        if self.spawner is not None:
+            self.spawner.on_tick()
@@ -0,0 +1,128 @@
+""" Module containing the read-only map shared by the processes without copying its tiles. """
+import mmap
+import os
+import struct
+import tempfile
+import weakref
+from typing import List, Optional
+
+import src.fov
+import src.path_service
+from src.world_map import MapTile, Position, WorldMap
+
+# The directory of the files of the shared maps, a memory-backed one where there is such.
+SHARED_MAP_DIRECTORY = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# The height, the width and the coordinates of the stairs up and down, -1 standing for no stairs.
+_HEADER = struct.Struct('<6i')
+_TILES = {tile.value: tile for tile in MapTile}
+
+
+def _unmap(tiles: mmap.mmap, path: Optional[str]):
+    """ Unmaps the tiles and removes their file if path is given, the mappings of the other processes staying valid. """
+    tiles.close()
+    if path is not None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class SharedWorldMap:
+    """ Class storing the tiles of a map in a memory-mapped file, one byte per tile, which other processes map too.
+
+    A map is created by create in one process, its owner, and is sent to the workers by its path:
+    pickling a shared map pickles only the path, and unpickling maps the same file read-only, so
+    the tiles are neither copied nor can be changed. The map answers the queries of WorldMap the
+    strategies use, and every process builds its own path service and field of view of it.
+
+    The owner removes the file when it closes the map or the map is collected, the processes
+    which have mapped it keep using it until they close their copies. A closed map raises
+    ValueError on the queries of its tiles.
+    """
+
+    def __init__(self, path: str, owner: bool = False):
+        """ Maps the shared map stored in the file at path, removing the file on close if owner is set.
+
+        :raises FileNotFoundError if the owner has already removed the file.
+        """
+        with open(path, 'rb') as file:
+            self._tiles = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.height, self.width, up_x, up_y, down_x, down_y = _HEADER.unpack_from(self._tiles)
+        self.stairs_up = Position(up_x, up_y) if up_x >= 0 else None
+        self.stairs_down = Position(down_x, down_y) if down_x >= 0 else None
+        self._path_service = None
+        self._field_of_view = None
+        self._finalizer = weakref.finalize(self, _unmap, self._tiles, path if owner else None)
+
+    @staticmethod
+    def create(game_map: WorldMap, directory: Optional[str] = SHARED_MAP_DIRECTORY) -> 'SharedWorldMap':
+        """ Stores the tiles of the map in a new file in the directory and returns the shared map owning it. """
+        stairs = []
+        for position in [game_map.stairs_up, game_map.stairs_down]:
+            stairs.extend([position.x, position.y] if position is not None else [-1, -1])
+        descriptor, path = tempfile.mkstemp(prefix='map_', suffix='.tiles', dir=directory)
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(_HEADER.pack(game_map.height, game_map.width, *stairs))
+            file.write(bytes(tile.value for row in game_map.tiles for tile in row))
+        return SharedWorldMap(path, owner=True)
+
+    def close(self):
+        """ Unmaps the tiles, and removes their file if this is the owner's map. """
+        self._finalizer()
+
+    def __enter__(self) -> 'SharedWorldMap':
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def __reduce__(self):
+        return SharedWorldMap, (self.path,)
+
+    def to_world_map(self) -> WorldMap:
+        """ Returns a WorldMap with a copy of the tiles, which may be changed. """
+        tiles = [[self.get_tile(Position(x, y)) for y in range(self.width)] for x in range(self.height)]
+        return WorldMap(self.height, self.width, tiles, self.stairs_up, self.stairs_down)
+
+    def get_version(self) -> int:
+        """ Returns the version of the map's tiles, which never change. """
+        return 0
+
+    def get_path_service(self) -> 'src.path_service.PathService':
+        """ Returns the service finding and caching the paths on this map in this process. """
+        if self._path_service is None:
+            self._path_service = src.path_service.PathService(self)
+        return self._path_service
+
+    def get_field_of_view(self) -> 'src.fov.FieldOfView':
+        """ Returns the field of view computation of this map in this process. """
+        if self._field_of_view is None:
+            self._field_of_view = src.fov.FieldOfView(self)
+        return self._field_of_view
+
+    def get_tile(self, position: Position) -> MapTile:
+        """ Returns the tile in a position on the map. """
+        return _TILES[self._tiles[_HEADER.size + position.x * self.width + position.y]]
+
+    def is_empty(self, position: Position):
+        """ Checks whether a tile on the map is empty. """
+        return self.is_on_map(position) and \
+            self._tiles[_HEADER.size + position.x * self.width + position.y] == MapTile.EMPTY.value
+
+    get_distance = staticmethod(WorldMap.get_distance)
+
+    def get_empty_neighbors(self, position: Position) -> List[Position]:
+        """ Returns list of positions of empty tiles at manhattan distance 1. """
+        empty_neighbors = []
+        # The neighbours are visited in the order of WorldMap, so the random choices among them are the same.
+        for dx, dy in {(0, 1), (0, -1), (1, 0), (-1, 0)}:
+            neighbor = Position(position.x + dx, position.y + dy)
+            if self.is_empty(neighbor):
+                empty_neighbors.append(neighbor)
+        return empty_neighbors
+
+    def is_on_map(self, position: Position):
+        """ Returns True if the given position exists on the map, False otherwise. """
+        return 0 <= position.x < self.height and 0 <= position.y < self.width
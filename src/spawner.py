@@ -0,0 +1,85 @@
+""" Module containing the spawner adding new mobs during the game. """
+import src.events
+import src.fighter
+import src.model
+from src.free_cells import FreeCellIndex
+from src.world_map import WorldMap
+
+
+class MobSpawner:
+    """ Class adding waves of mobs to the model every few ticks.
+
+    The mobs appear on the free tiles far enough from the player. The free tiles are kept in
+    an index that is updated by the events of the fighters' moves and deaths, so neither the
+    map nor the fighters are rescanned, except when the player goes to another level.
+    """
+    _DEFAULT_INTERVAL = 30
+    _DEFAULT_WAVE_SIZE = 3
+    _DEFAULT_MIN_DISTANCE = 8
+    _DEFAULT_MAX_MOBS = 30
+
+    def __init__(self, current_model: 'src.model.Model', interval: int = _DEFAULT_INTERVAL,
+                 wave_size: int = _DEFAULT_WAVE_SIZE, min_distance: int = _DEFAULT_MIN_DISTANCE,
+                 max_mobs: int = _DEFAULT_MAX_MOBS):
+        """ Initializes a spawner of the given model.
+
+        :param interval: the amount of ticks between the waves.
+        :param wave_size: the maximal amount of mobs in a wave.
+        :param min_distance: the minimal distance from the player to a new mob.
+        :param max_mobs: the amount of mobs above which no more mobs are spawned.
+        :raises ValueError if the interval is not positive.
+        """
+        if interval <= 0:
+            raise ValueError('Invalid spawn interval')
+        self.model = current_model
+        self.interval = interval
+        self.wave_size = wave_size
+        self.min_distance = min_distance
+        self.max_mobs = max_mobs
+        self.ticks = 0
+        self.index = None
+        self._map = None
+        event_bus = current_model.get_event_bus()
+        event_bus.subscribe(src.events.FighterMoved, self._on_moved)
+        event_bus.subscribe(src.events.FighterDied, self._on_died)
+
+    def on_tick(self):
+        """ Updates the free tiles with the fighters' moves and spawns a wave if it is time to. """
+        if not isinstance(self.model.map, WorldMap):
+            return
+        if self.index is None or self._map is not self.model.map:
+            self._rebuild()
+        self.ticks += 1
+        if self.ticks % self.interval == 0:
+            self.spawn_wave()
+
+    def spawn_wave(self):
+        """ Adds up to wave_size new mobs to the model and returns them. """
+        if self.index is None or self._map is not self.model.map:
+            self._rebuild()
+        count = min(self.wave_size, self.max_mobs - len(self.model.mobs))
+        if count <= 0:
+            return []
+        positions = self.index.sample_far_from(self.model.player.position, self.min_distance, count)
+        mobs = [src.fighter.create_random_mob(position) for position in positions]
+        for mob in mobs:
+            self.index.occupy(mob.position)
+        self.model.mobs = self.model.mobs + mobs
+        return mobs
+
+    def _rebuild(self):
+        """ Builds the index of the current map, the player has come to it. """
+        self._map = self.model.map
+        self.index = FreeCellIndex(self._map, [fighter.position for fighter in self.model.get_fighters()])
+
+    def _is_index_current(self) -> bool:
+        # The events of another level are skipped, its index is rebuilt on the next tick.
+        return self.index is not None and self._map is self.model.map
+
+    def _on_moved(self, event: 'src.events.FighterMoved'):
+        if self._is_index_current():
+            self.index.move(event.old_position, event.new_position)
+
+    def _on_died(self, event: 'src.events.FighterDied'):
+        if self._is_index_current():
+            self.index.release(event.fighter.position)
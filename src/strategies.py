@@ -19,6 +19,8 @@ def strategy_serializer(obj, **_kwargs):
         return {'type': 'cowardly'}
     if isinstance(obj, PassiveStrategy):
         return {'type': 'passive'}
+    if isinstance(obj, LookaheadStrategy):
+        return {'type': 'lookahead'}
     if isinstance(obj, ConfusedStrategy):
         return {'type': 'confused',
                 'original': strategy_serializer(obj.original_strategy),
@@ -34,6 +36,8 @@ def strategy_deserializer(obj, cls: type, **_kwargs):
         return CowardlyStrategy()
     if obj['type'] == 'passive':
         return PassiveStrategy()
+    if obj['type'] == 'lookahead':
+        return LookaheadStrategy()
     if obj['type'] == 'confused':
         return ConfusedStrategy(strategy_deserializer(obj['original'], cls=FightingStrategy), obj['confusion_time'])
     return None
@@ -54,12 +58,25 @@ class FightingStrategy:
         """
         return self
 
+    def is_stateful(self) -> bool:
+        """ Checks whether update_strategy returns another strategy. """
+        return False
+
 
 class AggressiveStrategy(FightingStrategy):
-    """ An aggressive strategy that always moves towards the player and attacks them. """
+    """ An aggressive strategy that always moves towards the player and attacks them.
+
+    The mob follows a shortest path around the walls, or approaches the player greedily if there is none.
+    A mob that does not see the player stays in place.
+    """
     @staticmethod
     def choose_move(current_model: 'src.model.Model', mob: 'src.fighter.Mob'):
+        if not current_model.is_player_visible_from(mob.position):
+            return mob.position
         player_position = current_model.player.position
+        next_position = current_model.map.get_path_service().get_next_step(mob.position, player_position)
+        if next_position is not None:
+            return next_position
         best_position = mob.position
 
         for new_position in current_model.map.get_empty_neighbors(mob.position):
@@ -71,9 +88,11 @@ class AggressiveStrategy(FightingStrategy):
 
 
 class CowardlyStrategy(FightingStrategy):
-    """ A cowardly strategy that always moves away from the player. """
+    """ A cowardly strategy that moves away from the player while it sees them. """
     @staticmethod
     def choose_move(current_model: 'src.model.Model', mob: 'src.fighter.Mob'):
+        if not current_model.is_player_visible_from(mob.position):
+            return mob.position
         player_position = current_model.player.position
         best_position = mob.position
 
@@ -105,5 +124,25 @@ class ConfusedStrategy(FightingStrategy):
         return choice(neighbours)
 
     def update_strategy(self):
-        self.confusion_time -= 1
-        return self if self.confusion_time else self.original_strategy
+        # A new strategy is returned instead of changing this one, as it may be shared by forked models.
+        if self.confusion_time > 1:
+            return ConfusedStrategy(self.original_strategy, self.confusion_time - 1)
+        return self.original_strategy
+
+    def is_stateful(self) -> bool:
+        return True
+
+
+class LookaheadStrategy(FightingStrategy):
+    """ A strategy searching a few moves ahead for the move hurting the player the most while keeping the mob alive.
+
+    The searches of all of the mobs are run by the planner of the model at the start of a tick,
+    within a time budget shared by them. A mob whose search has not ended in time moves like an
+    aggressive one.
+    """
+    @staticmethod
+    def choose_move(current_model: 'src.model.Model', mob: 'src.fighter.Mob'):
+        planned_move = current_model.get_planner().get_move(mob)
+        if planned_move is not None:
+            return planned_move
+        return AggressiveStrategy.choose_move(current_model, mob)
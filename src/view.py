@@ -14,8 +14,11 @@ PLAYER_COLOR = tcod.yellow
 MOB_COLOR = tcod.red
 TEXT_COLOR = tcod.white
 HUD_COLOR = tcod.black
+UNSEEN_COLOR = (24, 24, 40)
 
 ORD_SMILEY = 1
+ORD_STAIRS_UP = ord('<')
+ORD_STAIRS_DOWN = ord('>')
 
 VIEW_HEIGHT = 13
 VIEW_WIDTH = 13
@@ -39,10 +42,21 @@ class View:
         """ Displays the current state of the given Model. """
         self.console.clear()
         offset = - model.player.position.x + OFFSETX, - model.player.position.y + OFFSETY
+        visible = model.get_visible_tiles()
         for i in range(VIEW_HEIGHT):
             for j in range(VIEW_WIDTH):
-                self.console.bg[i, j] = PATH_COLOR if model.map.is_empty(Position(i - offset[0], j - offset[1])) else WALL_COLOR
+                position = Position(i - offset[0], j - offset[1])
+                if (position.x, position.y) not in visible:
+                    self.console.bg[i, j] = UNSEEN_COLOR
+                else:
+                    self.console.bg[i, j] = PATH_COLOR if model.map.is_empty(position) else WALL_COLOR
+        if model.map.stairs_up is not None and self._is_visible(model.map.stairs_up, visible):
+            self._draw_character(model.map.stairs_up, offset, ch=ORD_STAIRS_UP, fg=TEXT_COLOR)
+        if model.map.stairs_down is not None and self._is_visible(model.map.stairs_down, visible):
+            self._draw_character(model.map.stairs_down, offset, ch=ORD_STAIRS_DOWN, fg=TEXT_COLOR)
         for mob in model.mobs:
+            if not self._is_visible(mob.position, visible):
+                continue
             intensity = 50 + int(mob.hp / MOB_HP * 200)
             if isinstance(mob.fighting_strategy, ConfusedStrategy):
                 color = (0, intensity, 0)
@@ -64,6 +78,7 @@ class View:
         self.console.print(VIEW_WIDTH, 0, 'HP  ' + str(model.player.hp))
         self.console.print(VIEW_WIDTH, 1, 'ATK ' + str(model.player.get_base_attack()) + '+' + str(model.player.get_additional_attack()))
         self.console.print(VIEW_WIDTH, 2, 'DEF ' + str(model.player.get_defence()))
+        self.console.print(VIEW_WIDTH, 3, 'LVL ' + str(model.depth))
         self.console.print(VIEW_WIDTH, 4, 'ITEMS:')
         for i in range(len(model.player.inventory)):
             start = '*' if i == model.player.used_weapon else ' '
@@ -78,6 +93,10 @@ class View:
         self.console.clear(bg=tcod.black)
         self.console.print(TOTAL_WIDTH // 2, TOTAL_HEIGHT // 2, msg, alignment=tcod.CENTER)
 
+    @staticmethod
+    def _is_visible(position, visible):
+        return (position.x, position.y) in visible
+
     def _draw_character(self, pos, offset, ch=None, fg=None, bg=None):
         pos_pair = pos.x + offset[0], pos.y + offset[1]
         if pos_pair[0] < 0 or pos_pair[0] >= VIEW_HEIGHT or\
@@ -5,6 +5,7 @@ from dataclasses import dataclass
 @dataclass
 class Weapon:
     """ Class for storing various weapons in the game. """
+    __slots__ = ('name', 'attack', 'defence', 'confusion_prob')
     name: str
     attack: int
     defence: int
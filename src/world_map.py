@@ -3,17 +3,71 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from random import randrange
 from itertools import product
-from dataclasses import dataclass
-from typing import List, Iterable
+from typing import List, Iterable, Optional
 
 import random
 
+import numpy
+
+import src.fov
+import src.path_service
+
+
+# The positions with both coordinates in [0, INTERNED_COORDINATES) are interned, one object per tile.
+INTERNED_COORDINATES = 256
+# The rows of the interned positions by x, created on the first use.
+_interned_positions: 'List[Optional[List[Optional[Position]]]]' = [None] * INTERNED_COORDINATES
+
 
-@dataclass
 class Position:
-    """ Class for storing the position of various objects on the map. """
-    x: int
-    y: int
+    """ Class for storing the position of various objects on the map.
+
+    The positions are immutable and hashable, so they may be shared and used as keys. The
+    positions of the tiles of the usual maps are interned: creating one returns the same
+    object every time instead of allocating a new one.
+    """
+    __slots__ = ('x', 'y')
+
+    def __new__(cls, x: int, y: int):
+        if 0 <= x < INTERNED_COORDINATES and 0 <= y < INTERNED_COORDINATES:
+            row = _interned_positions[x]
+            if row is None:
+                row = _interned_positions[x] = [None] * INTERNED_COORDINATES
+            position = row[y]
+            if position is None:
+                position = row[y] = Position._create(x, y)
+            return position
+        return Position._create(x, y)
+
+    def __init__(self, x: int, y: int):
+        """ Does nothing, the coordinates are set by __new__. The signature is the one jsons deserializes with. """
+
+    @staticmethod
+    def _create(x: int, y: int) -> 'Position':
+        position = object.__new__(Position)
+        object.__setattr__(position, 'x', x)
+        object.__setattr__(position, 'y', y)
+        return position
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Position is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Position is immutable')
+
+    def __eq__(self, other):
+        if other.__class__ is not Position:
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __repr__(self):
+        return 'Position(x={}, y={})'.format(self.x, self.y)
+
+    def __reduce__(self):
+        return Position, (self.x, self.y)
 
 
 class MapParsingException(Exception):
@@ -44,13 +98,23 @@ class WorldMap:
     _DEFAULT_MAP_SIZE = 10
 
     def __init__(self, height: int = _DEFAULT_MAP_SIZE, width: int = _DEFAULT_MAP_SIZE,
-                 tiles: 'List[List[MapTile]]' = None):
-        """ Generates a default map example. """
+                 tiles: 'List[List[MapTile]]' = None, stairs_up: Optional[Position] = None,
+                 stairs_down: Optional[Position] = None):
+        """ Generates a default map example.
+
+        The stairs leading to the neighbouring dungeon levels are optional,
+        a map without them is a standalone level.
+        """
         self.height = height
         self.width = width
         if tiles is None:
             tiles = [[MapTile.EMPTY for _ in range(self.width)] for _ in range(self.height)]
         self.tiles = tiles
+        self.stairs_up = stairs_up
+        self.stairs_down = stairs_down
+        self._version = 0
+        self._path_service = None
+        self._field_of_view = None
 
     @staticmethod
     def from_tiles(tiles: List[List[MapTile]]):
@@ -63,17 +127,32 @@ class WorldMap:
 
     def get_random_empty_positions(self, count=1):
         """ Returns a list of random non-repeating empty positions on the map of length count. """
-        positions = []
-        empty = []
-        for i in range(self.height):
-            for j in range(self.width):
-                if self.tiles[i][j] == MapTile.EMPTY:
-                    empty.append(Position(i, j))
-        for i in range(count):
-            p = random.randrange(0, len(empty))
-            positions.append(empty[p])
-            empty.pop(p)
-        return positions
+        empty = [(i, j) for i in range(self.height) for j in range(self.width) if self.tiles[i][j] == MapTile.EMPTY]
+        return [Position(i, j) for i, j in random.sample(empty, count)]
+
+    def get_version(self) -> int:
+        """ Returns the version of the map's tiles, which grows with every change of them. """
+        return self._version
+
+    def set_tile(self, position: Position, tile: MapTile):
+        """ Changes a tile of the map.
+
+        The tiles should be changed only with this method, so that the cached paths of the map are invalidated.
+        """
+        self.tiles[position.x][position.y] = tile
+        self._version += 1
+
+    def get_path_service(self) -> 'src.path_service.PathService':
+        """ Returns the service finding and caching the paths on this map. """
+        if self._path_service is None:
+            self._path_service = src.path_service.PathService(self)
+        return self._path_service
+
+    def get_field_of_view(self) -> 'src.fov.FieldOfView':
+        """ Returns the field of view computation of this map. """
+        if self._field_of_view is None:
+            self._field_of_view = src.fov.FieldOfView(self)
+        return self._field_of_view
 
     def is_empty(self, position: Position):
         """ Checks whether a tile on the map is empty. """
@@ -109,10 +188,14 @@ class WorldMap:
             return 0 <= x < len(was_visited) and 0 <= y < len(was_visited[x])
 
         def _dfs(x, y):
-            if _is_valid_tile(x, y) and not was_visited[x][y]:
-                was_visited[x][y] = True
-                for dx, dy in {(0, 1), (0, -1), (1, 0), (-1, 0)}:
-                    _dfs(x + dx, y + dy)
+            # An explicit stack instead of recursion, so that large maps do not overflow the call stack.
+            stack = [(x, y)]
+            while stack:
+                x, y = stack.pop()
+                if _is_valid_tile(x, y) and not was_visited[x][y]:
+                    was_visited[x][y] = True
+                    for dx, dy in {(0, 1), (0, -1), (1, 0), (-1, 0)}:
+                        stack.append((x + dx, y + dy))
 
         component_amount = 0
         for x, y in product(range(len(self.tiles)), range(max(map(len, self.tiles)))):
@@ -122,6 +205,19 @@ class WorldMap:
         return component_amount == 1
 
 
+def encode_map(game_map: WorldMap) -> bytes:
+    """ Returns the tiles of the map packed into one bit per tile. """
+    walls = numpy.array([[tile != MapTile.EMPTY for tile in row] for row in game_map.tiles], dtype=bool)
+    return numpy.packbits(walls).tobytes()
+
+
+def decode_map(data: bytes, height: int, width: int) -> WorldMap:
+    """ Builds a map of the given size from its tiles packed by encode_map. """
+    walls = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8))[:height * width].reshape(height, width)
+    tiles = numpy.array([MapTile.EMPTY, MapTile.BLOCKED], dtype=object)[walls.astype(numpy.intp)].tolist()
+    return WorldMap(height, width, tiles)
+
+
 class WorldMapSource(ABC):
     """ Base class for map loaders/generators. """
 
@@ -140,21 +236,40 @@ class FileWorldMapSource(WorldMapSource):
     If the map loading fails and an exception is thrown the old map is left unmodified.
     """
 
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, cache: 'Optional[src.map_cache.MapCache]' = None):
+        """ Initializes a source of the map in the given file.
+
+        If a cache is given, a map parsed and validated once is taken from it while the file does not change.
+        """
         self.file_name = file_name
+        self.cache = cache
 
     def get(self) -> WorldMap:
         """
         :raises MapParsingException if the file's contents could not be parsed into a valid map.
         """
         try:
-            with open(self.file_name, 'r') as fin:
-                lines = FileWorldMapSource._trim_lines(fin.readlines())
-                game_map = WorldMap.from_tiles(FileWorldMapSource._convert_to_tiles(lines))
-                if not game_map.is_one_component():
-                    raise MapParsingException('Map is not a connected component')
+            with open(self.file_name, 'rb') as fin:
+                data = fin.read()
         except IOError as exception:
             raise MapParsingException(exception)
+        if self.cache is None:
+            return FileWorldMapSource.parse(data)
+        return self.cache.get_or_parse(data, FileWorldMapSource.parse)
+
+    @staticmethod
+    def parse(data: bytes) -> WorldMap:
+        """ Parses the contents of a map file into a map.
+
+        :raises MapParsingException if the contents could not be parsed into a valid map.
+        """
+        try:
+            lines = FileWorldMapSource._trim_lines(data.decode().splitlines())
+        except UnicodeDecodeError as exception:
+            raise MapParsingException(exception)
+        game_map = WorldMap.from_tiles(FileWorldMapSource._convert_to_tiles(lines))
+        if not game_map.is_one_component():
+            raise MapParsingException('Map is not a connected component')
         return game_map
 
     @staticmethod
@@ -211,3 +326,84 @@ class RandomV1WorldMapSource(WorldMapSource):
                 game_map.tiles[block_x][block_y] = MapTile.EMPTY
 
         return game_map
+
+
+class RandomV2WorldMapSource(WorldMapSource):
+    """ Generates a cave map of size height x width with a cellular automaton.
+
+    The tiles are walls at random at first, then every step of the automaton makes a tile a wall if at
+    least five of its eight neighbours are walls, or if it is a wall and four of them are. The steps
+    work on a NumPy grid at once. Finally only the largest connected region of the empty tiles is kept.
+    """
+    _WALL_PERCENTAGE = 0.45
+    _STEPS = 4
+
+    def __init__(self, height: int, width: int, seed: Optional[int] = None) -> None:
+        """ :raises ValueError if height or width are incorrect. """
+        if height <= 0:
+            raise ValueError('Invalid map height')
+        if width <= 0:
+            raise ValueError('Invalid map width')
+        self.height = height
+        self.width = width
+        self.seed = seed
+
+    def get(self) -> WorldMap:
+        generator = numpy.random.default_rng(self.seed)
+        walls = generator.random((self.height, self.width)) < RandomV2WorldMapSource._WALL_PERCENTAGE
+        for _ in range(RandomV2WorldMapSource._STEPS):
+            counts = RandomV2WorldMapSource._count_wall_neighbors(walls)
+            walls = (counts >= 5) | (walls & (counts >= 4))
+        walls = RandomV2WorldMapSource._keep_largest_region(walls)
+        tiles = numpy.array([MapTile.EMPTY, MapTile.BLOCKED], dtype=object)[walls.astype(numpy.intp)].tolist()
+        return WorldMap(self.height, self.width, tiles)
+
+    @staticmethod
+    def _count_wall_neighbors(walls: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the amount of the walls among the eight neighbours of every tile, counting the outside as walls. """
+        height, width = walls.shape
+        padded = numpy.pad(walls, 1, constant_values=True).astype(numpy.uint8)
+        counts = numpy.zeros((height, width), dtype=numpy.uint8)
+        for dx in range(3):
+            for dy in range(3):
+                if dx != 1 or dy != 1:
+                    counts += padded[dx:dx + height, dy:dy + width]
+        return counts
+
+    @staticmethod
+    def _keep_largest_region(walls: numpy.ndarray) -> numpy.ndarray:
+        """ Turns into walls all of the empty tiles except the largest connected region of them.
+
+        The horizontal runs of the empty tiles are joined into regions by a vectorized union-find:
+        every run points to a run of its region with a smaller number, the roots of the runs touching
+        each other vertically are joined and the pointers are shortened until the touching runs all
+        have the same root.
+        """
+        height, width = walls.shape
+        empty = ~walls
+        if not empty.any():
+            walls = walls.copy()
+            walls[height // 2, width // 2] = False
+            return walls
+        starts = empty.copy()
+        starts[:, 1:] &= walls[:, :-1]
+        runs = numpy.cumsum(starts.ravel()).reshape(height, width) - 1
+        run_count = int(runs[-1, -1]) + 1
+        touching = empty[:-1, :] & empty[1:, :]
+        pairs = numpy.unique(runs[:-1, :][touching] * run_count + runs[1:, :][touching])
+        first, second = pairs // run_count, pairs % run_count
+        parents = numpy.arange(run_count)
+        while first.size > 0:
+            first_roots = parents[first]
+            second_roots = parents[second]
+            differ = first_roots != second_roots
+            first, second = first[differ], second[differ]
+            first_roots, second_roots = first_roots[differ], second_roots[differ]
+            parents[numpy.maximum(first_roots, second_roots)] = numpy.minimum(first_roots, second_roots)
+            while True:
+                grandparents = parents[parents]
+                if numpy.array_equal(grandparents, parents):
+                    break
+                parents = grandparents
+        sizes = numpy.bincount(parents, weights=numpy.bincount(runs[empty], minlength=run_count))
+        return ~empty | (parents[runs] != numpy.argmax(sizes))
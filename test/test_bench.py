@@ -0,0 +1,25 @@
+import unittest
+
+from benchmark.bench import compare
+
+
+class TestCompare(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {'results': {'fast': 1.0, 'slow': 2.0, 'removed': 1.0}}
+
+    def testNoRegressions(self):
+        current = {'results': {'fast': 1.2, 'slow': 1.0, 'added': 100.0}}
+        self.assertEqual([], compare(self.baseline, current))
+
+    def testRegressions(self):
+        current = {'results': {'fast': 1.21, 'slow': 2.5}}
+        self.assertEqual([('fast', 1.0, 1.21), ('slow', 2.0, 2.5)], compare(self.baseline, current))
+
+    def testThreshold(self):
+        current = {'results': {'fast': 1.5, 'slow': 2.0}}
+        self.assertEqual([], compare(self.baseline, current, threshold=0.5))
+        self.assertEqual([('fast', 1.0, 1.5)], compare(self.baseline, current, threshold=0.4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from src import fighter
+from src.chunked_map import ChunkedWorldMap
+from src.model import Model
+from src.world_map import Position
+
+
+class TestChunkedWorldMap(unittest.TestCase):
+    def setUp(self):
+        self.map = ChunkedWorldMap(7, chunk_size=8, cached_chunks=16)
+
+    def tearDown(self):
+        self.map.close()
+
+    def _get_component(self, start, low, high):
+        """ Collects the empty tiles reachable from start inside a [low, high) x [low, high) square. """
+        visited = {(start.x, start.y)}
+        stack = [start]
+        while stack:
+            position = stack.pop()
+            for neighbor in self.map.get_empty_neighbors(position):
+                key = (neighbor.x, neighbor.y)
+                if low <= neighbor.x < high and low <= neighbor.y < high and key not in visited:
+                    visited.add(key)
+                    stack.append(neighbor)
+        return visited
+
+    def testInvalidParameters(self):
+        with self.assertRaises(ValueError) as raised:
+            ChunkedWorldMap(chunk_size=1)
+        self.assertEqual('Invalid chunk size', str(raised.exception))
+        with self.assertRaises(ValueError) as raised:
+            ChunkedWorldMap(cached_chunks=0)
+        self.assertEqual('Invalid cached chunk count', str(raised.exception))
+
+    def testDeterministic(self):
+        other = ChunkedWorldMap(7, chunk_size=8)
+        for x in range(-10, 10):
+            for y in range(-10, 10):
+                self.assertEqual(self.map.is_empty(Position(x, y)), other.is_empty(Position(x, y)))
+
+    def testCorridors(self):
+        for i in range(-20, 20):
+            self.assertTrue(self.map.is_empty(Position(i, 16)))
+            self.assertTrue(self.map.is_empty(Position(-8, i)))
+
+    def testConnectedAcrossChunks(self):
+        empty = {(x, y) for x in range(-16, 16) for y in range(-16, 16) if self.map.is_empty(Position(x, y))}
+        self.assertEqual(empty, self._get_component(Position(0, 0), -16, 16))
+
+    def testCacheIsBounded(self):
+        for x in range(0, 80, 8):
+            for y in range(0, 80, 8):
+                self.map.is_empty(Position(x, y))
+        self.assertEqual(16, len(self.map.get_cached_chunks()))
+        self.assertEqual((9, 9), self.map.get_cached_chunks()[-1])
+
+    def testTrackPrefetches(self):
+        self.map.track(Position(3, 3))
+        self.map.track(Position(3, 4))
+        self.map.close()
+        cached = self.map.get_cached_chunks()
+        self.assertIn((0, 1), cached)
+        self.assertIn((0, 2), cached)
+        self.assertIn((1, 1), cached)
+
+    def testRandomEmptyPositions(self):
+        positions = self.map.get_random_empty_positions(5)
+        self.assertEqual(5, len(positions))
+        for position in positions:
+            self.assertTrue(self.map.is_empty(position))
+
+    def testSnapshot(self):
+        model = Model(self.map, fighter.Player(Position(0, 0)), [])
+        restored = Model()
+        restored.set_snapshot(model.get_snapshot())
+        self.assertIsInstance(restored.map, ChunkedWorldMap)
+        self.assertEqual(7, restored.map.seed)
+        self.assertEqual(self.map.is_empty(Position(5, 5)), restored.map.is_empty(Position(5, 5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
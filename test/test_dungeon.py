@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from src import fighter
+from src.dungeon import Dungeon, LEVEL_FILE_PREFIX
+from src.model import Model
+from src.world_map import Position, RandomV1WorldMapSource
+
+
+class TestDungeon(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.levels_directory = os.path.join(self.directory.name, 'levels')
+        self.generated = []
+
+        def source_factory(depth):
+            self.generated.append(depth)
+            return RandomV1WorldMapSource(6, 6)
+
+        self.dungeon = Dungeon(source_factory, self.levels_directory, 2, cached_levels=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _descend(self, model):
+        model.player.position = model.map.stairs_down
+        self.assertTrue(self.dungeon.change_level(model, 1))
+
+    def testInvalidCachedLevels(self):
+        with self.assertRaises(ValueError):
+            Dungeon(lambda depth: RandomV1WorldMapSource(3, 3), self.levels_directory, 0, cached_levels=0)
+
+    def testGenerate_stairs(self):
+        top = self.dungeon.get(0)
+        self.assertIsNone(top.map.stairs_up)
+        self.assertTrue(top.map.is_empty(top.map.stairs_down))
+        self.assertEqual(2, len(top.mobs))
+        lower = self.dungeon.get(1)
+        self.assertEqual(lower.entrance, lower.map.stairs_up)
+        self.assertEqual([0, 1], self.generated)
+
+    def testStoreModel_restoredSave(self):
+        model = Model(RandomV1WorldMapSource(6, 6).get(), fighter.Player(Position(0, 0)), [])
+        model.depth = 2
+        model.map.stairs_up = Position(1, 1)
+        self.dungeon.store_model(model)
+        self.assertEqual([], self.generated)
+        self.assertEqual([2], self.dungeon.get_cached_depths())
+        self.assertEqual(Position(1, 1), self.dungeon.get(2).entrance)
+
+        model.depth = 0
+        model.map.stairs_up = None
+        self.dungeon.store_model(model)
+        self.dungeon.flush()
+        self.assertEqual([], self.generated)
+        self.assertIsNone(Dungeon(None, self.levels_directory, 2).get(0).entrance)
+
+    def testChangeLevel_notOnStairs(self):
+        level = self.dungeon.get(0)
+        model = Model(level.map, fighter.Player(level.entrance), level.mobs)
+        self.assertFalse(self.dungeon.change_level(model, -1))
+        self.assertEqual(0, model.depth)
+
+    def testChangeLevel_evictsAndReloads(self):
+        level = self.dungeon.get(0)
+        model = Model(level.map, fighter.Player(level.entrance), level.mobs)
+        top_tiles = level.map.tiles
+        for depth in range(1, 4):
+            self._descend(model)
+            self.assertEqual(depth, model.depth)
+            self.assertLessEqual(len(self.dungeon.get_cached_depths()), 2)
+        self.assertEqual([2, 3], self.dungeon.get_cached_depths())
+        self.assertTrue(os.path.isfile(os.path.join(self.levels_directory, LEVEL_FILE_PREFIX + '0')))
+
+        reloaded = self.dungeon.get(0)
+        self.assertEqual(top_tiles, reloaded.map.tiles)
+        self.assertEqual(2, len(reloaded.mobs))
+        self.assertEqual([0, 1, 2, 3], self.generated)
+
+    def testChangeLevel_upAndDown(self):
+        level = self.dungeon.get(0)
+        model = Model(level.map, fighter.Player(level.entrance), level.mobs)
+        self._descend(model)
+        self.assertEqual(model.map.stairs_up, model.player.position)
+        model.mobs = []
+        self.assertTrue(self.dungeon.change_level(model, -1))
+        self.assertEqual(0, model.depth)
+        self.assertEqual(model.map.stairs_down, model.player.position)
+        self.assertEqual([], self.dungeon.get(1).mobs)
+
+    def testClear(self):
+        self.dungeon.get(0)
+        self.dungeon.flush()
+        self.assertTrue(os.path.isdir(self.levels_directory))
+        self.dungeon.clear()
+        self.assertFalse(os.path.exists(self.levels_directory))
+        self.assertEqual([], self.dungeon.get_cached_depths())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import random
+import unittest
+
+from src import fighter
+from src.events import EventBus, FighterDamaged, FighterDied, FighterMoved, StrategyChanged, WeaponSelected
+from src.free_cells import FreeCellIndex
+from src.model import Model
+from src.session import GameSession
+from src.spawner import MobSpawner
+from src.strategies import AggressiveStrategy, ConfusedStrategy, PassiveStrategy
+from src.world_map import Position, WorldMap
+
+
+class TestEventBus(unittest.TestCase):
+    def setUp(self):
+        self.player = fighter.Player(Position(0, 0))
+        self.mob = fighter.Mob(Position(1, 0), PassiveStrategy())
+        self.model = Model(WorldMap(5, 5), self.player, [self.mob])
+        self.events = []
+        self.bus = self.model.get_event_bus()
+        for event_type in [FighterMoved, FighterDamaged, FighterDied, StrategyChanged, WeaponSelected]:
+            self.bus.subscribe(event_type, self.events.append)
+
+    def testMoved(self):
+        self.player.get_commands()['go_right']()
+        GameSession(self.model).tick()
+        self.assertEqual([FighterMoved(self.player, Position(0, 0), Position(0, 1))], self.events)
+
+    def testDamagedAndDied(self):
+        self.mob.hp = 3
+        self.player.get_commands()['go_down']()
+        GameSession(self.model).tick()
+        self.assertEqual([FighterDamaged(self.mob, 2, 1)], self.events)
+        self.player.get_commands()['go_down']()
+        GameSession(self.model).tick()
+        self.assertEqual([FighterDamaged(self.mob, 1, 0), FighterDied(self.mob)], self.events[1:])
+        self.assertEqual([], self.model.mobs)
+
+    def testStrategyChanged(self):
+        self.mob.become_confused(2)
+        self.assertEqual(1, len(self.events))
+        self.assertIsInstance(self.events[0].new_strategy, ConfusedStrategy)
+        self.mob.choose_move(self.model)
+        self.assertEqual(1, len(self.events))
+        self.mob.choose_move(self.model)
+        self.assertIsInstance(self.events[1].old_strategy, ConfusedStrategy)
+        self.assertIs(self.events[0].old_strategy, self.events[1].new_strategy)
+
+    def testWeaponSelected(self):
+        self.player.inventory = fighter.create_player(Position(0, 0)).inventory
+        self.player.get_commands()['select_2']()
+        self.player.get_commands()['select_2']()
+        self.assertEqual([WeaponSelected(self.player, 1), WeaponSelected(self.player, None)], self.events)
+
+    def testUnsubscribe(self):
+        self.bus.unsubscribe(FighterMoved, self.events.append)
+        self.assertFalse(self.bus.is_subscribed(FighterMoved))
+        self.player.move(Position(0, 1))
+        self.assertEqual([], self.events)
+        with self.assertRaises(ValueError):
+            self.bus.unsubscribe(FighterMoved, self.events.append)
+
+    def testNewFighters(self):
+        mob = fighter.Mob(Position(3, 3), PassiveStrategy())
+        self.model.mobs = self.model.mobs + [mob]
+        mob.move(Position(3, 4))
+        self.assertEqual([FighterMoved(mob, Position(3, 3), Position(3, 4))], self.events)
+
+    def testForkReportsToItsOwnBus(self):
+        forked = self.model.fork()
+        forked_events = []
+        forked.get_event_bus().subscribe(FighterMoved, forked_events.append)
+        forked.get_writable(forked.player).move(Position(0, 1))
+        self.assertEqual([], self.events)
+        self.assertEqual(1, len(forked_events))
+        self.assertEqual(Position(0, 0), self.player.position)
+
+
+class TestIncrementalIndex(unittest.TestCase):
+    def testSpawnerIndexMatchesRebuilt(self):
+        random.seed(2)
+        game_map = WorldMap(12, 12)
+        positions = game_map.get_random_empty_positions(9)
+        player = fighter.create_player(positions[0])
+        player.hp = 1000
+        mobs = [fighter.Mob(position, AggressiveStrategy(), hp=4) for position in positions[1:]]
+        model = Model(game_map, player, mobs)
+        session = GameSession(model, spawner=MobSpawner(model, interval=5))
+        for _ in range(40):
+            player.get_commands()[random.choice(['go_up', 'go_down', 'go_left', 'go_right'])]()
+            session.tick()
+        rebuilt = FreeCellIndex(game_map, [f.position for f in model.get_fighters()])
+        index = session.spawner.index
+        self.assertEqual(len(rebuilt), len(index))
+        for x in range(12):
+            for y in range(12):
+                self.assertEqual(rebuilt.is_free(Position(x, y)), index.is_free(Position(x, y)))
+
+
+class TestEventBusDirect(unittest.TestCase):
+    def testOrder(self):
+        bus = EventBus()
+        calls = []
+        bus.subscribe(FighterDied, lambda event: calls.append(1))
+        bus.subscribe(FighterDied, lambda event: calls.append(2))
+        bus.emit(FighterDied(None))
+        bus.emit(FighterMoved(None, None, None))
+        self.assertEqual([1, 2], calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import unittest
+
+from src.chunked_map import ChunkedWorldMap
+from src.fov import FieldOfView
+from src.world_map import MapTile, Position, WorldMap
+
+
+class TestFieldOfView(unittest.TestCase):
+    def setUp(self):
+        self.map = WorldMap.from_tiles([[MapTile.EMPTY for _ in range(20)] for _ in range(20)])
+        self.fov = self.map.get_field_of_view()
+
+    def testOpenMap(self):
+        visible = self.fov.get_visible(Position(10, 10), 3)
+        self.assertEqual({(x, y) for x in range(7, 14) for y in range(7, 14) if (x - 10) ** 2 + (y - 10) ** 2 <= 9},
+                         visible)
+
+    def testMapBorder(self):
+        visible = self.fov.get_visible(Position(0, 0), 3)
+        self.assertIn((3, 0), visible)
+        self.assertNotIn((-2, 0), visible)
+
+    def testWallBlocksSight(self):
+        for y in range(20):
+            self.map.set_tile(Position(12, y), MapTile.BLOCKED)
+        self.assertTrue(self.fov.is_visible(Position(10, 10), Position(12, 10)))
+        self.assertFalse(self.fov.is_visible(Position(10, 10), Position(13, 10)))
+        self.assertFalse(self.fov.is_visible(Position(10, 10), Position(14, 12)))
+
+    def testCache(self):
+        self.fov.get_visible(Position(10, 10))
+        self.fov.get_visible(Position(10, 10))
+        self.assertEqual((1, 1), (self.fov.hits, self.fov.misses))
+        self.map.set_tile(Position(12, 10), MapTile.BLOCKED)
+        self.assertFalse(self.fov.is_visible(Position(10, 10), Position(13, 10)))
+        self.assertEqual((1, 2), (self.fov.hits, self.fov.misses))
+
+    def testIncrementalMoves(self):
+        random.seed(0)
+        game_map = WorldMap.from_tiles([[MapTile.BLOCKED if random.random() < 0.3 else MapTile.EMPTY
+                                         for _ in range(30)] for _ in range(30)])
+        fov = FieldOfView(game_map)
+        position = game_map.get_random_empty_positions(1)[0]
+        for _ in range(100):
+            self.assertEqual(FieldOfView(game_map).get_visible(position, 5), fov.get_visible(position, 5))
+            neighbors = game_map.get_empty_neighbors(position)
+            if not neighbors:
+                break
+            position = random.choice(neighbors)
+
+    def testUnboundedMap(self):
+        game_map = ChunkedWorldMap(seed=1, chunk_size=8)
+        visible = game_map.get_field_of_view().get_visible(Position(0, 0), 4)
+        self.assertIn((0, 4), visible)
+        self.assertIn((-4, 0), visible)
+        game_map.close()
+
+    def testInvalidCacheSize(self):
+        with self.assertRaises(ValueError):
+            FieldOfView(self.map, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
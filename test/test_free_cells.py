@@ -0,0 +1,95 @@
+import unittest
+
+from src import fighter
+from src.free_cells import FreeCellIndex
+from src.model import Model
+from src.spawner import MobSpawner
+from src.strategies import PassiveStrategy
+from src.world_map import MapTile, Position, WorldMap
+
+
+class TestFreeCellIndex(unittest.TestCase):
+    def setUp(self):
+        self.map = WorldMap.from_tiles([[MapTile.EMPTY if abs(i - j) < 2 else MapTile.BLOCKED for i in range(3)]
+                                        for j in range(3)])
+        self.index = FreeCellIndex(self.map, [Position(0, 0)])
+
+    def testBuild(self):
+        self.assertEqual(6, len(self.index))
+        self.assertFalse(self.index.is_free(Position(0, 0)))
+        self.assertFalse(self.index.is_free(Position(0, 2)))
+        self.assertTrue(self.index.is_free(Position(1, 1)))
+
+    def testOccupyRelease(self):
+        self.index.occupy(Position(1, 1))
+        self.index.occupy(Position(1, 1))
+        self.assertEqual(5, len(self.index))
+        self.index.release(Position(1, 1))
+        self.index.release(Position(1, 1))
+        self.index.release(Position(2, 0))
+        self.assertEqual(6, len(self.index))
+        self.assertTrue(self.index.is_free(Position(1, 1)))
+
+    def testMove(self):
+        self.index.move(Position(0, 0), Position(2, 2))
+        self.assertTrue(self.index.is_free(Position(0, 0)))
+        self.assertFalse(self.index.is_free(Position(2, 2)))
+
+    def testUpdateTile(self):
+        self.map.tiles[1][1] = MapTile.BLOCKED
+        self.index.update_tile(Position(1, 1))
+        self.assertFalse(self.index.is_free(Position(1, 1)))
+        self.map.tiles[0][2] = MapTile.EMPTY
+        self.index.update_tile(Position(0, 2))
+        self.assertTrue(self.index.is_free(Position(0, 2)))
+
+    def testSample(self):
+        for _ in range(50):
+            self.assertTrue(self.index.is_free(self.index.sample()))
+        for position in [Position(0, 1), Position(1, 0), Position(1, 1), Position(1, 2), Position(2, 1),
+                         Position(2, 2)]:
+            self.index.occupy(position)
+        with self.assertRaises(IndexError):
+            self.index.sample()
+
+    def testSampleFarFrom(self):
+        positions = self.index.sample_far_from(Position(0, 0), 3, count=5)
+        self.assertEqual(set(), {(p.x, p.y) for p in positions} - {(1, 2), (2, 1), (2, 2)})
+        self.assertEqual(3, len(positions))
+        self.assertEqual([], self.index.sample_far_from(Position(0, 0), 5))
+
+
+class TestMobSpawner(unittest.TestCase):
+    def setUp(self):
+        self.player = fighter.Player(Position(0, 0))
+        self.model = Model(WorldMap(10, 10), self.player, [fighter.Mob(Position(9, 9), PassiveStrategy())])
+
+    def testInvalidInterval(self):
+        with self.assertRaises(ValueError):
+            MobSpawner(self.model, interval=0)
+
+    def testWaves(self):
+        spawner = MobSpawner(self.model, interval=2, wave_size=3, min_distance=5, max_mobs=6)
+        spawner.on_tick()
+        self.assertEqual(1, len(self.model.mobs))
+        spawner.on_tick()
+        self.assertEqual(4, len(self.model.mobs))
+        for _ in range(4):
+            spawner.on_tick()
+        self.assertEqual(6, len(self.model.mobs))
+        positions = {(f.position.x, f.position.y) for f in self.model.get_fighters()}
+        self.assertEqual(7, len(positions))
+        for mob in self.model.mobs:
+            self.assertGreaterEqual(WorldMap.get_distance(mob.position, self.player.position), 5)
+
+    def testTracksMoves(self):
+        spawner = MobSpawner(self.model)
+        spawner.on_tick()
+        self.player.position = Position(0, 1)
+        spawner.on_tick()
+        self.assertTrue(spawner.index.is_free(Position(0, 0)))
+        self.assertFalse(spawner.index.is_free(Position(0, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
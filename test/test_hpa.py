@@ -0,0 +1,91 @@
+import os
+import random
+import tempfile
+import unittest
+from collections import deque
+
+from src.hpa import HierarchicalPathfinder
+from src.world_map import MapTile, Position, WorldMap
+
+
+def _get_distance(game_map, start, goal):
+    distances = {(start.x, start.y): 0}
+    queue = deque([(start.x, start.y)])
+    while queue:
+        x, y = queue.popleft()
+        for neighbor in game_map.get_empty_neighbors(Position(x, y)):
+            if (neighbor.x, neighbor.y) not in distances:
+                distances[(neighbor.x, neighbor.y)] = distances[(x, y)] + 1
+                queue.append((neighbor.x, neighbor.y))
+    return distances.get((goal.x, goal.y))
+
+
+class TestHierarchicalPathfinder(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.map = WorldMap.from_tiles([[MapTile.BLOCKED if random.random() < 0.3 else MapTile.EMPTY
+                                         for _ in range(40)] for _ in range(30)])
+        self.pathfinder = HierarchicalPathfinder(self.map, 8)
+
+    def _check_path(self, path, start, goal):
+        positions = list(path)
+        self.assertEqual(start, positions[0])
+        self.assertEqual(goal, positions[-1])
+        self.assertEqual(path.length, len(positions) - 1)
+        for first, second in zip(positions, positions[1:]):
+            self.assertTrue(self.map.is_empty(second))
+            self.assertEqual(1, WorldMap.get_distance(first, second))
+
+    def testNearShortestPaths(self):
+        total_distance = 0
+        total_length = 0
+        for _ in range(200):
+            start, goal = self.map.get_random_empty_positions(2)
+            distance = _get_distance(self.map, start, goal)
+            path = self.pathfinder.find_path(start, goal)
+            if distance is None:
+                self.assertIsNone(path)
+            else:
+                self.assertLessEqual(distance, path.length)
+                self._check_path(path, start, goal)
+                total_distance += distance
+                total_length += path.length
+        self.assertLessEqual(total_length, total_distance * 1.1)
+
+    def testSamePosition(self):
+        start = self.map.get_random_empty_positions(1)[0]
+        self.assertEqual([start], list(self.pathfinder.find_path(start, start)))
+
+    def testBlockedEnds(self):
+        self.map.tiles[0][0] = MapTile.BLOCKED
+        self.assertIsNone(self.pathfinder.find_path(Position(0, 0), self.map.get_random_empty_positions(1)[0]))
+
+    def testPathLeavingCluster(self):
+        tiles = [[MapTile.EMPTY] * 8 for _ in range(8)]
+        for x in range(7):
+            tiles[x][1] = MapTile.BLOCKED
+        self.map = WorldMap.from_tiles(tiles)
+        path = HierarchicalPathfinder(self.map, 4).find_path(Position(0, 0), Position(0, 2))
+        self.assertLessEqual(16, path.length)
+        self._check_path(path, Position(0, 0), Position(0, 2))
+
+    def testInvalidClusterSize(self):
+        with self.assertRaises(ValueError):
+            HierarchicalPathfinder(self.map, 1)
+
+    def testLoadOrBuild(self):
+        with tempfile.TemporaryDirectory() as directory:
+            graph_path = os.path.join(directory, 'map.hpa')
+            built = HierarchicalPathfinder.load_or_build(self.map, graph_path, 8)
+            self.assertTrue(os.path.isfile(graph_path))
+            loaded = HierarchicalPathfinder.load_or_build(self.map, graph_path, 8)
+            self.assertEqual(built.nodes, loaded.nodes)
+            self.assertEqual(built.edges, loaded.edges)
+
+            self.map.tiles[0][0] = MapTile.BLOCKED if self.map.tiles[0][0] == MapTile.EMPTY else MapTile.EMPTY
+            rebuilt = HierarchicalPathfinder.load_or_build(self.map, graph_path, 8)
+            self.assertEqual(HierarchicalPathfinder(self.map, 8).edges, rebuilt.edges)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import time
+import unittest
+
+from src import fighter
+from src.lookahead import LookaheadPlanner, LookaheadProblem, search
+from src.model import Model
+from src.session import GameSession
+from src.strategies import LookaheadStrategy, strategy_deserializer, strategy_serializer, FightingStrategy
+from src.world_map import Position, WorldMap
+
+
+def _get_problem(mob, mob_hp, player, player_hp, max_depth=2, blocked=frozenset()):
+    return LookaheadProblem(blocked, (0, 0, 9, 9), mob, mob_hp, fighter.MOB_ATTACK, player, player_hp,
+                            fighter.PLAYER_BASE_ATTACK, 0, 0.0, max_depth)
+
+
+class TestLookaheadSearch(unittest.TestCase):
+    def testFinishingAttack(self):
+        self.assertEqual((4, 5), search(_get_problem((5, 5), 10, (4, 5), 4), time.time() + 1))
+
+    def testRetreat(self):
+        self.assertEqual((6, 5), search(_get_problem((5, 5), 2, (4, 5), 20, blocked=frozenset({(5, 4), (5, 6)})),
+                                        time.time() + 1))
+
+    def testApproach(self):
+        self.assertIn(search(_get_problem((5, 5), 10, (2, 5), 20), time.time() + 1), [(4, 5)])
+
+    def testDeadline(self):
+        start = time.time()
+        move = search(_get_problem((5, 5), 10, (0, 0), 20, max_depth=50), start + 0.02)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertIsNotNone(move)
+
+
+class TestLookaheadPlanner(unittest.TestCase):
+    def setUp(self):
+        self.player = fighter.Player(Position(0, 0))
+        self.mobs = [fighter.Mob(Position(x, y), LookaheadStrategy()) for x in range(2, 8) for y in range(2, 8)]
+        self.model = Model(WorldMap(10, 10), self.player, self.mobs)
+
+    def testInvalidParameters(self):
+        with self.assertRaises(ValueError):
+            LookaheadPlanner(budget=0)
+        with self.assertRaises(ValueError):
+            LookaheadPlanner(workers=-1)
+
+    def testBudget(self):
+        self.model.set_planner(LookaheadPlanner(budget=0.02))
+        session = GameSession(self.model)
+        for _ in range(3):
+            start = time.time()
+            session.tick()
+            self.assertLess(time.time() - start, 0.2)
+        self.assertTrue(any(mob.position != Position(x, y) for mob, (x, y) in
+                            zip(self.mobs, [(x, y) for x in range(2, 8) for y in range(2, 8)])))
+
+    def testPlannedMove(self):
+        self.player.hp = fighter.MOB_ATTACK
+        mob = fighter.Mob(Position(1, 0), LookaheadStrategy())
+        self.model.mobs = [mob]
+        self.model.get_planner().plan(self.model)
+        self.assertEqual(Position(0, 0), mob.choose_move(self.model))
+        self.assertIsNone(self.model.get_planner().get_move(mob))
+
+    def testWorkerPool(self):
+        planner = LookaheadPlanner(budget=0.05, workers=2)
+        self.player.hp = fighter.MOB_ATTACK
+        mob = fighter.Mob(Position(1, 0), LookaheadStrategy())
+        self.model.mobs = [mob]
+        try:
+            for _ in range(50):
+                start = time.time()
+                planner.plan(self.model)
+                self.assertLess(time.time() - start, 0.5)
+                move = planner.get_move(mob)
+                if move is not None:
+                    break
+            self.assertEqual(Position(0, 0), move)
+        finally:
+            planner.close()
+
+    def testCloseCancelsQueuedSearches(self):
+        planner = LookaheadPlanner(workers=1)
+
+        class _Executor:
+            def shutdown(self, **kwargs):
+                self.kwargs = kwargs
+
+        class _Future:
+            cancelled = False
+
+            def cancel(self):
+                self.cancelled = True
+
+        executor, future = _Executor(), _Future()
+        planner._executor, planner._futures = executor, [future]
+        planner.close()
+        self.assertTrue(future.cancelled)
+        self.assertEqual({'wait': True}, executor.kwargs)
+
+    def testSerialization(self):
+        data = strategy_serializer(LookaheadStrategy())
+        self.assertIsInstance(strategy_deserializer(data, FightingStrategy), LookaheadStrategy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+import zlib
+
+from src.hpa import GRAPH_FILE_SUFFIX
+from src.map_cache import MapCache, get_map_paths, validate_file
+from src.world_map import FileWorldMapSource, MapParsingException
+
+VALID_MAP = b'...\n.X.\n...\n'
+DISCONNECTED_MAP = b'.X.\n.X.\n.X.\n'
+
+
+class TestMapCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = MapCache(os.path.join(self.directory.name, 'cache'))
+        self.parsed = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _parse(self, data: bytes):
+        self.parsed += 1
+        return FileWorldMapSource.parse(data)
+
+    def testHitSkipsParsing(self):
+        game_map = self.cache.get_or_parse(VALID_MAP, self._parse)
+        cached_map = self.cache.get_or_parse(VALID_MAP, self._parse)
+        self.assertEqual(1, self.parsed)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(game_map.tiles, cached_map.tiles)
+
+    def testInvalidMapCached(self):
+        for _ in range(2):
+            with self.assertRaises(MapParsingException):
+                self.cache.get_or_parse(DISCONNECTED_MAP, self._parse)
+        self.assertEqual(1, self.parsed)
+
+    def testChangedContentsMiss(self):
+        self.cache.get_or_parse(VALID_MAP, self._parse)
+        self.cache.get_or_parse(VALID_MAP.replace(b'X', b'.'), self._parse)
+        self.assertEqual(2, self.parsed)
+
+    def testPersistentEntries(self):
+        game_map = self.cache.get_or_parse(VALID_MAP, self._parse)
+        other_cache = MapCache(self.cache.directory)
+        self.assertEqual(game_map.tiles, other_cache.get_or_parse(VALID_MAP, self._parse).tiles)
+        with self.assertRaises(MapParsingException):
+            self.cache.get_or_parse(DISCONNECTED_MAP, self._parse)
+        with self.assertRaises(MapParsingException):
+            MapCache(self.cache.directory).get_or_parse(DISCONNECTED_MAP, self._parse)
+        self.assertEqual(2, self.parsed)
+
+    def testValidateFile(self):
+        path = os.path.join(self.directory.name, 'map')
+        with open(path, 'wb') as file:
+            file.write(DISCONNECTED_MAP)
+        self.assertIsNotNone(validate_file(path, self.cache.directory))
+        self.assertIsNone(validate_file('maps/hall', self.cache.directory))
+        self.assertIsNotNone(validate_file(os.path.join(self.directory.name, 'missing'), self.cache.directory))
+
+    def testGetMapPaths_skipsGraphs(self):
+        maps = os.path.join(self.directory.name, 'maps')
+        os.mkdir(maps)
+        path = os.path.join(maps, 'hall')
+        with open('maps/hall', 'rb') as source, open(path, 'wb') as file:
+            file.write(source.read())
+        with open(path + GRAPH_FILE_SUFFIX, 'wb') as file:
+            file.write(zlib.compress(b'{}'))
+        self.assertEqual([path], get_map_paths(maps))
+        self.assertIsNone(validate_file(path, self.cache.directory))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+import unittest
+
+from src.map_pool import MapPool, PooledWorldMapSource, generate_map
+from src.world_map import RandomV2WorldMapSource, decode_map, encode_map
+
+
+class TestMapEncoding(unittest.TestCase):
+    def testRoundTrip(self):
+        game_map = RandomV2WorldMapSource(7, 13, 0).get()
+        data = encode_map(game_map)
+        self.assertEqual(12, len(data))
+        self.assertEqual(game_map.tiles, decode_map(data, 7, 13).tiles)
+
+    def testGenerateSeed(self):
+        self.assertEqual(generate_map('v1', 6, 6, 5), generate_map('v1', 6, 6, 5))
+        self.assertEqual(generate_map('v2', 20, 20, 5), generate_map('v2', 20, 20, 5))
+
+
+class TestMapPool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pool = MapPool(self.directory.name, 'v1', 8, 9, target_size=3, workers=1)
+
+    def tearDown(self):
+        self.pool.close()
+        self.directory.cleanup()
+
+    def testInvalidParameters(self):
+        with self.assertRaises(ValueError):
+            MapPool(self.directory.name, 'v3', 8, 8)
+        with self.assertRaises(ValueError):
+            MapPool(self.directory.name, 'v1', 0, 8)
+
+    def testTakeFromEmptyPool(self):
+        random.seed(3)
+        expected = generate_map('v1', 8, 9, random.randrange(2 ** 63))
+        random.seed(3)
+        game_map = self.pool.take()
+        self.assertEqual((8, 9), (game_map.height, game_map.width))
+        self.assertTrue(game_map.is_one_component())
+        # The map is made by the pool's generator, v1, rather than by the cave generator.
+        self.assertEqual(decode_map(expected, 8, 9).tiles, game_map.tiles)
+        self.pool.wait()
+        self.assertEqual(3, len(self.pool.get_stored_seeds()))
+
+    def testTakeStoredMap(self):
+        self.pool.refill()
+        self.pool.wait()
+        seeds = self.pool.get_stored_seeds()
+        self.assertEqual(3, len(seeds))
+        self.assertTrue(os.path.isdir(os.path.join(self.directory.name, 'v1_8x9')))
+
+        game_map = PooledWorldMapSource(self.pool).get()
+        self.assertTrue(game_map.is_one_component())
+        self.assertEqual(decode_map(generate_map('v1', 8, 9, seeds[0]), 8, 9).tiles, game_map.tiles)
+        self.assertNotIn(seeds[0], self.pool.get_stored_seeds())
+        self.pool.wait()
+        self.assertEqual(3, len(self.pool.get_stored_seeds()))
+
+    def testSharedDirectory(self):
+        self.pool.refill()
+        self.pool.wait()
+        other_pool = MapPool(self.directory.name, 'v1', 8, 9, target_size=3, workers=1)
+        other_pool.refill()
+        self.assertEqual(3, len(other_pool.get_stored_seeds()))
+        other_pool.close()
+        self.assertEqual([], MapPool(self.directory.name, 'v2', 8, 9).get_stored_seeds())
+
+
+if __name__ == '__main__':
+    unittest.main()
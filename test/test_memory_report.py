@@ -0,0 +1,108 @@
+import tracemalloc
+import unittest
+
+import tcod.console
+
+from src import fighter
+from src.chunked_map import ChunkedWorldMap
+from src.memory_report import build_memory_report, get_deep_size, measure_peak
+from src.model import Model
+from src.strategies import AggressiveStrategy, PassiveStrategy
+from src.view import TOTAL_HEIGHT, TOTAL_WIDTH, View
+from src.world_map import Position, WorldMap
+
+
+class TestMemoryReport(unittest.TestCase):
+    def setUp(self):
+        self.mobs = [fighter.Mob(Position(1, i), AggressiveStrategy()) for i in range(5)]
+        self.model = Model(WorldMap(10, 10), fighter.Player(Position(0, 0)), self.mobs)
+
+    def testSections(self):
+        self.model.get_visible_tiles()
+        report = build_memory_report(self.model)
+        for name in ['map', 'map caches', 'mobs', 'strategies', 'player', 'save data']:
+            self.assertGreater(report.get_section(name), 0)
+        self.assertEqual(100, report.tiles)
+        self.assertGreater(report.bytes_per_tile, 0)
+        self.assertEqual(5, report.mob_count)
+        self.assertGreater(report.bytes_per_mob, 0)
+        self.assertGreater(report.save_peak, report.snapshot_bytes)
+        self.assertGreater(report.load_peak, 0)
+        self.assertIn('per mob', report.format())
+
+    def testCachesNotCreated(self):
+        report = build_memory_report(self.model)
+        self.assertEqual(0, report.get_section('map caches'))
+        self.assertIsNone(self.model.map._path_service)
+        self.assertIsNone(self.model.map._field_of_view)
+
+    def testTracedPeakKept(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        self.assertEqual(8 << 20, len(bytearray(8 << 20)))
+        report = build_memory_report(self.model)
+        self.assertGreaterEqual(report.traced_peak, 8 << 20)
+        self.assertTrue(report.top_allocation_sites)
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertGreater(report.save_peak, report.snapshot_bytes)
+
+    def testUnknownSection(self):
+        with self.assertRaises(KeyError):
+            build_memory_report(self.model).get_section('render buffers')
+
+    def testConfusedStrategiesCounted(self):
+        before = build_memory_report(self.model).get_section('strategies')
+        for mob in self.mobs:
+            mob.become_confused(3)
+            mob.become_confused(3)
+        self.assertGreater(build_memory_report(self.model).get_section('strategies'), before)
+
+    def testSnapshotMatches(self):
+        report = build_memory_report(self.model)
+        self.assertEqual(report.get_section('save data'), report.snapshot_bytes)
+        self.assertGreaterEqual(report.snapshot_bytes, len(self.model.get_snapshot()))
+
+    def testRenderBuffers(self):
+        console = tcod.console.Console(TOTAL_WIDTH, TOTAL_HEIGHT, order='C')
+        report = build_memory_report(self.model, View(console))
+        self.assertEqual(console.rgba.nbytes, report.get_section('render buffers'))
+
+    def testChunkedMapTiles(self):
+        chunked_map = ChunkedWorldMap(0, chunk_size=8)
+        chunked_map.is_empty(Position(0, 0))
+        self.model.map = chunked_map
+        report = build_memory_report(self.model)
+        self.assertEqual(len(chunked_map.get_cached_chunks()) * 64, report.tiles)
+
+
+class TestDeepSize(unittest.TestCase):
+    def testSharedCountedOnce(self):
+        shared = [PassiveStrategy()]
+        seen = set()
+        first_size, first_count = get_deep_size([shared], seen)
+        second_size, second_count = get_deep_size([shared], seen)
+        self.assertGreater(first_size, 0)
+        self.assertGreater(first_count, 1)
+        self.assertEqual((0, 0), (second_size, second_count))
+
+    def testSlots(self):
+        strategy = PassiveStrategy()
+        mob = fighter.Mob(Position(300, 300), strategy)
+        seen = set()
+        get_deep_size([mob], seen)
+        self.assertIn(id(strategy), seen)
+        self.assertIn(id(mob.position), seen)
+
+    def testMeasurePeak(self):
+        result, peak = measure_peak(lambda: len(bytearray(1 << 20)))
+        self.assertEqual(1 << 20, result)
+        self.assertGreaterEqual(peak, 1 << 20)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def testMeasurePeak_tracing(self):
+        tracemalloc.start(3)
+        self.addCleanup(tracemalloc.stop)
+        _, peak = measure_peak(lambda: len(bytearray(1 << 20)))
+        self.assertGreaterEqual(peak, 1 << 20)
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertEqual(3, tracemalloc.get_traceback_limit())
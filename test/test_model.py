@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from src import fighter
+from src.model import Model
+from src.session import GameSession
+from src.strategies import ConfusedStrategy, PassiveStrategy
+from src.world_map import Position, WorldMap
+
+
+class TestModelFork(unittest.TestCase):
+    def setUp(self):
+        self.player = fighter.Player(Position(0, 0))
+        self.mobs = [fighter.Mob(Position(1, 0), PassiveStrategy()), fighter.Mob(Position(4, 4), PassiveStrategy())]
+        self.model = Model(WorldMap(5, 5), self.player, self.mobs)
+
+    def testSharing(self):
+        forked = self.model.fork()
+        self.assertIs(self.model.map, forked.map)
+        self.assertIs(self.player, forked.player)
+        self.assertEqual(self.mobs, forked.mobs)
+        self.assertIsNot(self.model.mobs, forked.mobs)
+
+    def testForkChangesCopied(self):
+        forked = self.model.fork()
+        session = GameSession(forked)
+        forked.get_writable(forked.player)._add_intention(fighter.PlayerIntention.MOVE_DOWN)
+        session.tick()
+        self.assertEqual(Position(0, 0), self.player.position)
+        self.assertEqual(10, self.mobs[0].hp)
+        self.assertLess(forked.mobs[0].hp, 10)
+        self.assertIsNot(self.mobs[0], forked.mobs[0])
+        self.assertIs(self.mobs[1], forked.mobs[1])
+
+    def testParentChangesCopied(self):
+        forked = self.model.fork()
+        nested = forked.fork()
+        self.model.get_writable(self.player).position = Position(0, 1)
+        self.assertIs(self.player, self.model.player)
+        self.assertEqual(Position(0, 0), forked.player.position)
+        self.assertEqual(Position(0, 0), nested.player.position)
+        self.assertIsNot(forked.player, nested.player)
+
+    def testConfusedStrategyShared(self):
+        self.mobs[1].become_confused(2)
+        forked = self.model.fork()
+        GameSession(forked).tick()
+        self.assertEqual(2, self.mobs[1].fighting_strategy.confusion_time)
+        self.assertIsInstance(forked.mobs[1].fighting_strategy, ConfusedStrategy)
+        self.assertEqual(1, forked.mobs[1].fighting_strategy.confusion_time)
+
+    def testRandomState(self):
+        random.seed(3)
+        forked = self.model.fork()
+        expected = [random.random() for _ in range(3)]
+        with forked.use_random_state():
+            self.assertEqual(expected[:2], [random.random() for _ in range(2)])
+        outer = random.random()
+        with forked.use_random_state():
+            self.assertEqual(expected[2], random.random())
+        random.seed(3)
+        [random.random() for _ in range(3)]
+        self.assertEqual(random.random(), outer)
+        with self.model.fork(seed=5).use_random_state():
+            first = random.random()
+        with self.model.fork(seed=5).use_random_state():
+            self.assertEqual(first, random.random())
+
+    def testSnapshotOfFork(self):
+        forked = self.model.fork()
+        restored = Model()
+        restored.set_snapshot(forked.get_snapshot())
+        self.assertEqual(self.model.get_snapshot(), restored.get_snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
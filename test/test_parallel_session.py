@@ -0,0 +1,124 @@
+import random
+import unittest
+
+from src import fighter
+from src import world_map
+from src.chunked_map import ChunkedWorldMap
+from src.model import Model
+from src.parallel_session import ParallelGameSession
+from src.strategies import AggressiveStrategy, ConfusedStrategy, CowardlyStrategy, PassiveStrategy
+from src.world_map import Position
+
+
+class _StepRightStrategy(PassiveStrategy):
+    """ A strategy the workers do not know, moving the mob right. """
+    @staticmethod
+    def choose_move(current_model, mob):
+        return Position(mob.position.x, mob.position.y + 1)
+
+
+class TestParallelGameSession(unittest.TestCase):
+    def setUp(self):
+        self.map = world_map.WorldMap(5, 5)
+        self.player = fighter.Player(Position(0, 0))
+
+    def _get_session(self, mobs, **kwargs) -> ParallelGameSession:
+        session = ParallelGameSession(Model(self.map, self.player, mobs), **kwargs)
+        self.addCleanup(session.close)
+        return session
+
+    def testInvalidParameters(self):
+        with self.assertRaises(ValueError):
+            ParallelGameSession(Model(self.map, self.player, []), workers=-1)
+        with self.assertRaises(ValueError):
+            ParallelGameSession(Model(self.map, self.player, []), partition_size=0)
+
+    def testChunkedMap(self):
+        session = ParallelGameSession(Model(ChunkedWorldMap(0), self.player, []))
+        self.addCleanup(session.close)
+        with self.assertRaises(ValueError):
+            session.tick()
+
+    def testPlayerMoves(self):
+        session = self._get_session([])
+        self.player.get_commands()['go_down']()
+        session.tick()
+        self.assertEqual(Position(1, 0), self.player.position)
+
+    def testPlayerAttacks(self):
+        mob = fighter.Mob(Position(1, 0), PassiveStrategy(), hp=1)
+        session = self._get_session([mob])
+        self.player.get_commands()['go_down']()
+        session.tick()
+        self.assertEqual([], session.model.mobs)
+        self.assertEqual(Position(0, 0), self.player.position)
+
+    def testMobAttacks(self):
+        self.player.hp = 1
+        session = self._get_session([fighter.Mob(Position(1, 0), AggressiveStrategy())])
+        session.tick()
+        self.assertTrue(session.player_died)
+
+    def testMobsApproachAndFlee(self):
+        aggressive = fighter.Mob(Position(3, 0), AggressiveStrategy())
+        cowardly = fighter.Mob(Position(0, 2), CowardlyStrategy())
+        self._get_session([aggressive, cowardly]).tick()
+        self.assertEqual(Position(2, 0), aggressive.position)
+        self.assertEqual(3, world_map.WorldMap.get_distance(cowardly.position, self.player.position))
+
+    def testBorderConflict(self):
+        # Both mobs step to (2, 0), the first one within its partition, the second one across the border.
+        for workers in [0, 1]:
+            first = fighter.Mob(Position(2, 1), AggressiveStrategy())
+            second = fighter.Mob(Position(3, 0), AggressiveStrategy())
+            self._get_session([second, first], workers=workers, partition_size=3).tick()
+            self.assertEqual(Position(2, 0), first.position)
+            self.assertEqual(Position(3, 0), second.position)
+
+    def testPlayerTakesTileFirst(self):
+        mob = fighter.Mob(Position(2, 0), AggressiveStrategy())
+        session = self._get_session([mob])
+        self.player.get_commands()['go_down']()
+        session.tick()
+        self.assertEqual(Position(1, 0), self.player.position)
+        self.assertEqual(Position(2, 0), mob.position)
+
+    def testConfusionEnds(self):
+        mob = fighter.Mob(Position(4, 4), ConfusedStrategy(PassiveStrategy(), 1))
+        session = self._get_session([mob])
+        session.tick()
+        self.assertIsInstance(session.model.mobs[0].fighting_strategy, PassiveStrategy)
+        self.assertNotEqual(Position(4, 4), session.model.mobs[0].position)
+
+    def testUnknownStrategy(self):
+        mob = fighter.Mob(Position(4, 0), _StepRightStrategy())
+        self._get_session([mob]).tick()
+        self.assertEqual(Position(4, 1), mob.position)
+
+    def testSameForAnyWorkers(self):
+        game_map = world_map.WorldMap(40, 40)
+        states = []
+        for workers in [0, 2]:
+            random.seed(1)
+            positions = game_map.get_random_empty_positions(201)
+            player = fighter.create_player(positions[0])
+            mobs = [fighter.create_random_mob(position) for position in positions[1:]]
+            for mob in mobs[::4]:
+                mob.become_confused(3)
+            session = ParallelGameSession(Model(game_map, player, mobs), workers=workers, partition_size=8)
+            self.addCleanup(session.close)
+            for _ in range(5):
+                session.tick()
+            states.append([(mob.position, mob.hp, type(mob.fighting_strategy)) for mob in session.model.mobs])
+            positions = [mob.position for mob in session.model.get_fighters()]
+            self.assertEqual(len(positions), len(set(positions)))
+        self.assertEqual(states[0], states[1])
+
+    def testClose(self):
+        session = self._get_session([fighter.Mob(Position(4, 4), PassiveStrategy())], workers=1)
+        session.tick()
+        session.close()
+        session.close()
+        self.assertEqual(dict(), session._shared_arrays)
+        self.assertEqual([], session._executor_holder)
+        self.assertEqual([], session._futures)
@@ -0,0 +1,73 @@
+import unittest
+
+from src.chunked_map import ChunkedWorldMap
+from src.path_service import PathService
+from src.world_map import MapTile, Position, WorldMap
+
+
+class TestPathService(unittest.TestCase):
+    def setUp(self):
+        # A wall across the map with a gap at the bottom.
+        self.map = WorldMap.from_tiles([[MapTile.BLOCKED if y == 3 and x < 5 else MapTile.EMPTY for y in range(7)]
+                                        for x in range(6)])
+        self.service = self.map.get_path_service()
+
+    def testPathAroundWall(self):
+        path = self.service.find_path(Position(0, 0), Position(0, 6))
+        self.assertEqual(17, len(path))
+        self.assertEqual(Position(0, 0), path[0])
+        self.assertEqual(Position(0, 6), path[-1])
+        for first, second in zip(path, path[1:]):
+            self.assertTrue(self.map.is_empty(second))
+            self.assertEqual(1, WorldMap.get_distance(first, second))
+
+    def testNextStep(self):
+        self.assertEqual(Position(5, 3), self.service.get_next_step(Position(5, 2), Position(0, 6)))
+        self.assertEqual(Position(2, 2), self.service.get_next_step(Position(2, 2), Position(2, 2)))
+
+    def testSharedSuffix(self):
+        self.service.find_path(Position(0, 0), Position(0, 6))
+        self.assertEqual((0, 1), (self.service.hits, self.service.misses))
+        self.assertEqual(Position(4, 2), self.service.get_next_step(Position(3, 2), Position(0, 6)))
+        self.assertEqual((1, 1), (self.service.hits, self.service.misses))
+        cached = self.service.get_cached_cells()
+        self.assertEqual(17, cached)
+        # The search from a new start stops at the cached path, adding only the new prefix.
+        self.assertEqual(14, len(self.service.find_path(Position(3, 0), Position(0, 6))))
+        self.assertEqual((1, 2), (self.service.hits, self.service.misses))
+        self.assertLess(self.service.get_cached_cells() - cached, 5)
+
+    def testTileChange(self):
+        self.assertEqual(17, len(self.service.find_path(Position(0, 0), Position(0, 6))))
+        self.map.set_tile(Position(0, 3), MapTile.EMPTY)
+        self.assertEqual(1, self.map.get_version())
+        self.assertEqual(7, len(self.service.find_path(Position(0, 0), Position(0, 6))))
+        self.map.set_tile(Position(5, 3), MapTile.BLOCKED)
+        self.map.set_tile(Position(0, 3), MapTile.BLOCKED)
+        self.assertIsNone(self.service.find_path(Position(0, 0), Position(0, 6)))
+        self.assertEqual(0, self.service.get_cached_cells())
+
+    def testMemoryLimit(self):
+        service = PathService(self.map, max_cells=20)
+        for y in range(7):
+            if y != 3:
+                service.find_path(Position(0, 0), Position(5, y))
+                self.assertLessEqual(service.get_cached_cells(), 20)
+        self.assertEqual(17, len(service.find_path(Position(0, 0), Position(0, 6))))
+        self.assertLessEqual(service.get_cached_cells(), 20)
+
+    def testInvalidLimits(self):
+        with self.assertRaises(ValueError):
+            PathService(self.map, max_cells=0)
+
+    def testUnboundedMap(self):
+        game_map = ChunkedWorldMap(seed=1, chunk_size=8)
+        service = PathService(game_map, max_expansions=256)
+        path = service.find_path(Position(0, 0), Position(16, 16))
+        self.assertEqual(33, len(path))
+        self.assertIsNone(service.find_path(Position(0, 0), Position(1000, 1000)))
+        game_map.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
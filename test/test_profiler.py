@@ -0,0 +1,63 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.profiler import SamplingProfiler
+
+
+def _spin(duration: float):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'profile.folded')
+
+    def testInvalidParameters(self):
+        with self.assertRaises(ValueError):
+            SamplingProfiler(self.path, rate=0)
+        with self.assertRaises(ValueError):
+            SamplingProfiler(self.path, slow_tick_threshold=-1)
+
+    def testSampling(self):
+        with SamplingProfiler(self.path, rate=200) as profiler:
+            with profiler.sampling():
+                _spin(0.2)
+        self.assertGreater(profiler.sample_count, 0)
+        with open(self.path) as profile:
+            lines = profile.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any('_spin (test_profiler.py:' in line for line in lines))
+
+    def testNoSamplesOutside(self):
+        with SamplingProfiler(self.path, rate=200) as profiler:
+            _spin(0.1)
+        self.assertEqual(0, profiler.sample_count)
+        self.assertEqual(dict(), profiler.get_collapsed())
+
+    def testSlowTick(self):
+        with SamplingProfiler(self.path, rate=200, slow_tick_threshold=0.05) as profiler:
+            with profiler.tick(7):
+                _spin(0.2)
+            with profiler.tick(8):
+                pass
+        self.assertEqual([7], [number for number, _ in profiler.slow_ticks])
+        stacks = profiler.get_collapsed()
+        self.assertTrue(stacks)
+        self.assertTrue(all(stack.startswith('slow tick 7 (') for stack in stacks))
+
+    def testFastTick(self):
+        with SamplingProfiler(self.path, rate=200, slow_tick_threshold=10) as profiler:
+            with profiler.tick(1):
+                _spin(0.2)
+        self.assertEqual([], profiler.slow_ticks)
+        self.assertTrue(profiler.get_collapsed())
+        self.assertFalse(any(stack.startswith('slow tick') for stack in profiler.get_collapsed()))
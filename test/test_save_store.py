@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import wait
+
+from src.save_store import FileSaveStore, SaveNotFoundException, SqliteSaveStore
+
+
+class TestSqliteSaveStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'saves.db')
+        self.store = SqliteSaveStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def testSaveAndLoad(self):
+        self.store.save('first', '{"a": 1}').result()
+        self.assertEqual('{"a": 1}', self.store.load('first'))
+        self.assertTrue(self.store.exists('first'))
+        self.assertFalse(self.store.exists('second'))
+
+    def testLoad_missing(self):
+        with self.assertRaises(SaveNotFoundException):
+            self.store.load('missing')
+
+    def testLoad_pendingWrite(self):
+        self.store.save('first', 'old').result()
+        self.store.save('first', 'new')
+        self.assertEqual('new', self.store.load('first'))
+
+    def testDelete(self):
+        self.store.save('first', 'data')
+        self.store.delete('first')
+        self.assertFalse(self.store.exists('first'))
+        with self.assertRaises(SaveNotFoundException):
+            self.store.load('first')
+        self.store.save('second', 'data').result()
+        self.assertEqual(['second'], [info.name for info in self.store.list_saves()])
+
+    def testListSaves_compressed(self):
+        snapshot = 'x' * 10000
+        self.store.save('b', snapshot)
+        self.store.save('a', 'short').result()
+        saves = self.store.list_saves()
+        self.assertEqual(['a', 'b'], [info.name for info in saves])
+        self.assertLess(saves[1].size, len(snapshot) // 10)
+
+    def testListSaves_pending(self):
+        self.store.save('kept', 'data').result()
+        self.store.save('deleted', 'data').result()
+        self.store.close()
+        # The writer waits for more requests for a second, so the requests below are still queued.
+        self.store = SqliteSaveStore(self.path, batch_window=1)
+        self.store.save('new', 'data')
+        self.store.delete('deleted')
+        self.assertEqual(['kept', 'new'], [info.name for info in self.store.list_saves()])
+
+    def testBatchedWrites(self):
+        futures = [self.store.save('save_{}'.format(i), str(i)) for i in range(200)]
+        wait(futures)
+        self.assertLess(self.store.transaction_count, 200)
+        self.assertEqual(200, len(self.store.list_saves()))
+
+    def testReopen(self):
+        self.store.save('first', 'data')
+        self.store.close()
+        self.store = SqliteSaveStore(self.path)
+        self.assertEqual('data', self.store.load('first'))
+
+
+class TestFileSaveStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = FileSaveStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testSaveLoadDelete(self):
+        self.assertFalse(self.store.exists('save'))
+        self.store.save('save', 'data').result()
+        self.assertTrue(self.store.exists('save'))
+        self.assertEqual('data', self.store.load('save'))
+        self.assertEqual(['save'], [info.name for info in self.store.list_saves()])
+        self.store.delete('save').result()
+        with self.assertRaises(SaveNotFoundException):
+            self.store.load('save')
+
+
+if __name__ == '__main__':
+    unittest.main()
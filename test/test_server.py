@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from src.save_store import SqliteSaveStore
+from src.server import GameServer, ProtocolException, get_percentile
+from src.world_map import FileWorldMapSource
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = GameServer(lambda: FileWorldMapSource('maps/rooms'), mob_count=2)
+        self.asyncio_server = await self.server.start('127.0.0.1', 0)
+        self.port = self.asyncio_server.sockets[0].getsockname()[1]
+        self.writers = []
+
+    async def asyncTearDown(self):
+        for writer in self.writers:
+            writer.close()
+            await writer.wait_closed()
+        self.asyncio_server.close()
+        await self.asyncio_server.wait_closed()
+        await self.server.wait_clients()
+        self.server.stop()
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        self.writers.append(writer)
+        return reader, writer
+
+    @staticmethod
+    async def _request(reader, writer, request):
+        writer.write((json.dumps(request) + '\n').encode())
+        await writer.drain()
+        return json.loads(await asyncio.wait_for(reader.readline(), 5))
+
+    async def testNewSession(self):
+        reader, writer = await self._connect()
+        state = await self._request(reader, writer, {'op': 'new'})
+        self.assertEqual('0', state['session'])
+        self.assertEqual(3, len(state['fighters']))
+        self.assertEqual('player', state['fighters'][state['player']][3])
+        self.assertEqual(['SABER', 'SPEAR', 'SWORD'], state['weapons'])
+
+    async def testCommandsStreamDiffs(self):
+        reader, writer = await self._connect()
+        await self._request(reader, writer, {'op': 'new'})
+        diff = await self._request(reader, writer, {'op': 'command', 'command': 'select_2'})
+        self.assertEqual({'tick': 0, 'weapon': 1}, diff)
+        diff = await self._request(reader, writer, {'op': 'command', 'command': 'stay'})
+        self.assertEqual(1, diff['tick'])
+        self.assertNotIn('weapon', diff)
+
+    async def testJoinSharesUpdates(self):
+        reader, writer = await self._connect()
+        state = await self._request(reader, writer, {'op': 'new'})
+        other_reader, other_writer = await self._connect()
+        joined = await self._request(other_reader, other_writer, {'op': 'join', 'session': state['session']})
+        self.assertEqual(state['fighters'], joined['fighters'])
+        await self._request(reader, writer, {'op': 'command', 'command': 'stay'})
+        diff = json.loads(await asyncio.wait_for(other_reader.readline(), 5))
+        self.assertEqual(1, diff['tick'])
+
+    async def testErrors(self):
+        reader, writer = await self._connect()
+        self.assertIn('error', await self._request(reader, writer, {'op': 'command', 'command': 'stay'}))
+        self.assertIn('error', await self._request(reader, writer, {'op': 'join', 'session': '42'}))
+        await self._request(reader, writer, {'op': 'new'})
+        self.assertIn('error', await self._request(reader, writer, {'op': 'command', 'command': 'fly'}))
+        for request in [[], 1, 'new']:
+            self.assertIn('error', await self._request(reader, writer, request))
+        self.assertNotIn('error', await self._request(reader, writer, {'op': 'stats'}))
+
+    async def testFairScheduling(self):
+        busy = await self.server.create_session()
+        calm = await self.server.create_session()
+        for _ in range(10):
+            self.server.submit(busy, 'stay')
+        self.server.submit(calm, 'stay')
+        while calm.tick == 0:
+            await asyncio.sleep(0)
+        self.assertLessEqual(busy.tick, 2)
+
+    async def testFailedTickDropsSession(self):
+        reader, writer = await self._connect()
+        state = await self._request(reader, writer, {'op': 'new'})
+        broken = self.server.sessions[state['session']]
+        broken.session.tick = lambda: 1 / 0
+        calm = await self.server.create_session()
+        with self.assertLogs('src.server', 'ERROR'):
+            reply = await self._request(reader, writer, {'op': 'command', 'command': 'stay'})
+        self.assertIn('error', reply)
+        self.assertEqual(b'', await asyncio.wait_for(reader.readline(), 5))
+        self.assertNotIn(broken.session_id, self.server.sessions)
+        self.server.submit(calm, 'stay')
+        while calm.tick == 0:
+            await asyncio.sleep(0)
+
+    async def testStats(self):
+        reader, writer = await self._connect()
+        stats = await self._request(reader, writer, {'op': 'stats'})
+        self.assertEqual(0, stats['sessions'])
+        self.assertEqual(0, stats['ticks'])
+
+
+class TestGameServerSaves(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqliteSaveStore(os.path.join(self.directory.name, 'saves.db'))
+        self.server = GameServer(lambda: FileWorldMapSource('maps/rooms'), mob_count=2, save_store=self.store)
+
+    async def asyncTearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    async def testRestoreSavedSession(self):
+        hosted = await self.server.create_session()
+        self.server.save_session(hosted).result()
+        restarted = GameServer(lambda: FileWorldMapSource('maps/rooms'), save_store=self.store)
+        self.assertEqual(1, restarted._next_session_id)
+        restored = restarted.restore_session(hosted.session_id)
+        self.assertEqual(hosted.get_full_state()['fighters'], restored.get_full_state()['fighters'])
+        with self.assertRaises(ProtocolException):
+            restarted.restore_session('42')
+
+    async def testOtherSavesIgnored(self):
+        self.store.save('session_backup', '{}')
+        self.store.save('session_3', '{}')
+        restarted = GameServer(lambda: FileWorldMapSource('maps/rooms'), save_store=self.store)
+        self.assertEqual(4, restarted._next_session_id)
+
+    async def testEvictAfterLastClientLeaves(self):
+        hosted = await self.server.create_session()
+        client = object()
+        hosted.subscribers.add(client)
+        self.server._unsubscribe(hosted, client)
+        await asyncio.wait_for(self._wait_evicted(hosted.session_id), 5)
+        restored = self.server.restore_session(hosted.session_id)
+        self.assertIsNot(hosted, restored)
+        self.assertEqual(hosted.get_full_state()['fighters'], restored.get_full_state()['fighters'])
+
+    async def testKeepRejoinedSession(self):
+        hosted = await self.server.create_session()
+        client = object()
+        hosted.subscribers.add(client)
+        self.server._unsubscribe(hosted, client)
+        hosted.subscribers.add(client)
+        self.server.save_session(hosted).result()
+        await asyncio.sleep(0.1)
+        self.assertIs(hosted, self.server.sessions[hosted.session_id])
+
+    async def _wait_evicted(self, session_id):
+        while session_id in self.server.sessions:
+            await asyncio.sleep(0.01)
+
+
+class TestPercentile(unittest.TestCase):
+    def testPercentile(self):
+        self.assertEqual(0, get_percentile([], 99))
+        self.assertEqual(99, get_percentile(range(100), 99))
+        self.assertEqual(50, get_percentile(range(100), 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
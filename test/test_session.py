@@ -0,0 +1,53 @@
+import unittest
+
+from src import fighter
+from src import world_map
+from src.model import Model
+from src.session import GameSession
+from src.strategies import AggressiveStrategy, PassiveStrategy
+from src.world_map import Position
+
+
+class TestGameSession(unittest.TestCase):
+    def setUp(self):
+        self.map = world_map.WorldMap(5, 5)
+        self.player = fighter.Player(Position(0, 0))
+
+    def testNewGame(self):
+        session = GameSession.new_game(self.map, 3)
+        self.assertEqual(3, len(session.model.mobs))
+        self.assertEqual(3, len(session.model.player.inventory))
+        positions = [(f.position.x, f.position.y) for f in session.model.get_fighters()]
+        self.assertEqual(4, len(set(positions)))
+
+    def testTick_move(self):
+        session = GameSession(Model(self.map, self.player, []))
+        session.model.player.get_commands()['go_down']()
+        session.tick()
+        self.assertEqual(Position(1, 0), self.player.position)
+        self.assertFalse(session.player_died)
+
+    def testTick_blocked(self):
+        session = GameSession(Model(self.map, self.player, []))
+        session.model.player.get_commands()['go_up']()
+        session.tick()
+        self.assertEqual(Position(0, 0), self.player.position)
+
+    def testTick_killedMobRemoved(self):
+        mob = fighter.Mob(Position(1, 0), PassiveStrategy(), hp=1)
+        session = GameSession(Model(self.map, self.player, [mob]))
+        session.model.player.get_commands()['go_down']()
+        session.tick()
+        self.assertEqual([], session.model.mobs)
+        self.assertEqual(Position(0, 0), self.player.position)
+
+    def testTick_playerDies(self):
+        self.player.hp = 1
+        mob = fighter.Mob(Position(1, 0), AggressiveStrategy())
+        session = GameSession(Model(self.map, self.player, [mob]))
+        session.tick()
+        self.assertTrue(session.player_died)
+
+
+if __name__ == '__main__':
+    unittest.main()
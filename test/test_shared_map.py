@@ -0,0 +1,70 @@
+import os
+import pickle
+import random
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from src.shared_map import SharedWorldMap
+from src.world_map import MapTile, Position, WorldMap
+
+
+def _count_empty(game_map) -> int:
+    return sum(game_map.is_empty(Position(x, y)) for x in range(game_map.height) for y in range(game_map.width))
+
+
+class TestSharedWorldMap(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        tiles = [[MapTile.BLOCKED if random.random() < 0.3 else MapTile.EMPTY for _ in range(12)] for _ in range(9)]
+        self.map = WorldMap(9, 12, tiles, stairs_down=Position(2, 3))
+        self.shared = SharedWorldMap.create(self.map)
+        self.addCleanup(self.shared.close)
+
+    def testSameAnswers(self):
+        for x in range(-1, 10):
+            for y in range(-1, 13):
+                position = Position(x, y)
+                self.assertEqual(self.map.is_on_map(position), self.shared.is_on_map(position))
+                self.assertEqual(self.map.is_empty(position), self.shared.is_empty(position))
+                self.assertEqual(self.map.get_empty_neighbors(position), self.shared.get_empty_neighbors(position))
+        self.assertEqual(self.map.tiles, self.shared.to_world_map().tiles)
+        self.assertEqual((9, 12), (self.shared.height, self.shared.width))
+        self.assertIsNone(self.shared.stairs_up)
+        self.assertEqual(Position(2, 3), self.shared.stairs_down)
+
+    def testPathService(self):
+        empty = [Position(x, y) for x in range(9) for y in range(12) if self.map.is_empty(Position(x, y))]
+        for start, goal in zip(empty, reversed(empty)):
+            self.assertEqual(self.map.get_path_service().find_path(start, goal),
+                             self.shared.get_path_service().find_path(start, goal))
+
+    def testPickledByPath(self):
+        data = pickle.dumps(self.shared)
+        self.assertLess(len(data), len(pickle.dumps(self.map)))
+        attached = pickle.loads(data)
+        self.addCleanup(attached.close)
+        self.assertEqual(self.map.tiles, attached.to_world_map().tiles)
+
+    def testWorker(self):
+        with ProcessPoolExecutor(1) as executor:
+            self.assertEqual(_count_empty(self.map), executor.submit(_count_empty, self.shared).result())
+
+    def testLifetime(self):
+        attached = SharedWorldMap(self.shared.path)
+        attached.close()
+        self.assertTrue(os.path.exists(self.shared.path))
+        attached = SharedWorldMap(self.shared.path)
+        self.shared.close()
+        self.assertFalse(os.path.exists(self.shared.path))
+        self.assertEqual(_count_empty(self.map), _count_empty(attached))
+        attached.close()
+        with self.assertRaises(ValueError):
+            attached.is_empty(Position(0, 0))
+        with self.assertRaises(FileNotFoundError):
+            SharedWorldMap(self.shared.path)
+
+    def testCollectedOwnerRemovesFile(self):
+        shared = SharedWorldMap.create(self.map)
+        path = shared.path
+        del shared
+        self.assertFalse(os.path.exists(path))
@@ -26,6 +26,24 @@ class TestStrategies(unittest.TestCase):
         self.assertEqual(4, self.mobs[0].choose_move(self.model).x)
         self.assertEqual(5, self.mobs[0].choose_move(self.model).y)
 
+    def testAggressiveAroundWall(self):
+        self.map.tiles[2][3] = world_map.MapTile.BLOCKED
+        self.map.tiles[3][2] = world_map.MapTile.BLOCKED
+        self.mobs = [fighter.Mob(world_map.Position(3, 3), strategies.AggressiveStrategy())]
+        self.model = model.Model(self.map, self.player, self.mobs)
+
+        for _ in range(7):
+            self.mobs[0].position = self.mobs[0].choose_move(self.model)
+        self.assertEqual(1, self.map.get_distance(self.mobs[0].position, self.player.position))
+
+    def testAggressiveUnseenPlayer(self):
+        for y in range(10):
+            self.map.tiles[2][y] = world_map.MapTile.BLOCKED
+        self.mobs = [fighter.Mob(world_map.Position(4, 0), strategies.AggressiveStrategy())]
+        self.model = model.Model(self.map, self.player, self.mobs)
+
+        self.assertEqual(world_map.Position(4, 0), self.mobs[0].choose_move(self.model))
+
     def testCowardly(self):
         self.mobs = [fighter.Mob(world_map.Position(5, 5), strategies.CowardlyStrategy())]
         self.model = model.Model(self.map, self.player, self.mobs)
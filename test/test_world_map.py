@@ -1,7 +1,10 @@
+import pickle
 import unittest
 
+import jsons
+
 from src.world_map import MapTile, WorldMap, MapParsingException, Position, \
-    FileWorldMapSource, RandomV1WorldMapSource
+    FileWorldMapSource, RandomV1WorldMapSource, RandomV2WorldMapSource
 
 
 class TestMapTile(unittest.TestCase):
@@ -15,6 +18,28 @@ class TestMapTile(unittest.TestCase):
         self.assertEqual(MapTile.INVALID, MapTile.parse('@'))
 
 
+class TestPosition(unittest.TestCase):
+    def testInterned(self):
+        self.assertIs(Position(3, 4), Position(3, 4))
+        self.assertIsNot(Position(-3, 4), Position(-3, 4))
+        self.assertEqual(Position(-3, 4), Position(-3, 4))
+
+    def testImmutable(self):
+        with self.assertRaises(AttributeError):
+            Position(1, 2).x = 3
+        self.assertFalse(hasattr(Position(1, 2), '__dict__'))
+
+    def testHashable(self):
+        self.assertEqual({Position(1, 2): 'a', Position(1000, -2): 'b'}[Position(1000, -2)], 'b')
+        self.assertNotEqual(Position(1, 2), (1, 2))
+
+    def testSerialization(self):
+        for position in [Position(1, 2), Position(1000, -2)]:
+            self.assertEqual({'x': position.x, 'y': position.y}, jsons.dump(position))
+            self.assertEqual(position, jsons.load(jsons.dump(position), Position, strict=True))
+            self.assertEqual(position, pickle.loads(pickle.dumps(position)))
+
+
 class TestWorldMap(unittest.TestCase):
     def setUp(self):
         self.no_block_map = [[MapTile.EMPTY for _ in range(1)] for _ in range(2)]
@@ -32,6 +57,10 @@ class TestWorldMap(unittest.TestCase):
         self.assertFalse(WorldMap.from_tiles(self.disconnected_map).is_one_component())
         self.assertFalse(WorldMap.from_tiles(self.all_block_map).is_one_component())
 
+    def testComponentChecking_largeMap(self):
+        world_map = WorldMap.from_tiles([[MapTile.EMPTY for _ in range(300)] for _ in range(300)])
+        self.assertTrue(world_map.is_one_component())
+
     def testIsOnMap(self):
         world_map = WorldMap()
         self.assertTrue(world_map.is_on_map(Position(5, 5)))
@@ -85,6 +114,31 @@ class TestRandomV1WorldMapSource(unittest.TestCase):
         self.assertTrue(world_map.is_one_component())
 
 
+class TestRandomV2WorldMapSource(unittest.TestCase):
+    def testGenerate_invalidParameters(self):
+        with self.assertRaises(ValueError) as raised:
+            RandomV2WorldMapSource(0, 2).get()
+        self.assertEqual('Invalid map height', str(raised.exception))
+
+        with self.assertRaises(ValueError) as raised:
+            RandomV2WorldMapSource(3, -1).get()
+        self.assertEqual('Invalid map width', str(raised.exception))
+
+    def testGenerate_smallParameters(self):
+        world_map = RandomV2WorldMapSource(1, 1).get()
+        self.assertEqual(world_map.tiles, [[MapTile.EMPTY]])
+
+    def testGenerate_normalParameters(self):
+        for seed in range(5):
+            world_map = RandomV2WorldMapSource(60, 80, seed).get()
+            self.assertEqual((60, 80), (world_map.height, world_map.width))
+            self.assertTrue(world_map.is_one_component())
+            self.assertGreater(sum(row.count(MapTile.EMPTY) for row in world_map.tiles), 60 * 80 // 4)
+
+    def testGenerate_seed(self):
+        self.assertEqual(RandomV2WorldMapSource(30, 30, 1).get().tiles, RandomV2WorldMapSource(30, 30, 1).get().tiles)
+
+
 class TestFileWorldMapSource(unittest.TestCase):
     def setUp(self):
         self.no_block_map = [[MapTile.EMPTY for _ in range(1)] for _ in range(2)]